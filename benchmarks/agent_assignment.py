@@ -0,0 +1,100 @@
+"""Throughput of concurrent agent assignment and a double-booking check.
+
+    python -m benchmarks.agent_assignment --agents 200 --threads 1 2 4 8
+
+Each dispatcher thread walks the pending orders and tries to claim an agent
+for each one; the run fails if any agent or order ends up booked twice.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+from decimal import Decimal
+
+from benchmarks.common import Timer, print_table, setup_django
+
+
+def run_dispatchers(orders, agents, threads):
+    from django.db import OperationalError, connections
+
+    from order.services import OrderServiceError, assign_agent
+
+    counts = {'assigned': 0, 'conflicts': 0, 'retries': 0}
+    lock = threading.Lock()
+
+    def dispatcher(seed):
+        shuffled = random.Random(seed).sample(orders, len(orders))
+        try:
+            for i, order_id in enumerate(shuffled):
+                agent_id = agents[(i + seed) % len(agents)]
+                while True:
+                    try:
+                        assign_agent(order_id, agent_id)
+                        outcome = 'assigned'
+                    except OrderServiceError:
+                        outcome = 'conflicts'
+                    except OperationalError:
+                        outcome = 'retries'
+                    with lock:
+                        counts[outcome] += 1
+                    if outcome != 'retries':
+                        break
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=dispatcher, args=(n,)) for n in range(threads)]
+    with Timer() as timer:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return counts, timer.elapsed
+
+
+def run(agent_count, thread_counts):
+    from django.db.models import Count
+
+    from order.models import Order
+    from user.models import UserProfile
+
+    customer = UserProfile.objects.create(username='bench-customer', role='CUSTOMER')
+    rows = []
+    for threads in thread_counts:
+        Order.objects.all().delete()
+        UserProfile.objects.filter(role='AGENT').delete()
+        agents = list(UserProfile.objects.bulk_create(
+            [UserProfile(username=f'bench-agent-{i}', role='AGENT') for i in range(agent_count)]
+        ))
+        orders = Order.objects.bulk_create(
+            [Order(customer=customer, total_amount=Decimal('10.00'), otp_code='123456') for _ in range(agent_count)]
+        )
+        counts, elapsed = run_dispatchers([o.id for o in orders], [a.id for a in agents], threads)
+
+        double_booked = Order.objects.filter(agent__isnull=False).values('agent') \
+            .annotate(n=Count('id')).filter(n__gt=1).count()
+        assigned = Order.objects.filter(agent__isnull=False).count()
+        assert double_booked == 0, f'{double_booked} agents double booked'
+        assert assigned == counts['assigned'], (assigned, counts)
+        rows.append((
+            threads, counts['assigned'], counts['conflicts'], counts['retries'],
+            f'{elapsed * 1000:.0f}', f'{counts["assigned"] / elapsed:.0f}',
+        ))
+
+    print_table(('threads', 'assigned', 'conflicts', 'retries', 'ms', 'assign/s'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=200)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Threads need a real file: the shared in-memory test database uses table locks
+        setup_django(test_db_name=os.path.join(tmp, 'bench.sqlite3'))
+        run(args.agents, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Concurrency of the sync and async order polling views under ASGI.
+
+    python -m benchmarks.async_orders
+    python -m benchmarks.async_orders --concurrency 200 --db-latency-ms 5 --threads 8
+
+Serves DRF generic (sync) equivalents and the async versions of the order detail and customer
+order list views side by side through Django's ASGIHandler in-process, and
+fires --concurrency simultaneous requests at each. Every query is delayed by
+--db-latency-ms to stand in for the network round trip to a database server.
+The worker's default thread pool is capped at --threads. Reports throughput,
+latency, the most requests the worker had in flight at once and the most
+threads alive while serving them.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+
+from benchmarks.common import percentile, print_table, setup_django
+
+class InFlight:
+    """Count of views executing at once and of live threads, with their peaks"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.current = self.peak = self.peak_threads = 0
+
+    @contextmanager
+    def track(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.current -= 1
+
+
+def tracked(view, in_flight):
+    """Wrap a view so the time it runs, sync or async, counts as in flight"""
+    if asyncio.iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            with in_flight.track():
+                return await view(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            with in_flight.track():
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+def sync_views():
+    """DRF generic equivalents of the async views, the baseline they are measured against"""
+    from django.db.models import prefetch_related_objects
+    from django.shortcuts import get_object_or_404
+    from rest_framework import generics
+    from rest_framework.response import Response
+    from food_delivery.pagination import CreatedAtCursorPagination
+    from order.models import Order
+    from order.serializers import OrderReadSerializer, items_prefetch
+    from order.views import AsyncOrderDetailView, AsyncOrderListByCustomerView
+
+    class OrderDetailView(generics.RetrieveAPIView):
+        serializer_class = OrderReadSerializer
+        permission_classes = AsyncOrderDetailView.permission_classes
+
+        def retrieve(self, request, *args, **kwargs):
+            order = get_object_or_404(Order, id=self.kwargs['order_id'])
+            prefetch_related_objects([order], items_prefetch())
+            return Response({"message": "Order retrieved successfully", "data": self.get_serializer(order).data})
+
+    class OrderListByCustomerView(generics.ListAPIView):
+        serializer_class = OrderReadSerializer
+        permission_classes = AsyncOrderListByCustomerView.permission_classes
+        pagination_class = CreatedAtCursorPagination
+
+        def get_queryset(self):
+            return OrderReadSerializer.setup_eager_loading(Order.objects.filter(customer_id=self.kwargs['customer_id']))
+
+        def list(self, request, *args, **kwargs):
+            return Response({"data": super().list(request, *args, **kwargs).data})
+
+    return OrderDetailView, OrderListByCustomerView
+
+
+def build_urlconf(in_flight):
+    """URLconf serving the sync baseline and the async views under sync/ and async/"""
+    from django.urls import path
+    from order import views
+
+    detail, by_customer = sync_views()
+    urls = ModuleType('benchmark_urls')
+    urls.urlpatterns = [
+        path('sync/<int:order_id>', tracked(detail.as_view(), in_flight)),
+        path('sync/user/<int:customer_id>', tracked(by_customer.as_view(), in_flight)),
+        path('async/<int:order_id>', tracked(views.AsyncOrderDetailView.as_view(), in_flight)),
+        path('async/user/<int:customer_id>', tracked(views.AsyncOrderListByCustomerView.as_view(), in_flight)),
+    ]
+    return urls
+
+
+def install_db_latency(seconds):
+    """Delay every query by the given time on every connection the worker opens"""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender=None, connection=None, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all(initialized_only=True):
+        install(connection=connection)
+
+
+async def call(app, path, token):
+    """Send one GET through the ASGI application, returns the response status"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    body_sent, sent = asyncio.Event(), []
+
+    async def receive():
+        if body_sent.is_set():
+            # Nothing more to send; the client stays connected
+            await asyncio.Event().wait()
+        body_sent.set()
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]['status']
+
+
+async def burst(app, paths, token, concurrency):
+    """Fire concurrency requests at once, returns their latencies"""
+    async def timed(path):
+        start = time.perf_counter()
+        status = await call(app, path, token)
+        assert status == 200, f'{path}: {status}'
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(timed(paths[i % len(paths)]) for i in range(concurrency)))
+
+
+def seed(customers, orders_per_customer):
+    from decimal import Decimal
+    from order.models import Order, OrderProduct
+    from product.models import Product
+    from user.models import UserProfile
+
+    products = Product.objects.bulk_create([Product(name=f'Dish {i}', price=Decimal('5.00') + i) for i in range(20)])
+    users = UserProfile.objects.bulk_create(
+        [UserProfile(username=f'customer{i}', email=f'customer{i}@example.com', role='CUSTOMER') for i in range(customers)]
+    )
+    orders = Order.objects.bulk_create([
+        Order(customer=user, total_amount=Decimal('15.00'), otp_code='123456')
+        for user in users for _ in range(orders_per_customer)
+    ])
+    OrderProduct.objects.bulk_create([
+        OrderProduct(order=order, product=products[(order.id + j) % len(products)], quantity=1, price=Decimal('5.00'))
+        for order in orders for j in range(3)
+    ])
+    return users, orders
+
+
+def run(args):
+    """Seed, then measure both implementations of both views"""
+    from concurrent.futures import ThreadPoolExecutor
+    from django.core.asgi import get_asgi_application
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    users, orders = seed(args.customers, args.orders)
+    token = AccessToken.for_user(users[0])
+    in_flight = InFlight()
+    install_db_latency(args.db_latency_ms / 1000)
+    app = get_asgi_application()
+
+    paths = {
+        'order-by-id': [f'/{order.id}' for order in orders],
+        'order-list-by-customer': [f'/user/{user.id}' for user in users],
+    }
+
+    async def measure(prefix, name):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+        await burst(app, [f'/{prefix}{p}' for p in paths[name]], token, args.concurrency)  # warm up
+        in_flight.reset()
+        latencies, start = [], time.perf_counter()
+        for _ in range(args.bursts):
+            latencies += await burst(app, [f'/{prefix}{p}' for p in paths[name]], token, args.concurrency)
+        return latencies, time.perf_counter() - start
+
+    rows = []
+    with override_settings(ROOT_URLCONF=build_urlconf(in_flight)):
+        for name in paths:
+            for prefix in ('sync', 'async'):
+                latencies, elapsed = asyncio.run(measure(prefix, name))
+                rows.append((
+                    f'{name}:{prefix}', in_flight.peak, in_flight.peak_threads, f'{len(latencies) / elapsed:.0f}',
+                    f'{percentile(latencies, 50) * 1000:.1f}', f'{percentile(latencies, 95) * 1000:.1f}',
+                ))
+
+    print(f'{args.concurrency} concurrent requests, {args.db_latency_ms} ms per query, {args.threads} threads')
+    print_table(('view', 'max in flight', 'max threads', 'req/s', 'p50 ms', 'p95 ms'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=100, help='simultaneous requests per burst')
+    parser.add_argument('--bursts', type=int, default=5)
+    parser.add_argument('--db-latency-ms', type=float, default=2.0)
+    parser.add_argument('--threads', type=int, default=8, help='thread pool size of the worker')
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=10, help='orders per customer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Request threads need a real file: the shared in-memory test database uses table locks
+        setup_django(test_db_name=os.path.join(tmp, 'bench.sqlite3'))
+        run(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Bulk order endpoints against the same work done one order per request.
+
+    python -m benchmarks.bulk_orders
+    python -m benchmarks.bulk_orders --sizes 10 100 1000
+
+For each size N, cancels N assigned orders with N CancelOrderView calls and
+with one bulk cancel call, then assigns N pending orders to N available
+agents with N AssignAgentView calls and with one bulk reassign call. Every
+call goes through the test client with an admin access token. Reports wall
+time and queries per run.
+"""
+import argparse
+
+from benchmarks.common import Timer, print_table, setup_django
+
+
+class Fixtures:
+    """Fresh orders and agents for every run"""
+
+    def __init__(self):
+        from user.models import UserProfile
+        from product.models import Product
+
+        self.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='customer@example.com')
+        self.product = Product.objects.create(name='Curry', price='6.50')
+        self.agents_created = 0
+
+    def agents(self, count, agent_status):
+        from user.models import UserProfile
+
+        start, self.agents_created = self.agents_created, self.agents_created + count
+        return UserProfile.objects.bulk_create([
+            UserProfile(username=f'agent{i}', role='AGENT', email=f'agent{i}@example.com', agent_status=agent_status)
+            for i in range(start, start + count)
+        ])
+
+    def orders(self, count, assigned):
+        from order.models import Order, OrderProduct
+
+        agents = self.agents(count, 'UNAVAILABLE') if assigned else [None] * count
+        orders = Order.objects.bulk_create([
+            Order(customer=self.customer, agent=agent, total_amount='6.50', status='assigned' if assigned else 'pending')
+            for agent in agents
+        ])
+        OrderProduct.objects.bulk_create(
+            [OrderProduct(order=order, product=self.product, quantity=1, price='6.50') for order in orders]
+        )
+        return [order.id for order in orders]
+
+
+def run(client, requests):
+    """Send (path, body) requests, returns (seconds, queries)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries, Timer() as timer:
+        for path, body in requests:
+            response = client.post(path, body, content_type='application/json')
+            assert response.status_code == 200, f'{path}: {response.status_code} {response.content[:200]!r}'
+    return timer.elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from django.urls import reverse
+    from user.models import UserProfile
+    from user.views import CustomTokenObtainPairSerializer
+
+    admin = UserProfile.objects.create(username='admin', role='ADMIN', is_staff=True)
+    token = CustomTokenObtainPairSerializer.get_token(admin).access_token
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+    fixtures = Fixtures()
+
+    rows = []
+    for size in args.sizes:
+        ids = fixtures.orders(size, assigned=True)
+        single = run(client, [(reverse('cancel-order', args=[i]), {'reason': 'Kitchen closed'}) for i in ids])
+        ids = fixtures.orders(size, assigned=True)
+        bulk = run(client, [(reverse('bulk-cancel-orders'), {'order_ids': ids, 'reason': 'Kitchen closed'})])
+        rows.append(('cancel', size, *result_columns(single, bulk)))
+
+        ids, agents = fixtures.orders(size, assigned=False), fixtures.agents(size, 'AVAILABLE')
+        single = run(client, [
+            (reverse('agent-assign', args=[i]), {'agent_id': agent.id}) for i, agent in zip(ids, agents)
+        ])
+        ids, agents = fixtures.orders(size, assigned=False), fixtures.agents(size, 'AVAILABLE')
+        bulk = run(client, [(reverse('bulk-reassign-orders'), {'order_ids': ids, 'agent_ids': [a.id for a in agents]})])
+        rows.append(('assign', size, *result_columns(single, bulk)))
+
+    print_table(('operation', 'orders', 'single ms', 'single queries', 'bulk ms', 'bulk queries', 'speedup'), rows)
+
+
+def result_columns(single, bulk):
+    return (
+        f'{single[0] * 1000:.0f}', single[1], f'{bulk[0] * 1000:.1f}', bulk[1], f'{single[0] / bulk[0]:.0f}x',
+    )
+
+
+if __name__ == '__main__':
+    main()
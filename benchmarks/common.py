@@ -0,0 +1,51 @@
+"""Shared helpers for the benchmark scripts"""
+import math
+import os
+import time
+
+
+def setup_django(test_db_name=None):
+    """
+    Configure Django against a throwaway test database, eager Celery, an in-memory
+    channel layer and locmem email.
+    Pass test_db_name to use an on-disk database, e.g. for multi-threaded runs.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_delivery.settings')
+    os.environ.setdefault('CELERY_TASK_ALWAYS_EAGER', 'True')
+    os.environ.setdefault('CHANNEL_LAYER_BACKEND', 'channels.layers.InMemoryChannelLayer')
+    import django
+    django.setup()
+
+    from django.db import connections
+    from django.test.utils import setup_databases, setup_test_environment
+    if test_db_name:
+        connections['default'].settings_dict['TEST']['NAME'] = test_db_name
+    setup_test_environment()
+    setup_databases(verbosity=0, interactive=False)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Timer:
+    """Context manager recording elapsed wall time in seconds"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed width text table"""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers, *rows]:
+        print('  '.join(str(value).rjust(width) for value, width in zip(row, widths)))
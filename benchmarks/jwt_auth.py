@@ -0,0 +1,76 @@
+"""Cost of resolving the JWT user from the database versus from token claims.
+
+    python -m benchmarks.jwt_auth
+    python -m benchmarks.jwt_auth --requests 500
+
+Sends the same authenticated requests with a token issued by
+CustomTokenObtainPairSerializer, whose role, status and is_staff claims let
+CachedJWTAuthentication skip the user row, and with a plain token without
+those claims, which loads the row on every request like JWTAuthentication.
+Reports queries and latency per request.
+"""
+import argparse
+import time
+
+from benchmarks.common import percentile, print_table, setup_django
+
+
+def measure(client, path, headers, count):
+    """Latencies and average queries per request"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client.get(path, **headers)  # warm the user state cache
+    latencies = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(path, **headers)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, f'{path}: {response.status_code}'
+    return latencies, len(queries) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from decimal import Decimal
+    from django.test import Client
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import AccessToken
+    from order.models import Order
+    from user.models import UserProfile
+    from user.views import CustomTokenObtainPairSerializer
+
+    customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+    admin = UserProfile.objects.create(username='admin', role='ADMIN', is_staff=True)
+    order = Order.objects.create(customer=customer, total_amount=Decimal('10.00'))
+
+    tokens = {
+        'claims': lambda user: CustomTokenObtainPairSerializer.get_token(user).access_token,
+        'plain': AccessToken.for_user,
+    }
+    routes = [
+        ('order-list', customer, reverse('order-create')),
+        ('order-by-id', customer, reverse('order-by-id', args=[order.id])),
+        ('list-customers', admin, reverse('list-customers')),
+    ]
+
+    client, rows = Client(), []
+    for name, user, path in routes:
+        for kind, issue in tokens.items():
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {issue(user)}'}
+            latencies, queries = measure(client, path, headers, args.requests)
+            rows.append((
+                f'{name}:{kind}', f'{queries:.2f}',
+                f'{percentile(latencies, 50) * 1000:.2f}', f'{percentile(latencies, 95) * 1000:.2f}',
+            ))
+
+    print_table(('endpoint:token', 'queries', 'p50 ms', 'p95 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Load test of the API routes through the test client and the in-process ASGI handler.
+
+    python -m benchmarks.load                                   # compare with benchmarks/baseline.json
+    python -m benchmarks.load --write-baseline                  # record a new baseline
+    python -m benchmarks.load --modes asgi --endpoints product-list order-create
+
+Seeds a synthetic dataset (see benchmarks.seed), then sends --requests
+requests to each endpoint through django.test.Client (WSGI) and
+django.test.AsyncClient (ASGI), authenticating with real JWT access tokens.
+Reports throughput, p50/p95/p99 latency and database queries per request,
+the latter from the request metrics middleware. A run fails when an
+endpoint issues more queries than the baseline, or its --latency-metric
+exceeds the baseline by more than --tolerance and at least --min-delta-ms.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile, print_table, setup_django
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'baseline.json'
+SEARCH_TERMS = ['pizza', 'chicken', 'cheese', 'rice', 'spicy', 'burger']
+DATASET_OPTIONS = ('customers', 'agents', 'products', 'orders', 'items', 'seed')
+
+
+def endpoints(data):
+    """name -> (user, method, path factory, body factory) for every benchmarked route"""
+    from django.urls import reverse
+
+    rng = random.Random(0)
+    customer = data.customers[0]
+    # Orders of unavailable products are rejected; prices and totals are set by the server
+    orderable = [product for product in data.products if product.status == 'AVAILABLE']
+
+    def order_payload():
+        products = rng.sample(orderable, 3)
+        return {'customer': customer.id, 'items': [{'product_id': p.id, 'quantity': 1} for p in products]}
+
+    return {
+        'product-list': (None, 'get', lambda: reverse('product-list'), None),
+        'product-search': (
+            None, 'get', lambda: f"{reverse('product-list')}?search={rng.choice(SEARCH_TERMS)}", None
+        ),
+        'product-detail': (data.admin, 'get', lambda: reverse('product-detail', args=[rng.choice(data.products).id]), None),
+        'order-create': (customer, 'post', lambda: reverse('order-create'), order_payload),
+        'order-list': (customer, 'get', lambda: reverse('order-create'), None),
+        'order-list-by-customer': (
+            customer, 'get', lambda: reverse('order-list-by-customer', args=[rng.choice(data.customers).id]), None
+        ),
+        'order-by-id': (customer, 'get', lambda: reverse('order-by-id', args=[rng.choice(data.orders).id]), None),
+        'list-customers': (data.admin, 'get', lambda: reverse('list-customers'), None),
+        'list-agents': (None, 'get', lambda: reverse('list-agents'), None),
+        'available-agents-list': (None, 'get', lambda: reverse('available-agents-list'), None),
+    }
+
+
+_tokens = {}
+
+
+def auth_headers(user):
+    """Authorization header with an access token issued the way the login endpoint issues it"""
+    from user.views import CustomTokenObtainPairSerializer
+
+    if user is None:
+        return {}
+    if user.id not in _tokens:
+        _tokens[user.id] = f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+    return {'Authorization': _tokens[user.id]}
+
+
+def request_args(spec):
+    user, method, path, body = spec
+    kwargs = {'headers': auth_headers(user)}
+    if body is not None:
+        kwargs.update(data=json.dumps(body()), content_type='application/json')
+    return method, path(), kwargs
+
+
+def check(name, response):
+    assert response.status_code < 400, f'{name}: {response.status_code} {response.content[:200]!r}'
+
+
+def run_sync(name, spec, count):
+    from django.test import Client
+
+    client, latencies = Client(), []
+    for _ in range(count):
+        method, path, kwargs = request_args(spec)
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        check(name, response)
+    return latencies
+
+
+def run_asgi(name, spec, count):
+    from django.test import AsyncClient
+
+    async def drive():
+        client, latencies = AsyncClient(), []
+        for _ in range(count):
+            method, path, kwargs = request_args(spec)
+            start = time.perf_counter()
+            response = await getattr(client, method)(path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            check(name, response)
+        return latencies
+
+    return asyncio.run(drive())
+
+
+RUNNERS = {'wsgi': run_sync, 'asgi': run_asgi}
+
+
+def measure(name, spec, mode, count, warmup):
+    """Run one endpoint in one mode, returns its result row"""
+    from food_delivery.metrics import registry
+
+    runner = RUNNERS[mode]
+    runner(name, spec, warmup)
+    registry.reset()
+    latencies = runner(name, spec, count)
+    samples = [sample for samples, *_ in registry.snapshot().values() for sample in samples]
+    return {
+        'requests': count,
+        'throughput': count / sum(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': round(sum(s['queries'] for s in samples) / len(samples), 2) if samples else 0,
+        'db_ms': sum(s['db_duration'] for s in samples) / len(samples) * 1000 if samples else 0,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms, metric='p50_ms'):
+    """Regressions of results against the baseline results"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['queries'] > base['queries'] + 0.01:
+            regressions.append(f"{key}: {result['queries']} queries per request, baseline {base['queries']}")
+        slower = result[metric] - base[metric]
+        if result[metric] > base[metric] * (1 + tolerance) and slower > min_delta_ms:
+            regressions.append(f"{key}: {metric} {result[metric]:.1f}, baseline {base[metric]:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--agents', type=int, default=50)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=3, help='items per seeded order')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per endpoint and mode')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--modes', nargs='+', choices=sorted(RUNNERS), default=['wsgi', 'asgi'])
+    parser.add_argument('--endpoints', nargs='+', help='default: all')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--write-baseline', action='store_true')
+    parser.add_argument('--latency-metric', choices=['p50_ms', 'p95_ms', 'p99_ms'], default='p50_ms',
+                        help='latency percentile compared with the baseline')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='allowed latency increase over the baseline, 1.0 = twice as slow')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='latency increases smaller than this are noise, not regressions')
+    args = parser.parse_args()
+
+    os.environ['REQUEST_METRICS_ENABLED'] = 'True'
+    setup_django()
+    from benchmarks.seed import seed
+
+    dataset = {option: getattr(args, option) for option in DATASET_OPTIONS}
+    specs = endpoints(seed(**dataset))
+    names = args.endpoints or list(specs)
+
+    results = {}
+    for name in names:
+        for mode in args.modes:
+            results[f'{name}:{mode}'] = measure(name, specs[name], mode, args.requests, args.warmup)
+
+    print_table(
+        ('endpoint', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'db ms'),
+        [
+            (key, f"{r['throughput']:.0f}", f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}", f"{r['p99_ms']:.1f}",
+             r['queries'], f"{r['db_ms']:.2f}")
+            for key, r in results.items()
+        ],
+    )
+
+    settings = dict(dataset, requests=args.requests, warmup=args.warmup)
+    if args.write_baseline:
+        rounded = {key: {k: round(v, 3) for k, v in r.items()} for key, r in results.items()}
+        args.baseline.write_text(json.dumps({'settings': settings, 'results': rounded}, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if not args.baseline.exists():
+        print(f'No baseline at {args.baseline}, run with --write-baseline to record one')
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline['settings'] != settings:
+        sys.exit(f"Baseline was recorded with {baseline['settings']}, this run used {settings}")
+    regressions = compare(results, baseline['results'], args.tolerance, args.min_delta_ms, args.latency_metric)
+    if regressions:
+        sys.exit('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+    print('No regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
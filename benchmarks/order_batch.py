@@ -0,0 +1,69 @@
+"""Batch order creation against one order per request.
+
+    python -m benchmarks.order_batch
+    python -m benchmarks.order_batch --sizes 1 10 100 500
+
+For each size N, creates N orders of three items with N OrderCreateView calls
+and with one call to the batch endpoint. Every call goes through the test
+client with a customer access token. Reports wall time and queries per run.
+"""
+import argparse
+
+from benchmarks.common import Timer, print_table, setup_django
+
+
+def orders(customer, products, count):
+    return [
+        {
+            'customer': customer.id,
+            'total_amount': '19.50',
+            'items': [{'product_id': products[(i + j) % len(products)].id, 'quantity': 1, 'price': '6.50'} for j in range(3)],
+        }
+        for i in range(count)
+    ]
+
+
+def run(client, requests):
+    """Send (path, body) requests, returns (seconds, queries)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries, Timer() as timer:
+        for path, body in requests:
+            response = client.post(path, body, content_type='application/json')
+            assert response.status_code == 201, f'{path}: {response.status_code} {response.content[:200]!r}'
+    return timer.elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from django.urls import reverse
+    from product.models import Product
+    from user.models import UserProfile
+    from user.views import CustomTokenObtainPairSerializer
+
+    customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='customer@example.com')
+    products = Product.objects.bulk_create([Product(name=f'Dish {i}', price='6.50') for i in range(20)])
+    token = CustomTokenObtainPairSerializer.get_token(customer).access_token
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+
+    rows = []
+    for size in args.sizes:
+        batch = orders(customer, products, size)
+        single = run(client, [(reverse('order-create'), order) for order in batch])
+        bulk = run(client, [(reverse('order-batch-create'), {'orders': batch})])
+        rows.append((
+            size, f'{single[0] * 1000:.0f}', single[1], f'{bulk[0] * 1000:.1f}', bulk[1],
+            f'{bulk[0] * 1000 / size:.2f}', f'{single[0] / bulk[0]:.1f}x',
+        ))
+
+    print_table(('orders', 'single ms', 'single queries', 'batch ms', 'batch queries', 'batch ms/order', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
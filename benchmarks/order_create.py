@@ -0,0 +1,57 @@
+"""Query count and latency of POST /api/order/create/ against cart size.
+
+    python -m benchmarks.order_create --sizes 1 5 10 20 --iterations 50
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks.common import Timer, percentile, print_table, setup_django
+
+
+def run(sizes, iterations):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from product.models import Product
+    from user.models import UserProfile
+
+    customer = UserProfile.objects.create(username='bench-customer', email='bench@example.com', role='CUSTOMER')
+    products = Product.objects.bulk_create(
+        [Product(name=f'Bench dish {i}', price=Decimal('9.99')) for i in range(max(sizes))]
+    )
+    client = APIClient()
+    client.force_authenticate(customer)
+    url = reverse('order-create')
+
+    rows = []
+    for size in sizes:
+        payload = {
+            'customer': customer.id,
+            'total_amount': '100.00',
+            'items': [{'product_id': p.id, 'quantity': 1, 'price': '9.99'} for p in products[:size]],
+        }
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries, Timer() as timer:
+                response = client.post(url, payload, format='json')
+            assert response.status_code == 201, response.content
+            timings.append(timer.elapsed * 1000)
+        rows.append((size, len(queries), f'{percentile(timings, 50):.2f}', f'{percentile(timings, 95):.2f}'))
+
+    print_table(('cart size', 'queries', 'p50 ms', 'p95 ms'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.sizes, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Simulation of the automatic dispatcher against synthetic order and agent streams.
+
+    python -m benchmarks.order_dispatch --ticks 20 --agents 2000 --orders-per-tick 1500 --backlog 5000
+
+Each tick new orders arrive, a share of busy agents finish their delivery and
+become available again, and one dispatcher tick runs. Reports per-tick time,
+assignments and backlog; --trace-memory adds the dispatcher's peak Python
+memory at the cost of much slower ticks.
+"""
+import argparse
+import random
+import tracemalloc
+from decimal import Decimal
+
+from benchmarks.common import Timer, percentile, print_table, setup_django
+
+
+def run(ticks, agent_count, orders_per_tick, backlog, release_rate, batch_size, seed, trace_memory):
+    from django.conf import settings
+
+    from order.dispatch import dispatch_pending_orders
+    from order.models import Order
+    from user.models import UserProfile
+
+    rng = random.Random(seed)
+    customers = UserProfile.objects.bulk_create(
+        [UserProfile(username=f'sim-customer-{i}', role='CUSTOMER') for i in range(100)]
+    )
+    UserProfile.objects.bulk_create(
+        [UserProfile(username=f'sim-agent-{i}', role='AGENT', email=f'agent{i}@example.com') for i in range(agent_count)]
+    )
+
+    def arrive(count):
+        Order.objects.bulk_create([
+            Order(customer=rng.choice(customers), total_amount=Decimal(rng.randint(5, 80)), otp_code='123456')
+            for _ in range(count)
+        ], batch_size=1000)
+
+    arrive(backlog)
+    rows, timings = [], []
+    for tick in range(1, ticks + 1):
+        arrive(rng.randint(orders_per_tick // 2, orders_per_tick * 3 // 2))
+        # Deliveries complete: free a share of the busy agents
+        busy = list(Order.objects.filter(status='assigned').values_list('id', 'agent_id'))
+        done = rng.sample(busy, int(len(busy) * release_rate))
+        Order.objects.filter(id__in=[order_id for order_id, _ in done]).update(status='delivered')
+        UserProfile.objects.filter(id__in=[agent_id for _, agent_id in done]).update(agent_status='AVAILABLE')
+
+        if trace_memory:
+            tracemalloc.start()
+        with Timer() as timer:
+            summary = dispatch_pending_orders(batch_size=batch_size, max_orders=settings.ORDER_DISPATCH_MAX_PER_TICK)
+        peak = f'{tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f}' if trace_memory else '-'
+        tracemalloc.stop()
+
+        timings.append(timer.elapsed * 1000)
+        rows.append((
+            tick, summary['assigned'], summary['batches'], Order.objects.filter(status='pending').count(),
+            f'{timer.elapsed * 1000:.0f}', peak,
+        ))
+
+    print_table(('tick', 'assigned', 'batches', 'backlog', 'ms', 'peak MB'), rows)
+    print(f'p50 {percentile(timings, 50):.0f} ms  p95 {percentile(timings, 95):.0f} ms per tick')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--agents', type=int, default=2000)
+    parser.add_argument('--orders-per-tick', type=int, default=1500)
+    parser.add_argument('--backlog', type=int, default=5000)
+    parser.add_argument('--release-rate', type=float, default=0.5, help='share of busy agents freed per tick')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.ticks, args.agents, args.orders_per_tick, args.backlog, args.release_rate, args.batch_size, args.seed, args.trace_memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Latency of deep pages in the order lists: keyset cursors versus OFFSET.
+
+    python -m benchmarks.order_pagination --orders 1000000
+"""
+import argparse
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from benchmarks.common import Timer, percentile, print_table, setup_django
+
+
+def seed(orders, customers, batch_size=20_000):
+    """Insert orders spread over customers with distinct, increasing created_at"""
+    from django.utils.timezone import now
+
+    from order.models import Order
+    from user.models import UserProfile
+
+    users = UserProfile.objects.bulk_create(
+        [UserProfile(username=f'bench-customer-{i}', role='CUSTOMER') for i in range(customers)]
+    )
+    start = now() - timedelta(seconds=orders)
+    created_at = Order._meta.get_field('created_at')
+    with mock.patch.object(created_at, 'pre_save', lambda instance, add: instance.created_at):
+        for offset in range(0, orders, batch_size):
+            Order.objects.bulk_create([
+                Order(
+                    customer=users[index % customers], total_amount=Decimal('10.00'),
+                    created_at=start + timedelta(seconds=index),
+                )
+                for index in range(offset, min(offset + batch_size, orders))
+            ])
+    return users[0]
+
+
+def run(orders, customers, page_size, repeat):
+    from rest_framework.pagination import Cursor
+    from rest_framework.test import APIClient
+    from django.urls import reverse
+
+    from food_delivery.pagination import CreatedAtCursorPagination
+    from order.models import Order
+
+    with Timer() as seeding:
+        customer = seed(orders, customers)
+    print(f'{orders:,} orders for {customers:,} customers seeded in {seeding.elapsed:.1f}s')
+
+    client = APIClient()
+    client.force_authenticate(customer)
+    endpoints = {
+        'order-create': (reverse('order-create'), Order.objects.all()),
+        'order-list-by-customer': (
+            reverse('order-list-by-customer', args=[customer.id]), Order.objects.filter(customer=customer)
+        ),
+    }
+
+    rows = []
+    for name, (url, queryset) in endpoints.items():
+        total = queryset.count()
+        for fraction in (0, 0.5, 0.99):
+            depth = int(total * fraction)
+            ordered = queryset.order_by('-created_at', '-id')
+            position = ordered.values_list('created_at', flat=True)[depth]
+            paginator = CreatedAtCursorPagination()
+            paginator.base_url = f'http://testserver{url}'
+            cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+
+            http, keyset, offset = [], [], []
+            for _ in range(repeat):
+                with Timer() as timer:
+                    response = client.get(cursor_url, {'page_size': page_size})
+                assert response.status_code == 200
+                http.append(timer.elapsed * 1000)
+                with Timer() as timer:
+                    list(ordered.filter(created_at__lte=position)[:page_size])
+                keyset.append(timer.elapsed * 1000)
+                with Timer() as timer:
+                    list(ordered[depth:depth + page_size])
+                offset.append(timer.elapsed * 1000)
+            rows.append((
+                name, f'{depth:,}', f'{percentile(http, 50):.1f}', f'{percentile(http, 95):.1f}',
+                f'{percentile(keyset, 50):.2f}', f'{percentile(offset, 50):.2f}',
+            ))
+
+    print('HTTP columns time the full cursor-paginated request; the query columns time only the page query')
+    print_table(('endpoint', 'depth', 'HTTP p50 ms', 'HTTP p95 ms', 'keyset query ms', 'OFFSET query ms'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.orders, args.customers, args.page_size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
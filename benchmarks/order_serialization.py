@@ -0,0 +1,73 @@
+"""Serialization time and queries per 1,000 orders for the order list representation.
+
+    python -m benchmarks.order_serialization --orders 1000 --items 3 --repeat 5
+
+Compares OrderSerializer without eager loading (one query per order for its
+items and one per item for the product), OrderSerializer with the
+serializer's eager loading, and the read-only OrderReadSerializer.
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from benchmarks.common import Timer, print_table, setup_django
+
+
+def run(order_count, item_count, repeat):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    from order.models import Order, OrderProduct
+    from order.serializers import OrderReadSerializer, OrderSerializer
+    from product.models import Product
+    from user.models import UserProfile
+
+    rng = random.Random(0)
+    customer = UserProfile.objects.create(username='bench-customer', role='CUSTOMER')
+    products = Product.objects.bulk_create(
+        [Product(name=f'Bench dish {i}', price=Decimal('9.99')) for i in range(50)]
+    )
+    orders = Order.objects.bulk_create(
+        [Order(customer=customer, total_amount=Decimal('29.97'), otp_code='123456') for _ in range(order_count)]
+    )
+    OrderProduct.objects.bulk_create([
+        OrderProduct(order=order, product=product, quantity=1, price=product.price)
+        for order in orders for product in rng.sample(products, item_count)
+    ], batch_size=1000)
+
+    variants = [
+        ('OrderSerializer, lazy', OrderSerializer, lambda qs: qs),
+        ('OrderSerializer, prefetched', OrderSerializer, OrderSerializer.setup_eager_loading),
+        ('OrderReadSerializer, prefetched', OrderReadSerializer, OrderReadSerializer.setup_eager_loading),
+    ]
+    rows, baseline = [], None
+    for label, serializer_class, load in variants:
+        best, queries = None, 0
+        for _ in range(repeat):
+            # The query log is capped, so start each run from an empty one
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured, Timer() as timer:
+                data = serializer_class(load(Order.objects.order_by('id')), many=True).data
+            assert len(data) == order_count
+            best = timer.elapsed if best is None else min(best, timer.elapsed)
+            queries = len(captured)
+        per_thousand = best * 1000 / order_count * 1000
+        baseline = baseline or per_thousand
+        rows.append((label, queries, f'{per_thousand:.1f}', f'{baseline / per_thousand:.1f}x'))
+
+    print_table(('serializer', 'queries', 'ms per 1k orders', 'speedup'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.orders, args.items, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Throughput of GET /api/products/list/ with and without the catalog cache.
+
+    python -m benchmarks.product_catalog --products 20000 --requests 500
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from benchmarks.common import Timer, percentile, print_table, setup_django
+
+QUERIES = [
+    {},
+    {'name': 'pizza'},
+    {'status': 'AVAILABLE', 'max_price': '15'},
+    {'min_price': '5', 'max_price': '20', 'name': 'dish 1'},
+]
+
+
+def run(products, requests):
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from product.models import Product
+    from product.search import get_search_backend
+
+    rng = random.Random(products)
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f'Dish {i} {"pizza" if i % 7 == 0 else "bowl"}',
+                price=Decimal(f'{rng.uniform(1, 40):.2f}'),
+                status=rng.choice(['AVAILABLE', 'UNAVAILABLE']),
+            )
+            for i in range(products)
+        ],
+        batch_size=1000,
+    )
+    get_search_backend().rebuild()
+    client = Client()
+    url = reverse('product-list')
+
+    uncached = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-catalog'}
+    default = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+    rows = []
+    for label, catalog in (('uncached', uncached), ('cached', local)):
+        with override_settings(CACHES={'default': default, 'catalog': catalog}):
+            timings = []
+            with Timer() as total:
+                for index in range(requests):
+                    with Timer() as timer:
+                        response = client.get(url, QUERIES[index % len(QUERIES)])
+                    assert response.status_code == 200
+                    timings.append(timer.elapsed * 1000)
+        rows.append((
+            label, requests, f'{requests / total.elapsed:,.1f}',
+            f'{percentile(timings, 50):.2f}', f'{percentile(timings, 95):.2f}',
+        ))
+
+    print(f'{products:,} products, {len(QUERIES)} distinct filter combinations')
+    print_table(('mode', 'requests', 'req/s', 'p50 ms', 'p95 ms'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=20_000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.products, args.requests)
+
+
+if __name__ == '__main__':
+    main()
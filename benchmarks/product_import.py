@@ -0,0 +1,62 @@
+"""Throughput of the streaming CSV product importer on a generated catalog.
+
+    python -m benchmarks.product_import --rows 300000 --chunk-size 1000
+
+The file is imported twice: the first pass inserts every row, the second
+upserts the same names and measures the update path.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from benchmarks.common import Timer, print_table, setup_django
+
+
+def generate_csv(path, rows, invalid_ratio):
+    """Write a synthetic menu in the uploads/food_menu.csv format"""
+    rng = random.Random(rows)
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['name', 'description', 'price', 'status'])
+        for index in range(rows):
+            price = f'{rng.uniform(1, 40):.2f}' if rng.random() >= invalid_ratio else 'n/a'
+            status = rng.choice(['AVAILABLE', 'AVAILABLE', 'UNAVAILABLE'])
+            writer.writerow([f'Dish {index}', f'Generated dish number {index}, with cheese', price, status])
+
+
+def run(rows, chunk_size, invalid_ratio):
+    from product.importer import import_products
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'menu.csv')
+        generate_csv(path, rows, invalid_ratio)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        results = []
+        for label in ('insert', 'upsert'):
+            with Timer() as timer:
+                summary = import_products(path, chunk_size=chunk_size)
+            results.append((
+                label, summary['processed'], summary['inserted'], summary['updated'], summary['rejected'],
+                f'{timer.elapsed:.2f}', f'{summary["processed"] / timer.elapsed:,.0f}',
+            ))
+
+    print(f'{rows:,} rows, {size_mb:.1f} MB, chunk size {chunk_size}')
+    print_table(('pass', 'rows', 'inserted', 'updated', 'rejected', 'seconds', 'rows/s'), results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--invalid-ratio', type=float, default=0.01)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.rows, args.chunk_size, args.invalid_ratio)
+
+
+if __name__ == '__main__':
+    main()
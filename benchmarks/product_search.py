@@ -0,0 +1,86 @@
+"""icontains scans versus the FTS5 product index on a synthetic catalog.
+
+    python -m benchmarks.product_search --products 1000000
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from benchmarks.common import Timer, percentile, print_table, setup_django
+
+ADJECTIVES = ['spicy', 'creamy', 'grilled', 'crispy', 'smoky', 'tangy', 'garlic', 'herbed', 'sweet', 'roasted']
+DISHES = ['chicken', 'paneer', 'noodles', 'burger', 'pizza', 'salad', 'curry', 'tacos', 'risotto', 'dumplings']
+SIDES = ['rice', 'fries', 'naan', 'slaw', 'beans', 'greens', 'bread', 'pickles', 'chutney', 'salsa']
+QUERIES = ['chicken', 'crisp', 'smoky tacos', 'garlic naan', 'risotto greens', '4242']
+
+
+def seed(products, batch_size=10_000):
+    from product.models import Product
+
+    rng = random.Random(products)
+    for start in range(0, products, batch_size):
+        Product.objects.bulk_create([
+            Product(
+                name=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {index}',
+                description=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} served with {rng.choice(SIDES)}',
+                price=Decimal(f'{rng.uniform(1, 40):.2f}'),
+            )
+            for index in range(start, min(start + batch_size, products))
+        ], batch_size=batch_size)
+
+
+def run(products, repeat, page_size):
+    from django.db.models import Q
+
+    from product.models import Product
+    from product.search import get_search_backend
+
+    with Timer() as seeding:
+        seed(products)
+    backend = get_search_backend()
+    with Timer() as indexing:
+        backend.rebuild()
+    print(f'{products:,} products seeded in {seeding.elapsed:.1f}s, indexed in {indexing.elapsed:.1f}s '
+          f'with {type(backend).__name__}')
+
+    def icontains(query):
+        queryset = Product.objects.all()
+        for term in query.split():
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    modes = {
+        'icontains page': lambda query: list(icontains(query).order_by('id')[:page_size]),
+        'icontains count': lambda query: icontains(query).count(),
+        'fts5 ranked page': lambda query: list(
+            backend.rank(Product.objects.all(), query).order_by('search_rank', 'id')[:page_size]
+        ),
+        'fts5 count': lambda query: backend.filter(Product.objects.all(), query).count(),
+    }
+
+    rows = []
+    for query in QUERIES:
+        for label, search in modes.items():
+            timings = []
+            for _ in range(repeat):
+                with Timer() as timer:
+                    search(query)
+                timings.append(timer.elapsed * 1000)
+            rows.append((query, label, f'{percentile(timings, 50):.1f}', f'{percentile(timings, 95):.1f}'))
+
+    print_table(('query', 'mode', 'p50 ms', 'p95 ms'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.products, args.repeat, args.page_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Synthetic, reproducible dataset for the benchmarks.
+
+Products are generated from uploads/food_menu.csv style rows, so names,
+descriptions and prices look like the real catalog; customers, agents and
+orders with items are generated around them.
+"""
+import csv
+import io
+import itertools
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+
+MENU_FILE = Path(__file__).resolve().parent.parent / 'uploads' / 'food_menu.csv'
+ORDER_STATUSES = (('pending', 10), ('assigned', 10), ('delivered', 70), ('cancelled', 10))
+
+
+@dataclass
+class Dataset:
+    """Ids of the seeded rows, for building requests"""
+    admin: object = None
+    customers: list = field(default_factory=list)
+    agents: list = field(default_factory=list)
+    products: list = field(default_factory=list)
+    orders: list = field(default_factory=list)
+
+
+def menu_rows(count, rng, menu_file=MENU_FILE):
+    """count unique food_menu.csv style rows, cycling through the sample menu with varied prices"""
+    with open(menu_file, newline='', encoding='utf-8') as f:
+        menu = list(csv.DictReader(f))
+    for i, row in zip(range(count), itertools.cycle(menu)):
+        batch = i // len(menu)
+        yield {
+            'name': row['name'] if batch == 0 else f"{row['name']} {batch + 1}",
+            'description': row['description'],
+            'price': max(Decimal('0.99'), Decimal(row['price']) + rng.randint(-200, 300) / Decimal(100)),
+            'status': 'UNAVAILABLE' if rng.random() < 0.05 else row['status'],
+        }
+
+
+def seed(customers=200, agents=50, products=2000, orders=5000, items=3, seed=0, menu_file=MENU_FILE):
+    """Insert the dataset with bulk inserts and rebuild the derived tables"""
+    from django.core.management import call_command
+
+    from order.models import Order, OrderProduct
+    from product.models import Product
+    from user.models import UserProfile
+
+    rng = random.Random(seed)
+    data = Dataset()
+    data.admin = UserProfile.objects.create(username='bench-admin', role='ADMIN', is_staff=True)
+    data.customers = UserProfile.objects.bulk_create([
+        UserProfile(username=f'customer{i}', email=f'customer{i}@example.com', first_name=f'Customer {i}',
+                    role='CUSTOMER', password='!')
+        for i in range(customers)
+    ])
+    data.agents = UserProfile.objects.bulk_create([
+        UserProfile(username=f'agent{i}', email=f'agent{i}@example.com', first_name=f'Agent {i}',
+                    role='AGENT', password='!', agent_status=rng.choice(['AVAILABLE', 'UNAVAILABLE']))
+        for i in range(agents)
+    ])
+    data.products = Product.objects.bulk_create(
+        [Product(**row) for row in menu_rows(products, rng, menu_file)], batch_size=1000
+    )
+
+    statuses, weights = zip(*ORDER_STATUSES)
+    order_rows, item_rows = [], []
+    for _ in range(orders):
+        order_status = rng.choices(statuses, weights)[0]
+        lines = [(product, rng.randint(1, 3)) for product in rng.sample(data.products, items)]
+        order_rows.append(Order(
+            customer=rng.choice(data.customers),
+            agent=None if order_status == 'pending' else rng.choice(data.agents),
+            status=order_status, otp_code=f'{rng.randint(0, 999999):06d}',
+            total_amount=sum(product.price * quantity for product, quantity in lines),
+        ))
+        item_rows.append(lines)
+    data.orders = Order.objects.bulk_create(order_rows, batch_size=1000)
+    OrderProduct.objects.bulk_create([
+        OrderProduct(order=order, product=product, quantity=quantity, price=product.price)
+        for order, lines in zip(data.orders, item_rows) for product, quantity in lines
+    ], batch_size=1000)
+
+    call_command('rebuild_product_search', stdout=io.StringIO())
+    call_command('rebuild_customer_stats', stdout=io.StringIO())
+    return data
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import AnonymousUser
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from user.authentication import AsyncJWTAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of DRF's APIView for read-only JSON endpoints. It
+    authenticates with the async ORM and checks the usual DRF permission
+    classes, which only look at request.user. Responses and errors are
+    rendered the way DRF renders them, without a trip to the sync thread pool.
+    """
+    authentication_class = AsyncJWTAuthentication
+    permission_classes = [IsAuthenticated]
+    renderer = JSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, authenticators=())
+        self.request = request
+        try:
+            await self.authenticate(request)
+            self.check_permissions(request)
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.render(response)
+
+    async def authenticate(self, request):
+        """Set request.user from the JWT, or to an anonymous user without one"""
+        self.authenticator = self.authentication_class()
+        result = await self.authenticator.aauthenticate(request)
+        request.user, request.auth = result if result else (AnonymousUser(), None)
+        self.authenticated = result is not None
+
+    def check_permissions(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if not self.authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, exc):
+        """DRF's exception handling, including the WWW-Authenticate challenge"""
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authenticator.authenticate_header(self.request)
+        response = exception_handler(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        return response
+
+    def render(self, response):
+        if isinstance(response, Response) and not response.is_rendered:
+            response.accepted_renderer = self.renderer
+            response.accepted_media_type = self.renderer.media_type
+            response.renderer_context = {'view': self, 'request': self.request, 'response': response}
+            response.render()
+        return response
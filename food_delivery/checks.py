@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose contents other processes never see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, Tags.database)
+def check_primary_pin_cache(app_configs, **kwargs):
+    """
+    A user's pin to the primary must be seen by whichever process serves
+    their next request, so with replicas the default cache has to be shared
+    outside development.
+    """
+    if not settings.DATABASE_REPLICAS or settings.DEBUG or settings.TESTING:
+        return []
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Error(
+            "DATABASE_REPLICAS is set but the default cache is local to each process, so users "
+            "pinned to the primary after a write may read stale data from a replica.",
+            hint="Set CACHE_BACKEND to a shared backend, e.g. django.core.cache.backends.redis.RedisCache.",
+            id='food_delivery.E001',
+        )]
+    return []
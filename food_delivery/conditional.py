@@ -0,0 +1,47 @@
+import hashlib
+
+from rest_framework import status
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Opaque entity tag from the given version parts"""
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def check_conditional(request, etag, last_modified):
+    """
+    Quote the validators and evaluate the request's preconditions against them.
+    Returns (response, etag, timestamp); response is a 304/412 or None.
+    """
+    etag = quote_etag(etag) if etag else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), etag, timestamp
+
+
+def set_validators(response, etag, timestamp):
+    """Add ETag and Last-Modified to successful and Not Modified responses"""
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        if etag:
+            response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with ETag and Last-Modified headers, and with
+    304 Not Modified before any serialization when the client's copy is current.
+    """
+
+    def get_validators(self):
+        """Return (etag, last_modified) for the current request, either may be None"""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        response, etag, timestamp = check_conditional(request, *self.get_validators())
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, timestamp)
@@ -0,0 +1,155 @@
+"""In-process request metrics, exported in the Prometheus text format"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Any other request method is recorded as "other", so clients cannot create series at will
+METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+# Name, help text and sample field of each summary exported per view
+SUMMARIES = (
+    ('http_request_duration_seconds', 'Request wall time', 'duration'),
+    ('http_request_db_queries', 'Database queries per request', 'queries'),
+    ('http_request_db_duration_seconds', 'Database time per request', 'db_duration'),
+    ('http_response_size_bytes', 'Response body size', 'size'),
+)
+
+
+class QueryTimer:
+    """connection.execute_wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# Timer of the request being handled; context variables follow async ORM calls into their threads
+_query_timer = ContextVar('query_timer', default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper feeding the current request's QueryTimer, if any"""
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timing(sender=None, connection=None, **kwargs):
+    """Add time_queries to a connection's wrappers, also usable as a connection_created receiver"""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+@contextmanager
+def collect_queries():
+    """Count the queries run in this context, in any thread, into a new QueryTimer"""
+    timer = QueryTimer()
+    token = _query_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _query_timer.reset(token)
+
+
+class ViewMetrics:
+    """Totals since start plus a ring buffer of the most recent samples for one view"""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.totals = defaultdict(float)
+        self.count = 0
+        self.statuses = defaultdict(int)
+
+    def add(self, status, sample):
+        self.samples.append(sample)
+        self.count += 1
+        self.statuses[status] += 1
+        for field, value in sample.items():
+            self.totals[field] += value
+
+
+class MetricsRegistry:
+    """Thread-safe per (URL name, method) request metrics"""
+
+    def __init__(self, window=None):
+        self.window = window
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, method, status, duration, queries, db_duration, size):
+        sample = {'duration': duration, 'queries': queries, 'db_duration': db_duration, 'size': size}
+        method = method if method in METHODS else 'other'
+        with self.lock:
+            metrics = self.views.get((view, method))
+            if metrics is None:
+                metrics = self.views[(view, method)] = ViewMetrics(self.window or settings.REQUEST_METRICS_WINDOW)
+            metrics.add(status, sample)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def snapshot(self):
+        """Copy of the current metrics, so exporting does not hold the lock"""
+        with self.lock:
+            return {
+                key: (list(m.samples), dict(m.totals), m.count, dict(m.statuses))
+                for key, m in self.views.items()
+            }
+
+    def export(self):
+        """Render every metric in the Prometheus text exposition format"""
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            '# HELP http_requests_total Requests by URL name, method and status',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method), (_, _, _, statuses) in snapshot:
+            for status, count in sorted(statuses.items()):
+                lines.append(f'http_requests_total{labels(view=view, method=method, status=status)} {count}')
+
+        for name, help_text, field in SUMMARIES:
+            lines += [f'# HELP {name} {help_text}, quantiles over the last requests', f'# TYPE {name} summary']
+            for (view, method), (samples, totals, count, _) in snapshot:
+                values = sorted(sample[field] for sample in samples)
+                for q in QUANTILES:
+                    lines.append(f'{name}{labels(view=view, method=method, quantile=q)} {nearest_rank(values, q):g}')
+                lines.append(f'{name}_sum{labels(view=view, method=method)} {totals.get(field, 0):g}')
+                lines.append(f'{name}_count{labels(view=view, method=method)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def nearest_rank(ordered, q):
+    """Nearest-rank quantile of sorted values"""
+    if not ordered:
+        return 0
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+def escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    """Prometheus label set"""
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in values.items()) + '}'
+
+
+registry = MetricsRegistry()
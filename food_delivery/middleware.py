@@ -0,0 +1,96 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.permissions import SAFE_METHODS
+
+from food_delivery.metrics import collect_queries, install_query_timing, registry
+from food_delivery.routers import apin_to_primary, pin_to_primary
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, database queries, database time and response size per
+    resolved URL name. Disabled by REQUEST_METRICS_ENABLED = False.
+    Works natively in both sync and async stacks, so it never forces async
+    views onto the sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        # Connections opened from now on, in any thread, plus the ones already open here
+        connection_created.connect(install_query_timing, dispatch_uid='request_metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_timing(connection=connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with collect_queries() as timer:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with collect_queries() as timer:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def record(self, request, response, duration, timer):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, timer.count, timer.duration, size)
+
+
+class PrimaryAfterWriteMiddleware:
+    """
+    Pin an authenticated user's reads to the primary database for
+    DATABASE_REPLICA_STICKY_SECONDS after any unsafe request they make, so
+    they read their own writes despite replica lag. See food_delivery.routers.
+    The user is read after the view, once DRF has authenticated it.
+    Needs a shared default cache, see food_delivery.checks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.wrote(request):
+            pin_to_primary(request.user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request):
+            await apin_to_primary(request.user)
+        return response
+
+    def wrote(self, request):
+        user = getattr(request, 'user', None)
+        return (
+            bool(settings.DATABASE_REPLICAS) and request.method not in SAFE_METHODS
+            and user is not None and user.is_authenticated
+        )
@@ -0,0 +1,28 @@
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key with opaque cursors"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'id'
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, loading the page on the ORM's thread"""
+        return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+
+class CreatedAtCursorPagination(IdCursorPagination):
+    """Keyset pagination over (created_at, id), newest first"""
+    ordering = ('-created_at', '-id')
+
+
+class SearchRankCursorPagination(IdCursorPagination):
+    """Keyset pagination over id, or over (search_rank, id) for ranked search results"""
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return ('search_rank', 'id')
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,35 @@
+"""Query plan checks used by the index regression tests"""
+import re
+
+from django.db import connections
+
+# Plan lines naming a table read in full, per database vendor
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)$', re.MULTILINE),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+
+
+def supports_plan_checks(using='default'):
+    """Whether full scans can be detected on this database"""
+    return connections[using].vendor in FULL_SCAN_PATTERNS
+
+
+def analyze(using='default'):
+    """Refresh planner statistics so plans reflect the seeded data"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def full_table_scans(queryset):
+    """Tables the database reads in full to run the queryset"""
+    pattern = FULL_SCAN_PATTERNS[connections[queryset.db].vendor]
+    return pattern.findall(queryset.explain())
+
+
+class QueryPlanAssertionsMixin:
+    """TestCase mixin asserting that querysets are served by indexes"""
+
+    def assertNoFullScan(self, queryset):
+        scans = full_table_scans(queryset)
+        self.assertFalse(scans, f"Full scan of {', '.join(scans)}:\n{queryset.explain()}")
@@ -0,0 +1,101 @@
+"""Read replica routing for views that opt in, see settings.DATABASE_REPLICAS"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Whether reads of the current request may go to a replica; context variables follow async ORM calls into their threads
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random replica while replica reads are enabled for the
+    current context, and everything else to the primary. Replicas are kept
+    in step by the database itself, so they are never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        # Also for instances loaded from a replica, whose related objects would otherwise follow them
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route the reads made in this context to replicas, or back to the primary"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_pin_key(user_id):
+    return f"db:primary:{user_id}"
+
+
+def pin_to_primary(user):
+    """Keep the user's reads on the primary while their writes may not have reached the replicas"""
+    cache.set(primary_pin_key(user.id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+async def apin_to_primary(user):
+    await cache.aset(primary_pin_key(user.id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def can_read_replica(request):
+    """Safe request from a user who has not written within the sticky window"""
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+        return False
+    user = request.user
+    return not (user.is_authenticated and cache.get(primary_pin_key(user.id)))
+
+
+async def acan_read_replica(request):
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+        return False
+    user = request.user
+    return not (user.is_authenticated and await cache.aget(primary_pin_key(user.id)))
+
+
+class ReplicaReadMixin:
+    """
+    Serve a DRF view's safe requests from a replica. Authentication runs on
+    the primary; the choice is made once the user is known.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(False):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Only lasts until dispatch resets the variable
+        _replica_reads.set(can_read_replica(request))
+
+
+class AsyncReplicaReadMixin:
+    """ReplicaReadMixin for food_delivery.async_views.AsyncAPIView"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        with replica_reads(False):
+            return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        await super().authenticate(request)
+        _replica_reads.set(await acan_read_replica(request))
@@ -21,6 +21,9 @@ DEBUG = os.getenv("DEBUG") == "True"
 
 ALLOWED_HOSTS = []
 
+# True only in food_delivery.test_settings, which the test suite runs with
+TESTING = False
+
 
 # Application definition
 
@@ -34,17 +37,21 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'rest_framework_simplejwt',
+    'channels',
     'user',
     'product',
     'order',
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'food_delivery.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'food_delivery.middleware.PrimaryAfterWriteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'food_delivery.wsgi.application'
+ASGI_APPLICATION = 'food_delivery.asgi.application'
 
 
 # Database
@@ -77,9 +85,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite has no row locks; taking the write lock when a transaction
+        # begins lets concurrent writers queue on the busy timeout instead of
+        # failing with "database is locked" when they upgrade mid-transaction.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Read replicas, served to views using food_delivery.routers.ReplicaReadMixin.
+# DATABASE_REPLICA_PATHS lists SQLite files standing in for replicas locally, e.g. copies
+# of db.sqlite3 or db.sqlite3 itself; under test they mirror the default database.
+DATABASES.update({
+    f'replica{index}': {**DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'}}
+    for index, path in enumerate(filter(None, os.getenv("DATABASE_REPLICA_PATHS", "").split(',')), start=1)
+})
+# Aliases reads are spread over
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['food_delivery.routers.ReplicaRouter']
+# Seconds a user's reads stay on the primary after they write, covering replica lag
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", 10))
+
+
+# Cache
+# "default" holds notification dedup keys, "catalog" the public product listings and their version.
+# Point both at a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when running several processes;
+# outside DEBUG a process-local catalog cache fails the product.E001 system check, and with DATABASE_REPLICAS
+# a process-local default cache, which holds the primary pins, fails food_delivery.E001.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CACHE_LOCATION", 'default'),
+    },
+    'catalog': {
+        'BACKEND': os.getenv("CATALOG_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CATALOG_CACHE_LOCATION", 'catalog'),
+        'TIMEOUT': int(os.getenv("CATALOG_CACHE_TIMEOUT", 300)),
+    },
+}
+
+# Products whose price and status each process keeps for pricing orders, see product.prices
+PRICE_TABLE_MAX_PRODUCTS = int(os.getenv("PRICE_TABLE_MAX_PRODUCTS", 10000))
+# Seconds before the table is reloaded even without a catalog version bump
+PRICE_TABLE_TIMEOUT = int(os.getenv("PRICE_TABLE_TIMEOUT", 30))
+
+
+# Channels
+# Order status events are pushed to WebSocket clients through this layer, see order.events.
+# Every ASGI process must share it, so outside tests it lives in Redis by default.
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': os.getenv("CHANNEL_LAYER_BACKEND", 'channels_redis.core.RedisChannelLayer'),
+        'CONFIG': {'hosts': [os.getenv("CHANNEL_LAYER_REDIS_URL", 'redis://localhost:6379/1')]},
+    },
+}
+if CHANNEL_LAYERS['default']['BACKEND'] == 'channels.layers.InMemoryChannelLayer':
+    CHANNEL_LAYERS['default'] = {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -124,10 +190,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Seconds a user's role, status and active flag are cached for token revocation checks,
+# see user.authentication. Saving or deleting the user invalidates the entry.
+AUTH_USER_STATE_TIMEOUT = int(os.getenv("AUTH_USER_STATE_TIMEOUT", 60))
+
 DEFAULTS = {
    
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv("JWT_ACCESS_TOKEN_LIFETIME", 10))),
@@ -145,6 +215,9 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Notifications sharing an event and order id are sent once within this window (seconds)
+NOTIFICATION_DEDUP_TIMEOUT = int(os.getenv("NOTIFICATION_DEDUP_TIMEOUT", 86400))
+
 # Media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -154,4 +227,43 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER") == "True"
+
+# Per URL name request metrics served at /metrics/, see food_delivery.metrics
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "True") == "True"
+# Recent requests per URL name kept for the exported quantiles
+REQUEST_METRICS_WINDOW = int(os.getenv("REQUEST_METRICS_WINDOW", 1000))
+
+# Automatic order dispatch, see order.dispatch
+ORDER_DISPATCH_INTERVAL = float(os.getenv("ORDER_DISPATCH_INTERVAL", 30))
+ORDER_DISPATCH_BATCH_SIZE = int(os.getenv("ORDER_DISPATCH_BATCH_SIZE", 500))
+ORDER_DISPATCH_MAX_PER_TICK = int(os.getenv("ORDER_DISPATCH_MAX_PER_TICK", 5000))
+ORDER_DISPATCH_LOCK_TIMEOUT = int(os.getenv("ORDER_DISPATCH_LOCK_TIMEOUT", 300))
+# Dotted path to a scorer(order, agent) callable, empty for plain FIFO matching
+ORDER_DISPATCH_SCORER = os.getenv("ORDER_DISPATCH_SCORER", "")
+
+# Most orders one batch create request may submit, see order.views.OrderBatchCreateView
+ORDER_BATCH_MAX_ORDERS = int(os.getenv("ORDER_BATCH_MAX_ORDERS", 500))
+# Most orders one admin bulk cancel, reassign or status change may touch, see order.bulk
+ORDER_BULK_MAX_ORDERS = int(os.getenv("ORDER_BULK_MAX_ORDERS", 1000))
+
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-pending-orders': {
+        'task': 'order.tasks.dispatch_pending_orders',
+        'schedule': ORDER_DISPATCH_INTERVAL,
+    },
+}
+
+# Rows validated and upserted per transaction by the CSV product importer
+PRODUCT_IMPORT_CHUNK_SIZE = int(os.getenv("PRODUCT_IMPORT_CHUNK_SIZE", 1000))
+# Uploaded CSV files are split into record-aligned shards of about this many bytes, one Celery task each
+PRODUCT_IMPORT_SHARD_SIZE = int(os.getenv("PRODUCT_IMPORT_SHARD_SIZE", 8 * 1024 * 1024))
+PRODUCT_UPLOAD_DIR = BASE_DIR / 'uploads'
+# Seconds the progress rows of an upload are kept, see product.uploads
+PRODUCT_UPLOAD_PROGRESS_TIMEOUT = 86400
+
+# Product full text search backend per database vendor, see product.search
+PRODUCT_SEARCH_BACKENDS = {
+    'sqlite': 'product.search.SQLiteFTSSearchBackend',
+}
 
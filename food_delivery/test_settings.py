@@ -0,0 +1,18 @@
+"""
+Settings for the test suite, the default of manage.py test. Other runners
+select them with DJANGO_SETTINGS_MODULE=food_delivery.test_settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import CHANNEL_LAYERS, DATABASES
+
+TESTING = True
+
+# Mirrors default; tests that exercise replicas enable it with override_settings
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = []
+
+CHANNEL_LAYERS['default'] = {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_STORE_EAGER_RESULT = True
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from food_delivery.metrics import registry
+from product.cache import get_catalog_cache
+from product.models import Product
+from user.models import UserProfile
+
+
+class RequestMetricsTests(APITestCase):
+    """Tests for the request metrics middleware and endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        Product.objects.create(name='Dosa', price=Decimal('3.00'))
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_metrics_recorded_per_url_name(self):
+        """Requests are counted per URL name with queries, timings and sizes"""
+        self.client.force_authenticate(self.admin)
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="product-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_request_db_queries_count{view="product-list",method="GET"} 2', body)
+        self.assertIn('http_request_duration_seconds{view="product-list",method="GET",quantile="0.99"}', body)
+        self.assertIn('price_table_lookups_total{result="hit"}', body)
+        samples = registry.snapshot()[('product-list', 'GET')][0]
+        self.assertGreater(samples[0]['queries'], 0)
+        self.assertGreater(samples[0]['size'], 0)
+
+    def test_unknown_methods_share_one_series(self):
+        """Arbitrary request methods cannot create new series"""
+        self.client.generic('BREW', reverse('product-list'))
+        self.client.generic('PROPFIND', reverse('product-list'))
+
+        self.assertEqual([method for _, method in registry.snapshot()], ['other'])
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.force_authenticate(self.customer)
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_can_be_disabled(self):
+        with override_settings(REQUEST_METRICS_ENABLED=False):
+            client = APIClient()
+            client.get(reverse('product-list'))
+
+        self.assertEqual(registry.snapshot(), {})
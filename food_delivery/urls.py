@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from food_delivery.views import MetricsView
 
 
 
@@ -13,6 +14,7 @@ urlpatterns = [
     path("user/", include("user.urls")),
     path("api/products/", include("product.urls")),
     path("api/order/", include("order.urls")),
+    path("metrics/", MetricsView.as_view(), name='metrics'),
 
 ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
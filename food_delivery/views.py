@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from food_delivery.metrics import registry
+from product.prices import price_table
+from user.permissions import IsAdminUser
+
+
+class MetricsView(APIView):
+    """Admin only request and price table metrics in the Prometheus text format"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Export the collected metrics"""
+        return HttpResponse(registry.export() + price_table.export(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderProduct
+from .models import Order, OrderProduct, CustomerOrderStats
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -13,3 +13,10 @@ class OrderProductAdmin(admin.ModelAdmin):
     """Register order product model in Admin"""
     list_display = ('id','order', 'product', 'quantity','price')
     search_fields = ('order', 'product')
+
+
+@admin.register(CustomerOrderStats)
+class CustomerOrderStatsAdmin(admin.ModelAdmin):
+    """Register customer order statistics in Admin"""
+    list_display = ('customer', 'delivered_orders', 'total_amount', 'updated_at')
+    search_fields = ('customer__email',)
@@ -0,0 +1,155 @@
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils.timezone import now
+
+from order.dispatch import DispatchConflict, lock_rows, plan_assignments
+from order.events import publish_order_events
+from order.models import CustomerOrderStats, Order
+from order.notifications import assignment_email, cancellation_emails
+from order.services import (
+    TRANSITIONS, AgentUnavailable, InvalidTransition, OrderNotFound, OrderNotReassignable, OrderServiceError,
+    check_transition,
+)
+from user.models import UserProfile
+from user.utils import send_order_emails
+
+REASSIGNABLE_STATUSES = ('pending', 'assigned')
+
+# Statuses an admin may move orders to, see order.services.TRANSITIONS
+ADMIN_TARGETS = sorted({target for (_, target), actors in TRANSITIONS.items() if 'admin' in actors})
+
+
+def lock_orders(queryset):
+    """Lock the selected orders, and only them, until the transaction ends, where supported"""
+    if connection.features.has_select_for_update_of:
+        return queryset.select_for_update(of=('self',))
+    return queryset.select_for_update()
+
+
+def failure(order_id, error):
+    return {'order_id': order_id, 'error': str(error)}
+
+
+def summary(succeeded, failed):
+    """Per order outcome of a bulk operation"""
+    return {
+        'succeeded': [order.id for order in succeeded],
+        'failed': sorted(failed, key=lambda item: item['order_id']),
+    }
+
+
+def select_orders(order_ids):
+    """Lock and load the orders, returns (orders, failures for the ids that do not exist)"""
+    orders = list(lock_orders(Order.objects.filter(id__in=order_ids).select_related('customer', 'agent').order_by('id')))
+    found = {order.id for order in orders}
+    return orders, [failure(order_id, OrderNotFound()) for order_id in dict.fromkeys(order_ids) if order_id not in found]
+
+
+def bulk_cancel(order_ids, reason):
+    """
+    Cancel the orders as an admin in one transaction: one UPDATE for the
+    orders, one freeing their agents and one adjusting the statistics of
+    customers whose delivered orders were cancelled. Orders the state machine
+    does not allow to be cancelled are reported and left untouched.
+    """
+    with transaction.atomic():
+        orders, failed = select_orders(order_ids)
+        cancelled = []
+        for order in orders:
+            try:
+                check_transition(order, 'cancelled', 'admin')
+            except OrderServiceError as e:
+                failed.append(failure(order.id, e))
+                continue
+            cancelled.append(order)
+        if not cancelled:
+            return summary(cancelled, failed)
+
+        delivered = [order for order in cancelled if order.status == 'delivered']
+        freed = {order.agent_id for order in cancelled if order.agent_id and order.status != 'delivered'}
+        updated_at = now()
+        Order.objects.filter(id__in=[order.id for order in cancelled]) \
+            .update(status='cancelled', cancel_reason=reason, updated_at=updated_at)
+        if delivered:
+            CustomerOrderStats.record_cancellations(delivered)
+        if freed:
+            UserProfile.objects.filter(id__in=freed).update(agent_status='AVAILABLE')
+
+        for order in cancelled:
+            order.status, order.cancel_reason, order.updated_at = 'cancelled', reason, updated_at
+        send_order_emails({order.id: cancellation_emails(order) for order in cancelled}, event='order_cancelled')
+        publish_order_events(cancelled, 'cancelled')
+    return summary(cancelled, failed)
+
+
+def bulk_reassign(order_ids, agent_ids=None, pending_only=False):
+    """
+    Move pending or assigned orders to available agents, oldest order first,
+    optionally choosing only among agent_ids. Agents already on the selected
+    orders are not candidates, and are freed once their order moves. Orders
+    left without an agent are reported as failures, as are all the matched
+    orders when one of their agents was booked concurrently. With
+    pending_only, this assigns agents to pending orders and rejects assigned
+    ones.
+    """
+    statuses, error = (('pending',), InvalidTransition('assigned')) if pending_only else \
+        (REASSIGNABLE_STATUSES, OrderNotReassignable())
+    with transaction.atomic():
+        orders, failed = select_orders(order_ids)
+        movable = []
+        for order in orders:
+            if order.status in statuses:
+                movable.append(order)
+            else:
+                failed.append(failure(order.id, error))
+
+        agents = UserProfile.objects.filter(role='AGENT', status='ACTIVE', agent_status='AVAILABLE') \
+            .exclude(id__in=[order.agent_id for order in movable if order.agent_id])
+        if agent_ids is not None:
+            agents = agents.filter(id__in=agent_ids)
+        agents = list(lock_rows(agents.only('id', 'first_name', 'email').order_by('id'))[:len(movable)])
+
+        pairs = plan_assignments(sorted(movable, key=lambda order: (order.created_at, order.id)), agents)
+        matched = {order.id for order, _ in pairs}
+        failed += [failure(order.id, AgentUnavailable()) for order in movable if order.id not in matched]
+        if not pairs:
+            return summary([], failed)
+
+        previous = {order.id: order.agent_id for order, _ in pairs if order.agent_id}
+        updated_at = now()
+        try:
+            with transaction.atomic():
+                # Claimed only while still available, as in order.services.assign_agent
+                claimed = UserProfile.objects.filter(id__in=[agent.id for _, agent in pairs], agent_status='AVAILABLE') \
+                    .update(agent_status='UNAVAILABLE')
+                if claimed != len(pairs):
+                    raise DispatchConflict()
+                Order.objects.filter(id__in=matched).update(
+                    agent=Case(*(When(id=order.id, then=Value(agent.id)) for order, agent in pairs)),
+                    status='assigned', updated_at=updated_at,
+                )
+        except DispatchConflict:
+            # An agent was booked elsewhere since being selected; the orders keep their agents
+            failed += [failure(order.id, AgentUnavailable()) for order, _ in pairs]
+            return summary([], failed)
+        if previous:
+            UserProfile.objects.filter(id__in=set(previous.values())).update(agent_status='AVAILABLE')
+
+        for order, agent in pairs:
+            order.agent, order.status, order.updated_at = agent, 'assigned', updated_at
+        # Keyed by agent too, so moving an order again notifies its next agent
+        send_order_emails(
+            {f"{order.id}:{agent.id}": [assignment_email(order, agent)] for order, agent in pairs},
+            event='agent_assigned',
+        )
+        publish_order_events([order for order, _ in pairs], 'assigned', previous_agents=previous)
+    return summary([order for order, _ in pairs], failed)
+
+
+def bulk_change_status(order_ids, target, reason=None):
+    """Move the orders to any status an admin may set, see ADMIN_TARGETS"""
+    if target == 'cancelled':
+        return bulk_cancel(order_ids, reason)
+    if target == 'assigned':
+        return bulk_reassign(order_ids, pending_only=True)
+    raise ValueError(f"Admins cannot move orders to {target}")
@@ -0,0 +1,62 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from order.events import agent_group, order_event, order_group
+from order.models import Order
+from order.services import get_actor
+
+# Close codes sent after accepting, so clients can tell why they were dropped
+UNAUTHENTICATED, FORBIDDEN, NOT_FOUND = 4401, 4403, 4404
+
+
+class OrderEventsConsumer(AsyncJsonWebsocketConsumer):
+    """Base consumer relaying order events from one channel layer group"""
+    group = None
+
+    async def refuse(self, code):
+        await self.accept()
+        await self.close(code=code)
+
+    async def follow(self, group):
+        self.group = group
+        await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group:
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def order_event(self, message):
+        await self.send_json(message['event'])
+
+
+class OrderConsumer(OrderEventsConsumer):
+    """Status changes of one order, for its customer, its agent and admins"""
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            return await self.refuse(UNAUTHENTICATED)
+        try:
+            order = await Order.objects.aget(id=self.scope['url_route']['kwargs']['order_id'])
+        except Order.DoesNotExist:
+            return await self.refuse(NOT_FOUND)
+        if get_actor(user, order) is None:
+            return await self.refuse(FORBIDDEN)
+
+        await self.follow(order_group(order.id))
+        # The current state first, so clients need no initial poll
+        await self.send_json(order_event(order, 'snapshot'))
+
+
+class AgentConsumer(OrderEventsConsumer):
+    """Orders assigned to, cancelled on or delivered by one agent"""
+
+    async def connect(self):
+        user = self.scope['user']
+        agent_id = self.scope['url_route']['kwargs']['agent_id']
+        if not user.is_authenticated:
+            return await self.refuse(UNAUTHENTICATED)
+        if not (user.is_staff or (user.role == 'AGENT' and user.id == agent_id)):
+            return await self.refuse(FORBIDDEN)
+
+        await self.follow(agent_group(agent_id))
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from order.events import publish_order_events
+from order.models import Order
+from order.notifications import assignment_email
+from user.models import UserProfile
+from user.utils import send_order_emails
+
+DISPATCH_LOCK_KEY = "order-dispatch:lock"
+
+
+def get_scorer(path=None):
+    """Return the configured scorer callable, or None for plain FIFO matching"""
+    path = path or settings.ORDER_DISPATCH_SCORER
+    return import_string(path) if path else None
+
+
+class DispatchConflict(Exception):
+    """Another dispatcher or an admin claimed rows of the batch first"""
+
+
+def lock_rows(queryset):
+    """
+    Lock the selected rows, skipping rows another dispatcher holds where
+    supported, and otherwise waiting for them.
+    """
+    features = connection.features
+    if features.has_select_for_update_skip_locked and features.has_select_for_update_of:
+        return queryset.select_for_update(skip_locked=True, of=('self',))
+    return queryset.select_for_update()
+
+
+def plan_assignments(orders, agents, scorer=None):
+    """
+    Match orders, oldest first, to agents in a single pass. Without a scorer
+    agents are taken in the order given; a scorer(order, agent) callable picks
+    the highest scoring remaining agent for each order instead.
+    """
+    if scorer is None:
+        return list(zip(orders, agents))
+    remaining = list(agents)
+    pairs = []
+    for order in orders:
+        if not remaining:
+            break
+        best = max(range(len(remaining)), key=lambda i: scorer(order, remaining[i]))
+        pairs.append((order, remaining.pop(best)))
+    return pairs
+
+
+def dispatch_batch(limit, scorer=None):
+    """
+    Assign up to limit pending orders in one transaction, returns (assigned,
+    pending seen). The orders and agents are claimed with conditional UPDATEs;
+    if any was claimed concurrently the whole batch is rolled back.
+    """
+    try:
+        return claim_batch(limit, scorer)
+    except DispatchConflict:
+        # Nothing was written; the orders are retried on the next tick
+        return 0, limit
+
+
+def claim_batch(limit, scorer):
+    with transaction.atomic():
+        orders = list(lock_rows(
+            Order.objects.filter(status='pending', agent__isnull=True)
+            .select_related('customer').only('id', 'created_at', 'total_amount', 'customer__first_name')
+            .order_by('created_at', 'id')
+        )[:limit])
+        if not orders:
+            return 0, 0
+        agents = list(lock_rows(
+            UserProfile.objects.filter(role='AGENT', status='ACTIVE', agent_status='AVAILABLE')
+            .only('id', 'first_name', 'email').order_by('id')
+        )[:limit])
+        pairs = plan_assignments(orders, agents, scorer)
+        if not pairs:
+            return 0, len(orders)
+
+        claimed = UserProfile.objects.filter(id__in=[agent.id for _, agent in pairs], agent_status='AVAILABLE') \
+            .update(agent_status='UNAVAILABLE')
+        if claimed != len(pairs):
+            raise DispatchConflict()
+        # One UPDATE for the whole batch; only the agent differs per row
+        updated_at = now()
+        updated = Order.objects.filter(id__in=[order.id for order, _ in pairs], status='pending', agent__isnull=True).update(
+            agent=Case(*(When(id=order.id, then=Value(agent.id)) for order, agent in pairs)),
+            status='assigned', updated_at=updated_at,
+        )
+        if updated != len(pairs):
+            raise DispatchConflict()
+
+        for order, agent in pairs:
+            order.agent_id, order.status, order.updated_at = agent.id, 'assigned', updated_at
+        publish_order_events([order for order, _ in pairs], 'assigned')
+
+        send_order_emails({order.pk: [assignment_email(order, agent)] for order, agent in pairs}, event='agent_assigned')
+    return len(pairs), len(orders)
+
+
+def dispatch_pending_orders(batch_size=None, max_orders=None, scorer=None):
+    """
+    Match pending, unassigned orders to available agents in batches of
+    batch_size until either runs out or max_orders have been assigned.
+    Each batch holds at most batch_size rows of each kind in memory.
+    """
+    batch_size = batch_size or settings.ORDER_DISPATCH_BATCH_SIZE
+    max_orders = max_orders or settings.ORDER_DISPATCH_MAX_PER_TICK
+    summary = {'assigned': 0, 'batches': 0}
+    while summary['assigned'] < max_orders:
+        assigned, seen = dispatch_batch(min(batch_size, max_orders - summary['assigned']), scorer)
+        summary['batches'] += 1
+        summary['assigned'] += assigned
+        if not seen or assigned < seen:
+            # Out of pending orders or of free agents
+            break
+    return summary
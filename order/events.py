@@ -0,0 +1,51 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def order_group(order_id):
+    """Channel layer group of the sockets following one order"""
+    return f"order.{order_id}"
+
+
+def agent_group(agent_id):
+    """Channel layer group of an agent's sockets"""
+    return f"agent.{agent_id}"
+
+
+def order_event(order, event):
+    """Message pushed to subscribers about the order's current state"""
+    return {
+        'event': event,
+        'order_id': order.id,
+        'status': order.status,
+        'agent': order.agent_id,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+def publish_order_events(orders, event, previous_agents=None):
+    """
+    Push the event for each order to its order group and its agent's group once
+    the current transaction commits. previous_agents, {order id: agent id}, also
+    tells agents who lost an order. All messages go out in one batch; failing
+    to deliver them never fails the change that caused them.
+    """
+    previous_agents = previous_agents or {}
+    messages = []
+    for order in orders:
+        message = {'type': 'order.event', 'event': order_event(order, event)}
+        messages.append((order_group(order.id), message))
+        if order.agent_id:
+            messages.append((agent_group(order.agent_id), message))
+        if previous_agents.get(order.id) not in (None, order.agent_id):
+            messages.append((agent_group(previous_agents[order.id]), message))
+
+    async def send():
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        for group, message in messages:
+            await layer.group_send(group, message)
+
+    transaction.on_commit(async_to_sync(send), robust=True)
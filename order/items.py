@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from order.models import OrderProduct
+
+
+def diff_items(existing, incoming):
+    """
+    Plan the changes turning the existing OrderProduct rows into the incoming
+    items, dicts with product_id, quantity and price. Rows are matched per
+    product, identical ones first, so unchanged rows are left alone, changed
+    ones are updated in place and only the surplus is inserted or deleted.
+    Returns (rows to create, rows to update, rows to delete).
+    """
+    rows = defaultdict(list)
+    for row in existing:
+        rows[row.product_id].append(row)
+
+    changed = []
+    for item in incoming:
+        candidates = rows[item['product_id']]
+        same = next(
+            (row for row in candidates if (row.quantity, row.price) == (item['quantity'], item['price'])), None
+        )
+        if same is not None:
+            candidates.remove(same)
+        else:
+            changed.append(item)
+
+    to_create, to_update = [], []
+    for item in changed:
+        candidates = rows[item['product_id']]
+        if candidates:
+            row = candidates.pop(0)
+            row.quantity, row.price = item['quantity'], item['price']
+            to_update.append(row)
+        else:
+            to_create.append(OrderProduct(**item))
+    to_delete = [row for candidates in rows.values() for row in candidates]
+    return to_create, to_update, to_delete
+
+
+def sync_items(order, items):
+    """
+    Replace the items of the order with the given ones, issuing at most one
+    DELETE, one UPDATE and one INSERT. Call inside a transaction.
+    """
+    to_create, to_update, to_delete = diff_items(order.items.all(), items)
+    if to_delete:
+        OrderProduct.objects.filter(id__in=[row.id for row in to_delete]).delete()
+    if to_update:
+        OrderProduct.objects.bulk_update(to_update, ['quantity', 'price'])
+    if to_create:
+        for row in to_create:
+            row.order = order
+        OrderProduct.objects.bulk_create(to_create)
+    return to_create, to_update, to_delete
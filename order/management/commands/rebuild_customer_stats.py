@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from order.stats import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    """Rebuild the CustomerOrderStats table from delivered orders"""
+    help = "Rebuild per-customer delivered order statistics from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_customer_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {count} customers"))
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def populate_customer_stats(apps, schema_editor):
+    """Statistics for the orders delivered before CustomerOrderStats existed"""
+    from order.stats import rebuild_customer_stats
+
+    rebuild_customer_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_customer_stats, migrations.RunPython.noop),
+    ]
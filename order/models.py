@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils.timezone import now
 from user.models import UserProfile
 from product.models import Product
 
@@ -25,9 +27,23 @@ class Order(models.Model):
     payment_mode = models.CharField(max_length=20, choices=PAYMENT_MODES, default='cod')
     cancel_reason =  models.CharField(max_length=100,blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of order lists, see food_delivery.pagination.CreatedAtCursorPagination
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            # Status filters; created_at keeps the dispatcher's FIFO scan on the index
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['customer', 'status'], name='order_customer_status_idx'),
+            models.Index(fields=['agent', 'status'], name='order_agent_status_idx'),
+        ]
 
     def __str__(self):
         return str(self.id)
+
+    def get_items_total(self):
+        """Sum of quantity * price over the order items"""
+        return self.items.aggregate(total=Sum(F('quantity') * F('price')))['total'] or 0
     
      
 class OrderProduct(models.Model):
@@ -42,4 +58,55 @@ class OrderProduct(models.Model):
 
     def get_total_price(self):
         """Calculate total price for the product in the order"""
-        return float(self.quantity * self.price) 
+        return self.quantity * self.price
+
+
+class CustomerOrderStats(models.Model):
+    """Delivered order statistics per customer, maintained incrementally"""
+    customer = models.OneToOneField(UserProfile, on_delete=models.CASCADE, primary_key=True, related_name='order_stats')
+    delivered_orders = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for customer {self.customer_id}"
+
+    @classmethod
+    def record_delivery(cls, order):
+        """Count a newly delivered order"""
+        cls._increment(order.customer_id, 1, order.get_items_total())
+
+    @classmethod
+    def record_cancellation(cls, order):
+        """Remove a previously delivered order that has been cancelled"""
+        cls._increment(order.customer_id, -1, -order.get_items_total())
+
+    @classmethod
+    def record_cancellations(cls, orders):
+        """Remove several previously delivered orders, with one UPDATE per customer"""
+        totals = dict(
+            OrderProduct.objects.filter(order__in=[order.id for order in orders])
+            .values_list('order_id').annotate(total=Sum(F('quantity') * F('price')))
+        )
+        per_customer = {}
+        for order in orders:
+            count, amount = per_customer.get(order.customer_id, (0, 0))
+            per_customer[order.customer_id] = count + 1, amount + (totals.get(order.id) or 0)
+        for customer_id, (count, amount) in per_customer.items():
+            cls._increment(customer_id, -count, -amount)
+
+    @classmethod
+    def _increment(cls, customer_id, orders, amount):
+        """Add to a customer's counters with a single UPDATE, creating the row on first use"""
+        values = {
+            'delivered_orders': F('delivered_orders') + orders,
+            'total_amount': F('total_amount') + amount,
+            'updated_at': now(),
+        }
+        if cls.objects.filter(customer_id=customer_id).update(**values):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(customer_id=customer_id, delivered_orders=max(orders, 0), total_amount=max(amount, 0))
+        except IntegrityError:
+            cls.objects.filter(customer_id=customer_id).update(**values)
@@ -0,0 +1,24 @@
+def otp_email(order):
+    """(subject, message, recipient) giving the customer the order's delivery OTP"""
+    subject = "Your Order OTP"
+    message = f"Dear {order.customer.first_name},\n\nYour OTP for order verification is {order.otp_code}. Please use this OTP to verify the order upon delivery."
+    return subject, message, order.customer.email
+
+
+def assignment_email(order, agent):
+    """(subject, message, recipient) telling an agent about a newly assigned order"""
+    subject = "New Order Assigned"
+    message = f"Dear {agent.first_name},\n\nWe are pleased to inform you that a new order has been assigned to you. Please find the details below:\n\nOrder Details:\nOrder ID:: {order.id}\nCustomer Name: {order.customer.first_name}\n\n."
+    return subject, message, agent.email
+
+
+def cancellation_emails(order):
+    """Emails telling the customer and the assigned agent, if any, that the order was cancelled"""
+    subject = f"Order #{order.id} Cancellation Notification"
+    message = f"Hello {order.customer.first_name},\n\nYour order #{order.id} has been cancelled.\n\nReason: {order.cancel_reason} \n\nIf you have any questions, please contact our support team.\n\n."
+    emails = [(subject, message, order.customer.email)]
+    agent = order.agent
+    if agent:
+        message = f"Hello {agent.first_name},\n\n Order #{order.id} assigned to you has been cancelled.\n\nReason: {order.cancel_reason} \n\n."
+        emails.append((subject, message, agent.email))
+    return emails
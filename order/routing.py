@@ -0,0 +1,8 @@
+from django.urls import path
+
+from order.consumers import AgentConsumer, OrderConsumer
+
+websocket_urlpatterns = [
+    path('ws/order/<int:order_id>/', OrderConsumer.as_asgi(), name='ws-order'),
+    path('ws/agent/<int:agent_id>/', AgentConsumer.as_asgi(), name='ws-agent'),
+]
@@ -1,15 +1,86 @@
 import random
-from user.utils import send_email
+from decimal import Decimal
+from user.utils import send_email, send_order_emails
 
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from .models import Order, OrderProduct
+from .notifications import otp_email
 from product.models import Product
+from product.prices import get_price_snapshot
+from user.models import UserProfile
 from django.conf import settings
+from .bulk import ADMIN_TARGETS
+from .items import sync_items
+
+
+class PrefetchedPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field resolving from the rows an enclosing list serializer loaded
+    in bulk, found on the parent or root serializer under prefetched_attr.
+    """
+    prefetched_attr = None
+
+    def get_prefetched(self):
+        for serializer in (self.parent, self.root):
+            rows = getattr(serializer, self.prefetched_attr, None)
+            if rows is not None:
+                return rows
+        return None
+
+    def to_internal_value(self, data):
+        rows = self.get_prefetched()
+        if rows is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            row = rows.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if row is None:
+            self.fail('does_not_exist', pk_value=data)
+        return row
+
+
+class ProductPrimaryKeyField(PrefetchedPrimaryKeyField):
+    """Product primary key field that resolves from the price snapshot taken by the parent list"""
+    prefetched_attr = 'prefetched_products'
+
+
+class CustomerPrimaryKeyField(PrefetchedPrimaryKeyField):
+    """Customer primary key field that resolves from the users prefetched by a batch of orders"""
+    prefetched_attr = 'prefetched_customers'
+
+
+def pk_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OrderProductListSerializer(serializers.ListSerializer):
+    """Validate order items against one price snapshot of every referenced product"""
+
+    def to_internal_value(self, data):
+        if getattr(self.root, 'prefetched_products', None) is not None:
+            # Loaded by an enclosing batch of orders
+            return super().to_internal_value(data)
+        product_ids = set()
+        if isinstance(data, list):
+            product_ids = {pk_or_none(item.get('product_id')) for item in data if isinstance(item, dict)}
+        self.child.prefetched_products = get_price_snapshot(product_ids - {None})
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child.prefetched_products = None
 
 
 class OrderProductSerializer(serializers.ModelSerializer):
-    """Serializer for OrderProduct model """
-    product_id = serializers.PrimaryKeyRelatedField(
+    """Serializer for OrderProduct model, priced from the product rather than the client"""
+    product_id = ProductPrimaryKeyField(
         queryset=Product.objects.all(), source='product', write_only=True
     )
     product_name = serializers.CharField(source='product.name', read_only=True)
@@ -17,42 +88,208 @@ class OrderProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderProduct
         fields = ['product_id', 'product_name', 'quantity', 'price']
+        read_only_fields = ['price']
+        list_serializer_class = OrderProductListSerializer
+
+    def validate(self, attrs):
+        # A price snapshot entry, or a Product when validated outside a list
+        product = attrs.pop('product')
+        if product.status != 'AVAILABLE':
+            raise serializers.ValidationError({'product_id': f"Product {product.id} is not available."})
+        return {**attrs, 'product_id': product.id, 'price': product.price}
+
+
+def items_total(items):
+    """Exact total of validated items"""
+    return sum((item['price'] * item['quantity'] for item in items), Decimal('0.00'))
+
+
+def items_prefetch():
+    """Prefetch of order items together with their products"""
+    return Prefetch('items', queryset=OrderProduct.objects.select_related('product'))
+
+
+def generate_otps(count):
+    """Delivery OTPs for count new orders"""
+    return [str(random.randint(100000, 999999)) for _ in range(count)]
+
+
+class OrderBatchSerializer(serializers.ListSerializer):
+    """
+    Validate and create many orders at once. Every referenced customer and
+    product is loaded with one query each, and orders and their items are
+    inserted with one bulk_create each.
+    """
+
+    def to_internal_value(self, data):
+        customer_ids, product_ids = set(), set()
+        # Oversized batches are rejected by super() before anything is loaded
+        if isinstance(data, list) and (self.max_length is None or len(data) <= self.max_length):
+            for order in filter(lambda order: isinstance(order, dict), data):
+                customer_ids.add(pk_or_none(order.get('customer')))
+                items = order.get('items')
+                if isinstance(items, list):
+                    product_ids.update(pk_or_none(item.get('product_id')) for item in items if isinstance(item, dict))
+        self.prefetched_customers = UserProfile.objects.in_bulk(customer_ids - {None})
+        self.prefetched_products = get_price_snapshot(product_ids - {None})
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.prefetched_customers = self.prefetched_products = None
+
+    def create(self, validated_data):
+        otps = generate_otps(len(validated_data))
+        with transaction.atomic():
+            orders = Order.objects.bulk_create([
+                Order(otp_code=otp, **{name: value for name, value in data.items() if name != 'items'})
+                for data, otp in zip(validated_data, otps)
+            ])
+            OrderProduct.objects.bulk_create([
+                OrderProduct(order=order, **item_data)
+                for order, data in zip(orders, validated_data) for item_data in data['items']
+            ])
+            send_order_emails({order.id: [otp_email(order)] for order in orders}, event='order_otp')
+
+        prefetch_related_objects(orders, items_prefetch())
+        return orders
+
 
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for Order model with multiple products"""
+    customer = CustomerPrimaryKeyField(queryset=UserProfile.objects.all())
     items = OrderProductSerializer(many=True)
 
     class Meta:
         model = Order
         fields = ['id', 'customer', 'agent', 'total_amount', 'status', 'payment_mode', 'created_at', 'updated_at', 'items']
+        # Status and agent only change through the transitions in order.services
+        read_only_fields = ['agent', 'total_amount', 'status']
+        list_serializer_class = OrderBatchSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the representation reads: items and their products"""
+        return queryset.prefetch_related(items_prefetch())
+
+    def validate(self, attrs):
+        if 'items' in attrs:
+            attrs['total_amount'] = items_total(attrs['items'])
+        return attrs
 
     def create(self, validated_data):
-        """Create an order"""
+        """Create an order and its items in one transaction and queue the OTP email"""
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-
-        for item_data in items_data:
-            OrderProduct.objects.create(order=order, **item_data)
-        
-        otp = str(random.randint(100000, 999999))
-        order.otp_code = otp
-        order.save()
-        subject = "Your Order OTP"
-        message = f"Dear {order.customer.first_name},\n\nYour OTP for order verification is {otp}. Please use this OTP to verify the order upon delivery."
-        send_email(subject, message, order.customer.email)
+        otp, = generate_otps(1)
+
+        with transaction.atomic():
+            order = Order.objects.create(otp_code=otp, **validated_data)
+            OrderProduct.objects.bulk_create(
+                [OrderProduct(order=order, **item_data) for item_data in items_data]
+            )
+            send_email(*otp_email(order), event='order_otp', order_id=order.id)
 
+        prefetch_related_objects([order], items_prefetch())
         return order
 
     def update(self, instance, validated_data):
-        """Update order and its items"""
-        items_data = validated_data.pop('items', [])
+        """Update order and, when given, its items, writing only the items that changed"""
+        items_data = validated_data.pop('items', None)
         instance.total_amount = validated_data.get('total_amount', instance.total_amount)
-        instance.status = validated_data.get('status', instance.status)
         instance.payment_mode = validated_data.get('payment_mode', instance.payment_mode)
-        instance.save()
 
-        instance.items.all().delete() 
-        for item_data in items_data:
-            OrderProduct.objects.create(order=instance, **item_data)
+        with transaction.atomic():
+            instance.save()
+            if items_data is not None:
+                sync_items(instance, items_data)
 
+        prefetch_related_objects([instance], items_prefetch())
         return instance
+
+
+class OrderReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer producing the same representation as OrderSerializer.
+    It builds plain dicts from eagerly loaded orders without binding DRF fields
+    per instance, for list responses.
+    """
+    money = serializers.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = serializers.DateTimeField()
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Same loading as OrderSerializer"""
+        return OrderSerializer.setup_eager_loading(queryset)
+
+    def to_representation(self, order):
+        money, timestamp = self.money.to_representation, self.timestamp.to_representation
+        return {
+            'id': order.id,
+            'customer': order.customer_id,
+            'agent': order.agent_id,
+            'total_amount': money(order.total_amount),
+            'status': order.status,
+            'payment_mode': order.payment_mode,
+            'created_at': timestamp(order.created_at),
+            'updated_at': timestamp(order.updated_at),
+            'items': [
+                {'product_name': item.product.name, 'quantity': item.quantity, 'price': money(item.price)}
+                for item in order.items.all()
+            ],
+        }
+
+
+class BulkOrderFilterSerializer(serializers.Serializer):
+    """Conditions selecting the orders of a bulk operation"""
+    LOOKUPS = {
+        'status': 'status',
+        'customer': 'customer_id',
+        'agent': 'agent_id',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+    }
+
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    customer = serializers.IntegerField(required=False)
+    agent = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("At least one condition is required.")
+        return attrs
+
+
+class BulkOrderSelectionSerializer(serializers.Serializer):
+    """
+    Orders for a bulk operation, given as order_ids or as a filter. Validated
+    data holds the selected ids, at most settings.ORDER_BULK_MAX_ORDERS.
+    """
+    order_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = BulkOrderFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('order_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Pass either order_ids or filter.")
+        limit = settings.ORDER_BULK_MAX_ORDERS
+        if 'filter' in attrs:
+            lookups = {BulkOrderFilterSerializer.LOOKUPS[name]: value for name, value in attrs.pop('filter').items()}
+            attrs['order_ids'] = list(Order.objects.filter(**lookups).order_by('id').values_list('id', flat=True)[:limit + 1])
+        else:
+            attrs['order_ids'] = list(dict.fromkeys(attrs['order_ids']))
+        if len(attrs['order_ids']) > limit:
+            raise serializers.ValidationError(f"Select at most {limit} orders at a time.")
+        return attrs
+
+
+class BulkCancelSerializer(BulkOrderSelectionSerializer):
+    reason = serializers.CharField(max_length=100, default="No reason provided")
+
+
+class BulkReassignSerializer(BulkOrderSelectionSerializer):
+    agent_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+
+class BulkStatusSerializer(BulkOrderSelectionSerializer):
+    status = serializers.ChoiceField(choices=ADMIN_TARGETS)
+    reason = serializers.CharField(max_length=100, default="No reason provided")
@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from order.events import publish_order_events
+from order.models import CustomerOrderStats, Order
+from user.models import UserProfile
+
+# Allowed status changes and the actors that may make them. Orders assigned
+# before assignment moved them to 'assigned' are still 'pending' with an agent.
+TRANSITIONS = {
+    ('pending', 'assigned'): {'admin'},
+    ('pending', 'delivered'): {'agent'},
+    ('assigned', 'delivered'): {'agent'},
+    ('pending', 'cancelled'): {'customer', 'admin'},
+    ('assigned', 'cancelled'): {'admin'},
+    ('delivered', 'cancelled'): {'admin'},
+}
+
+CUSTOMER_CANCEL_WINDOW = timedelta(minutes=30)
+
+
+class OrderServiceError(Exception):
+    """Base class for errors raised by order state changes"""
+    message = "Order cannot be updated."
+    status_code = 400
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+
+
+class InvalidTransition(OrderServiceError):
+    messages = {
+        'assigned': "Only pending orders can be assigned.",
+        'delivered': "Order cannot be delivered",
+        'cancelled': "Order cannot be cancelled",
+    }
+
+    def __init__(self, target):
+        super().__init__(self.messages.get(target))
+
+
+class OrderAlreadyAssigned(OrderServiceError):
+    message = "Agent is already assigned to this order."
+
+
+class AgentUnavailable(OrderServiceError):
+    message = "Agent is not available."
+    status_code = 404
+
+
+class OrderNotReassignable(OrderServiceError):
+    message = "Only pending or assigned orders can be reassigned."
+
+
+class OrderNotFound(OrderServiceError):
+    message = "Order not found."
+    status_code = 404
+
+
+class CancelWindowExpired(OrderServiceError):
+    message = "Order can only be cancelled within 30 minutes of creation"
+
+
+class NotAssignedAgent(OrderServiceError):
+    message = "You are not assigned to this order"
+    status_code = 403
+
+
+class InvalidOTP(OrderServiceError):
+    message = "Invalid OTP"
+
+
+def get_actor(user, order):
+    """The role a user acts in on this order, or None if they have no say in it"""
+    if user.is_staff:
+        return 'admin'
+    if user.role == 'CUSTOMER' and order.customer_id == user.id:
+        return 'customer'
+    if user.role == 'AGENT' and order.agent_id == user.id:
+        return 'agent'
+    return None
+
+
+def check_transition(order, target, actor):
+    """Raise InvalidTransition unless the actor may move the order to target"""
+    if actor not in TRANSITIONS.get((order.status, target), ()):
+        raise InvalidTransition(target)
+
+
+def transition(order, target, actor, **fields):
+    """
+    Move the order to the target status with a conditional UPDATE on its current
+    status, so a concurrent change makes this one fail instead of overwriting it.
+    """
+    check_transition(order, target, actor)
+    fields.update(status=target, updated_at=now())
+    if not Order.objects.filter(id=order.id, status=order.status).update(**fields):
+        raise InvalidTransition(target)
+    for name, value in fields.items():
+        setattr(order, name, value)
+    return order
+
+
+def release_agent(agent_id):
+    """Make the agent available for new orders"""
+    UserProfile.objects.filter(id=agent_id).update(agent_status='AVAILABLE')
+
+
+def assign_agent(order_id, agent_id):
+    """
+    Assign an available agent to a pending order. The agent and the order are
+    claimed with conditional UPDATEs inside one transaction, so concurrent
+    dispatchers can never book the same agent or the same order twice; the
+    loser of a race gets an OrderServiceError and nothing is written.
+    Row locks are taken with select_for_update where the database supports
+    them; on SQLite the conditional UPDATEs alone serialize the claim.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().select_related('customer').get(id=order_id)
+        if order.agent_id is not None:
+            raise OrderAlreadyAssigned()
+        check_transition(order, 'assigned', 'admin')
+
+        agent = UserProfile.objects.filter(id=agent_id, role='AGENT', status='ACTIVE').first()
+        if agent is None:
+            raise AgentUnavailable()
+        claimed = UserProfile.objects.filter(id=agent.id, agent_status='AVAILABLE').update(agent_status='UNAVAILABLE')
+        if not claimed:
+            raise AgentUnavailable()
+
+        updated_at = now()
+        updated = Order.objects.filter(id=order.id, agent__isnull=True, status='pending') \
+            .update(agent=agent, status='assigned', updated_at=updated_at)
+        if not updated:
+            # Another dispatcher won the order; roll back the agent claim
+            raise OrderAlreadyAssigned()
+
+        order.agent, order.status, order.updated_at = agent, 'assigned', updated_at
+        publish_order_events([order], 'assigned')
+
+    agent.agent_status = 'UNAVAILABLE'
+    return order, agent
+
+
+def cancel_order(order, actor, reason):
+    """
+    Cancel the order. Customers may only cancel their own pending orders within
+    the cancellation window; admins may also cancel assigned and delivered ones.
+    """
+    check_transition(order, 'cancelled', actor)
+    if actor == 'customer' and now() - order.created_at > CUSTOMER_CANCEL_WINDOW:
+        raise CancelWindowExpired()
+
+    was_delivered = order.status == 'delivered'
+    with transaction.atomic():
+        transition(order, 'cancelled', actor, cancel_reason=reason)
+        if was_delivered:
+            CustomerOrderStats.record_cancellation(order)
+        elif order.agent_id:
+            release_agent(order.agent_id)
+        publish_order_events([order], 'cancelled')
+    return order
+
+
+def deliver_order(order, agent, otp):
+    """Mark the order delivered once its agent presents the right OTP"""
+    if order.agent_id != agent.id:
+        raise NotAssignedAgent()
+    if not order.otp_code or order.otp_code != otp:
+        raise InvalidOTP()
+    if order.status == 'delivered':
+        return order
+
+    with transaction.atomic():
+        transition(order, 'delivered', 'agent')
+        release_agent(order.agent_id)
+        CustomerOrderStats.record_delivery(order)
+        publish_order_events([order], 'delivered')
+    return order
@@ -0,0 +1,30 @@
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+
+def rebuild_customer_stats(apps=global_apps, batch_size=1000):
+    """
+    Rebuild the CustomerOrderStats table from delivered orders, returning the
+    number of customers with statistics. Takes the app registry so data
+    migrations can pass their historical models.
+    """
+    Order = apps.get_model('order', 'Order')
+    OrderProduct = apps.get_model('order', 'OrderProduct')
+    CustomerOrderStats = apps.get_model('order', 'CustomerOrderStats')
+
+    counts = Order.objects.filter(status='delivered').values('customer').annotate(count=Count('id'))
+    amounts = OrderProduct.objects.filter(order__status='delivered').values('order__customer') \
+        .annotate(total=Sum(F('quantity') * F('price')))
+
+    stats = {}
+    for row in counts.iterator():
+        stats[row['customer']] = CustomerOrderStats(customer_id=row['customer'], delivered_orders=row['count'])
+    for row in amounts.iterator():
+        entry = stats.setdefault(row['order__customer'], CustomerOrderStats(customer_id=row['order__customer']))
+        entry.total_amount = row['total'] or 0
+
+    with transaction.atomic():
+        CustomerOrderStats.objects.all().delete()
+        CustomerOrderStats.objects.bulk_create(stats.values(), batch_size=batch_size)
+    return len(stats)
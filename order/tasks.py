@@ -0,0 +1,17 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from order.dispatch import DISPATCH_LOCK_KEY, dispatch_pending_orders as dispatch, get_scorer
+
+
+@shared_task
+def dispatch_pending_orders():
+    """ Periodic task matching pending orders to available agents """
+    # Skip the tick if the previous one is still running
+    if not cache.add(DISPATCH_LOCK_KEY, True, settings.ORDER_DISPATCH_LOCK_TIMEOUT):
+        return {'assigned': 0, 'batches': 0, 'skipped': True}
+    try:
+        return dispatch(scorer=get_scorer())
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
@@ -1,3 +1,1422 @@
-from django.test import TestCase
+import json
+import random
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+
+from food_delivery.asgi import application
+from food_delivery.checks import check_primary_pin_cache
+from food_delivery.routers import ReplicaRouter, primary_pin_key, replica_reads
+from food_delivery.query_plans import QueryPlanAssertionsMixin, analyze, supports_plan_checks
+from order import dispatch as dispatch_module
+from order.dispatch import DISPATCH_LOCK_KEY, dispatch_pending_orders, get_scorer
+from order.items import diff_items
+from order.models import CustomerOrderStats, Order, OrderProduct
+from order.serializers import OrderReadSerializer, OrderSerializer
+from order.services import OrderServiceError, assign_agent
+from order.tasks import dispatch_pending_orders as dispatch_task
+from product.cache import get_catalog_cache
+from product.models import Product
+from product.prices import price_table
+from user.models import UserProfile
+
+
+class OrderCreateTests(APITestCase):
+    """Tests for the order creation endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(
+            username='customer', email='customer@example.com', first_name='Cara', role='CUSTOMER'
+        )
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Dish {i}', price=Decimal('5.00') + i) for i in range(20)]
+        )
+
+    def setUp(self):
+        # Order and product ids are reused across tests
+        cache.clear()
+        price_table.clear()
+        self.client.force_authenticate(self.customer)
+
+    def payload(self, size):
+        items = [{'product_id': p.id, 'quantity': 2, 'price': str(p.price)} for p in self.products[:size]]
+        return {'customer': self.customer.id, 'total_amount': '100.00', 'items': items}
+
+    def post_order(self, size):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('order-create'), self.payload(size), format='json')
+
+    def test_create_order_with_items_and_otp(self):
+        """Order, items and OTP are stored and the OTP is emailed after commit"""
+        response = self.post_order(3)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=response.data['data']['id'])
+        self.assertRegex(order.otp_code, r'^\d{6}$')
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual([i['product_name'] for i in response.data['data']['items']], ['Dish 0', 'Dish 1', 'Dish 2'])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(order.otp_code, mail.outbox[0].body)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        """Creating a 20 item order costs the same number of queries as a 1 item order"""
+        with self.assertNumQueries(7):
+            self.post_order(1)
+        with self.assertNumQueries(7):
+            self.post_order(20)
+
+    def test_cached_prices_skip_product_query(self):
+        self.post_order(3)
+        with self.assertNumQueries(6):
+            self.post_order(3)
+        self.assertEqual(price_table.stats()['hits'], 3)
+
+    def test_prices_and_total_computed_on_server(self):
+        """Client supplied prices and total are ignored"""
+        payload = self.payload(3)
+        payload['items'][0]['price'] = '0.01'
+
+        response = self.client.post(reverse('order-create'), payload, format='json')
+
+        order = Order.objects.get(id=response.data['data']['id'])
+        self.assertEqual(order.total_amount, Decimal('36.00'))
+        self.assertEqual([item['price'] for item in response.data['data']['items']], ['5.00', '6.00', '7.00'])
+        self.assertEqual(order.items.get(product=self.products[0]).get_total_price(), Decimal('10.00'))
+
+    def test_price_change_applies_to_new_orders(self):
+        self.post_order(1)
+        product = self.products[0]
+        product.price = Decimal('9.99')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        response = self.post_order(1)
+
+        self.assertEqual(response.data['data']['total_amount'], '19.98')
+
+    def test_update_prices_items_on_server(self):
+        order = Order.objects.get(id=self.post_order(1).data['data']['id'])
+        items = [{'product_id': p.id, 'quantity': 3, 'price': '0.01'} for p in self.products[1:3]]
+
+        response = self.client.put(
+            reverse('update-order', args=[order.id]), {'customer': self.customer.id, 'items': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('39.00'))
+        self.assertEqual(sorted(order.items.values_list('price', flat=True)), [Decimal('6.00'), Decimal('7.00')])
+
+    def test_unavailable_product_rejected(self):
+        Product.objects.filter(id=self.products[1].id).update(status='UNAVAILABLE')
+
+        response = self.client.post(reverse('order-create'), self.payload(2), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('product_id', response.data['items'][1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_rejected(self):
+        """An unknown product id is a validation error and nothing is written"""
+        payload = self.payload(2)
+        payload['items'][1]['product_id'] = 999999
+
+        response = self.client.post(reverse('order-create'), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderProduct.objects.exists())
+
+
+class CustomerOrderStatsTests(APITestCase):
+    """Tests for the incrementally maintained customer statistics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        cls.agent = UserProfile.objects.create(username='agent', role='AGENT', agent_status='UNAVAILABLE')
+        cls.product = Product.objects.create(name='Curry', price=Decimal('6.50'))
+
+    def create_order(self, order_status='pending'):
+        order = Order.objects.create(
+            customer=self.customer, agent=self.agent, total_amount=Decimal('13.00'),
+            status=order_status, otp_code='123456'
+        )
+        OrderProduct.objects.create(order=order, product=self.product, quantity=2, price=Decimal('6.50'))
+        return order
+
+    def verify(self, order):
+        self.client.force_authenticate(self.agent)
+        return self.client.post(reverse('verify-otp'), {'order_id': order.id, 'otp': '123456'}, format='json')
+
+    def test_delivery_increments_statistics(self):
+        """Verifying the OTP adds the order to the customer's statistics once"""
+        order = self.create_order()
+
+        self.assertEqual(self.verify(order).status_code, status.HTTP_200_OK)
+        self.verify(order)
+
+        stats = CustomerOrderStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.delivered_orders, 1)
+        self.assertEqual(stats.total_amount, Decimal('13.00'))
+
+    def test_cancelling_delivered_order_decrements_statistics(self):
+        """An admin cancelling a delivered order removes it from the statistics"""
+        first, second = self.create_order(), self.create_order()
+        self.verify(first)
+        self.verify(second)
+
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cancel-order', args=[first.id]), {'reason': 'Refund'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = CustomerOrderStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.delivered_orders, 1)
+        self.assertEqual(stats.total_amount, Decimal('13.00'))
+
+    def test_rebuild_command_matches_incremental_statistics(self):
+        """The rebuild command reproduces the incrementally maintained values"""
+        self.verify(self.create_order())
+        self.create_order('delivered')
+        self.create_order('cancelled')
+
+        call_command('rebuild_customer_stats', stdout=StringIO())
+
+        stats = CustomerOrderStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.delivered_orders, 2)
+        self.assertEqual(stats.total_amount, Decimal('26.00'))
+
+    def test_migration_populates_existing_orders(self):
+        """Orders delivered before the statistics existed are counted on migrate"""
+        self.create_order('delivered')
+        migration = import_module('order.migrations.0006_populate_customer_stats')
+        apps = MigrationLoader(connection).project_state(('order', '0006_populate_customer_stats')).apps
+
+        migration.populate_customer_stats(apps, None)
+
+        stats = CustomerOrderStats.objects.get(customer=self.customer)
+        self.assertEqual((stats.delivered_orders, stats.total_amount), (1, Decimal('13.00')))
+
+
+class AssignAgentTests(APITestCase):
+    """Tests for assigning delivery agents to orders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='c@example.com')
+        cls.agent = UserProfile.objects.create(username='agent', role='AGENT', email='a@example.com')
+
+    def setUp(self):
+        # Order ids are reused across tests, and with them the notification dedup keys
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+        self.order = Order.objects.create(customer=self.customer, total_amount=Decimal('10.00'), otp_code='123456')
+
+    def assign(self, order, agent):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('agent-assign', args=[order.id]), {'agent_id': agent.id}, format='json')
+
+    def test_assign_claims_agent_and_order(self):
+        """Assignment marks the order assigned and the agent unavailable"""
+        response = self.assign(self.order, self.agent)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.order.refresh_from_db()
+        self.agent.refresh_from_db()
+        self.assertEqual((self.order.agent_id, self.order.status), (self.agent.id, 'assigned'))
+        self.assertEqual(self.agent.agent_status, 'UNAVAILABLE')
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+
+    def test_assigned_order_is_rejected(self):
+        """An order that already has an agent is not reassigned"""
+        self.assign(self.order, self.agent)
+        other = UserProfile.objects.create(username='other', role='AGENT')
+
+        response = self.assign(self.order, other)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        other.refresh_from_db()
+        self.assertEqual(other.agent_status, 'AVAILABLE')
+
+    def test_busy_agent_is_not_found(self):
+        """An agent already on a delivery cannot take a second order"""
+        self.assign(self.order, self.agent)
+        second = Order.objects.create(customer=self.customer, total_amount=Decimal('5.00'), otp_code='654321')
+
+        response = self.assign(second, self.agent)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        second.refresh_from_db()
+        self.assertIsNone(second.agent_id)
+
+    def test_cancelled_order_is_rejected(self):
+        """Only pending orders can be assigned"""
+        Order.objects.filter(id=self.order.id).update(status='cancelled')
+
+        response = self.assign(self.order, self.agent)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.agent_status, 'AVAILABLE')
+
+
+class ConcurrentAssignAgentTests(TransactionTestCase):
+    """Stress test for concurrent dispatchers racing for the same agents"""
+
+    def test_concurrent_dispatch_never_double_books(self):
+        """Every agent and every order ends up with at most one assignment"""
+        customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        agents = [UserProfile.objects.create(username=f'agent{i}', role='AGENT') for i in range(5)]
+        orders = [
+            Order.objects.create(customer=customer, total_amount=Decimal('10.00'), otp_code='123456')
+            for _ in range(10)
+        ]
+        successes, conflicts = [], []
+
+        def dispatcher(offset):
+            try:
+                for i, order in enumerate(orders):
+                    agent = agents[(i + offset) % len(agents)]
+                    while True:
+                        try:
+                            assign_agent(order.id, agent.id)
+                            successes.append((order.id, agent.id))
+                        except OrderServiceError:
+                            conflicts.append((order.id, agent.id))
+                        except OperationalError:
+                            continue
+                        break
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=dispatcher, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assigned = Order.objects.filter(agent__isnull=False)
+        self.assertEqual(len(successes), len(agents))
+        self.assertEqual(assigned.count(), len(agents))
+        self.assertEqual(len(set(assigned.values_list('agent_id', flat=True))), len(agents))
+        self.assertEqual(sorted(successes), sorted(assigned.values_list('id', 'agent_id')))
+        self.assertFalse(UserProfile.objects.filter(role='AGENT', agent_status='AVAILABLE').exists())
+
+
+class OrderTransitionTests(APITestCase):
+    """Tests for the order state machine behind cancel, assign and verify"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='c@example.com')
+        cls.other = UserProfile.objects.create(username='other', role='CUSTOMER')
+        cls.agent = UserProfile.objects.create(
+            username='agent', role='AGENT', email='a@example.com', agent_status='UNAVAILABLE'
+        )
+        cls.product = Product.objects.create(name='Curry', price=Decimal('6.50'))
+
+    def setUp(self):
+        # Order ids are reused across tests, and with them the notification dedup keys
+        cache.clear()
+
+    def create_order(self, order_status='pending', agent=None):
+        order = Order.objects.create(
+            customer=self.customer, agent=agent, total_amount=Decimal('6.50'), status=order_status, otp_code='123456'
+        )
+        OrderProduct.objects.create(order=order, product=self.product, quantity=1, price=Decimal('6.50'))
+        return order
+
+    def cancel(self, user, order, queries=None):
+        self.client.force_authenticate(user)
+        url = reverse('cancel-order', args=[order.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            if queries is None:
+                return self.client.post(url, {'reason': 'Changed my mind'}, format='json')
+            with self.assertNumQueries(queries):
+                return self.client.post(url, {'reason': 'Changed my mind'}, format='json')
+
+    def verify(self, order, otp='123456', queries=None):
+        self.client.force_authenticate(self.agent)
+        url, data = reverse('verify-otp'), {'order_id': order.id, 'otp': otp}
+        if queries is None:
+            return self.client.post(url, data, format='json')
+        with self.assertNumQueries(queries):
+            return self.client.post(url, data, format='json')
+
+    def test_customer_cancels_pending_order(self):
+        """A customer cancel loads the order once and updates it once"""
+        order = self.create_order()
+
+        response = self.cancel(self.customer, order, queries=4)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.cancel_reason), ('cancelled', 'Changed my mind'))
+
+    def test_customer_cannot_cancel_after_window(self):
+        order = self.create_order()
+        Order.objects.filter(id=order.id).update(created_at=now() - timedelta(minutes=31))
+
+        response = self.cancel(self.customer, order)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.get(id=order.id).status, 'pending')
+
+    def test_customer_cannot_cancel_assigned_order(self):
+        order = self.create_order('assigned', agent=self.agent)
+
+        response = self.cancel(self.customer, order)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Order cannot be cancelled')
+
+    def test_other_customer_cannot_cancel(self):
+        """Only the owner or an admin may cancel an order"""
+        order = self.create_order()
+
+        response = self.cancel(self.other, order)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Order.objects.get(id=order.id).status, 'pending')
+
+    def test_admin_cancel_releases_agent(self):
+        """An admin cancel frees the agent and notifies customer and agent"""
+        order = self.create_order('assigned', agent=self.agent)
+
+        response = self.cancel(self.admin, order, queries=5)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.agent_status, 'AVAILABLE')
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['a@example.com', 'c@example.com'])
+
+    def test_cancelled_order_cannot_be_cancelled_again(self):
+        order = self.create_order('cancelled')
+
+        self.assertEqual(self.cancel(self.admin, order).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_verify_delivers_order(self):
+        """Delivery loads the order once and issues conditional updates"""
+        CustomerOrderStats.objects.create(customer=self.customer)
+        order = self.create_order('assigned', agent=self.agent)
+
+        response = self.verify(order, queries=7)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.agent.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertEqual(self.agent.agent_status, 'AVAILABLE')
+
+    def test_verify_rejects_wrong_otp_and_agent(self):
+        order = self.create_order('assigned', agent=self.agent)
+        self.assertEqual(self.verify(order, otp='000000').status_code, status.HTTP_400_BAD_REQUEST)
+
+        other_agent = UserProfile.objects.create(username='agent2', role='AGENT')
+        Order.objects.filter(id=order.id).update(agent=other_agent)
+        self.assertEqual(self.verify(order).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cancelled_order_cannot_be_delivered(self):
+        order = self.create_order('cancelled', agent=self.agent)
+
+        response = self.verify(order)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.get(id=order.id).status, 'cancelled')
+
+    def test_assign_query_budget(self):
+        order = self.create_order()
+        Order.objects.filter(id=order.id).update(agent=None)
+        UserProfile.objects.filter(id=self.agent.id).update(agent_status='AVAILABLE')
+        self.client.force_authenticate(self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(6):
+            response = self.client.post(reverse('agent-assign', args=[order.id]), {'agent_id': self.agent.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+def prefer_highest_id(order, agent):
+    """Dispatch scorer used by the tests"""
+    return agent.id
+
+
+class DispatchTests(APITestCase):
+    """Tests for the automatic batch dispatcher"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', first_name='Cal')
+
+    def setUp(self):
+        # Order ids are reused across tests, and with them the notification dedup keys
+        cache.clear()
+
+    def create_agents(self, count, prefix='agent'):
+        return [
+            UserProfile.objects.create(username=f'{prefix}{i}', role='AGENT', email=f'{prefix}{i}@example.com')
+            for i in range(count)
+        ]
+
+    def create_orders(self, count):
+        orders = []
+        for i in range(count):
+            order = Order.objects.create(customer=self.customer, total_amount=Decimal('10.00'), otp_code='123456')
+            Order.objects.filter(id=order.id).update(created_at=now() - timedelta(minutes=count - i))
+            orders.append(order)
+        return orders
+
+    def dispatch(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return dispatch_pending_orders(**kwargs)
+
+    def test_concurrent_claim_rolls_back_batch(self):
+        """An agent booked between planning and claiming aborts the batch instead of being booked twice"""
+        agents = self.create_agents(2)
+        self.create_orders(2)
+        plan = dispatch_module.plan_assignments
+
+        def plan_then_race(orders, candidates, scorer=None):
+            UserProfile.objects.filter(id=agents[1].id).update(agent_status='UNAVAILABLE')
+            return plan(orders, candidates, scorer)
+
+        with mock.patch('order.dispatch.plan_assignments', side_effect=plan_then_race):
+            summary = self.dispatch()
+
+        self.assertEqual(summary['assigned'], 0)
+        self.assertFalse(Order.objects.filter(agent__isnull=False).exists())
+        self.assertEqual(UserProfile.objects.get(id=agents[0].id).agent_status, 'AVAILABLE')
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_lock_rows_falls_back_to_plain_lock(self):
+        """Without SKIP LOCKED ... OF rows are still locked"""
+        with mock.patch.object(connection.features, 'has_select_for_update_of', False):
+            queryset = dispatch_module.lock_rows(Order.objects.all())
+
+        self.assertTrue(queryset.query.select_for_update)
+        self.assertFalse(queryset.query.select_for_update_skip_locked)
+
+    def test_oldest_orders_are_dispatched_first(self):
+        """With fewer agents than orders the oldest orders are assigned"""
+        agents = self.create_agents(2)
+        oldest, older, newest = self.create_orders(3)
+        UserProfile.objects.create(username='blocked', role='AGENT', status='BLOCKED')
+
+        summary = self.dispatch()
+
+        self.assertEqual(summary['assigned'], 2)
+        self.assertEqual(
+            set(Order.objects.filter(status='assigned').values_list('id', flat=True)), {oldest.id, older.id}
+        )
+        self.assertEqual(Order.objects.get(id=newest.id).status, 'pending')
+        self.assertEqual(
+            UserProfile.objects.filter(id__in=[a.id for a in agents], agent_status='UNAVAILABLE').count(), 2
+        )
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['agent0@example.com', 'agent1@example.com'])
+
+    def test_assignment_emails_deduplicated(self):
+        """Dispatcher emails share the agent_assigned dedup key of the assign endpoint"""
+        self.create_agents(1)
+        order, = self.create_orders(1)
+
+        self.dispatch()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(cache.get(f'notification:agent_assigned:{order.id}'))
+
+    def test_batches_are_bounded(self):
+        """Dispatch runs in batches and stops at max_orders"""
+        self.create_agents(5)
+        self.create_orders(5)
+
+        summary = self.dispatch(batch_size=2, max_orders=3)
+
+        self.assertEqual(summary, {'assigned': 3, 'batches': 2})
+        self.assertEqual(Order.objects.filter(status='pending').count(), 2)
+
+    def test_scorer_picks_agent(self):
+        """A configured scorer chooses the agent for each order"""
+        agents = self.create_agents(3)
+        oldest = self.create_orders(1)[0]
+
+        with override_settings(ORDER_DISPATCH_SCORER='order.tests.prefer_highest_id'):
+            self.dispatch(scorer=get_scorer())
+
+        self.assertEqual(Order.objects.get(id=oldest.id).agent_id, agents[-1].id)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """A batch costs the same number of queries for 2 or 20 orders"""
+        counts = []
+        for size in (2, 20):
+            self.create_agents(size, prefix=f'batch{size}-')
+            self.create_orders(size)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.dispatch()['assigned'], size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_overlapping_tick_is_skipped(self):
+        """The periodic task does nothing while another tick holds the lock"""
+        self.create_agents(1)
+        self.create_orders(1)
+        cache.add(DISPATCH_LOCK_KEY, True)
+        try:
+            self.assertTrue(dispatch_task.delay().get()['skipped'])
+        finally:
+            cache.delete(DISPATCH_LOCK_KEY)
+
+        self.assertEqual(dispatch_task.delay().get()['assigned'], 1)
+
+
+@skipUnless(supports_plan_checks(), 'no full scan detection for this database')
+class OrderQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Hot order queries must be served by indexes on a realistic dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        customers = UserProfile.objects.bulk_create(
+            [UserProfile(username=f'customer{i}', role='CUSTOMER') for i in range(200)]
+        )
+        agents = UserProfile.objects.bulk_create([UserProfile(username=f'agent{i}', role='AGENT') for i in range(100)])
+        statuses = rng.choices(['pending', 'assigned', 'delivered', 'cancelled'], weights=[5, 5, 80, 10], k=5000)
+        Order.objects.bulk_create([
+            Order(
+                customer=rng.choice(customers), agent=None if order_status == 'pending' else rng.choice(agents),
+                total_amount=Decimal('10.00'), otp_code='123456', status=order_status,
+            )
+            for order_status in statuses
+        ])
+        analyze()
+        cls.customer, cls.agent = customers[0], agents[0]
+
+    def test_pending_orders(self):
+        """Status filters, order_status_created_idx"""
+        self.assertNoFullScan(Order.objects.filter(status='pending'))
+
+    def test_dispatch_batch(self):
+        """Dispatcher FIFO scan, order_agent_status_idx or order_status_created_idx"""
+        self.assertNoFullScan(
+            Order.objects.filter(status='pending', agent__isnull=True).order_by('created_at', 'id')[:500]
+        )
+
+    def test_customer_open_orders(self):
+        """Checked before deleting a customer, order_customer_status_idx"""
+        self.assertNoFullScan(Order.objects.filter(customer=self.customer, status__in=['pending', 'assigned']))
+
+    def test_agent_orders_by_status(self):
+        """Agent's orders by status, order_agent_status_idx"""
+        self.assertNoFullScan(Order.objects.filter(agent=self.agent, status='assigned'))
+
+    def test_customer_order_page(self):
+        """Keyset paginated customer order list, order_customer_created_idx"""
+        self.assertNoFullScan(Order.objects.filter(customer=self.customer).order_by('-created_at', '-id')[:51])
+
+
+class OrderConditionalGetTests(APITestCase):
+    """Tests for ETag / Last-Modified on order polling"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        product = Product.objects.create(name='Noodles', price=Decimal('8.00'))
+        cls.order = Order.objects.create(customer=cls.customer, total_amount=Decimal('16.00'))
+        OrderProduct.objects.bulk_create(
+            [OrderProduct(order=cls.order, product=product, quantity=1, price=Decimal('8.00')) for _ in range(5)]
+        )
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+        self.url = reverse('order-by-id', args=[self.order.id])
+
+    def test_repeat_poll_is_not_modified(self):
+        """A poll with a matching ETag gets an empty 304 after loading the user and the order row"""
+        with CaptureQueriesContext(connection) as full_queries:
+            first = self.client.get(self.url)
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.content, b'')
+        self.assertGreater(len(first.content), 0)
+        self.assertGreater(len(full_queries), 1)
+
+    def test_if_modified_since_honoured(self):
+        """Last-Modified can be used as the validator as well"""
+        first = self.client.get(self.url)
+
+        second = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_change_invalidates_etag(self):
+        """Updating the order produces a new ETag and a full response"""
+        first = self.client.get(self.url)
+        Order.objects.filter(id=self.order.id).update(status='cancelled', updated_at=now() + timedelta(seconds=1))
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.data['data']['status'], 'cancelled')
+
+
+class OrderListPaginationTests(APITestCase):
+    """Tests for keyset pagination of order lists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        other = UserProfile.objects.create(username='other', role='CUSTOMER')
+        cls.orders = [Order.objects.create(customer=cls.customer, total_amount=Decimal('1.00')) for _ in range(7)]
+        Order.objects.create(customer=other, total_amount=Decimal('1.00'))
+        # Several orders sharing a timestamp must still be paged without gaps or repeats
+        Order.objects.filter(id__in=[o.id for o in cls.orders[2:5]]).update(created_at=cls.orders[2].created_at)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data.get('data', response.data)
+            ids += [order['id'] for order in data['results']]
+            url, pages = data['next'], pages + 1
+        return ids, pages
+
+    def test_customer_orders_newest_first(self):
+        """A customer's history is paged newest first without repeats"""
+        url = reverse('order-list-by-customer', args=[self.customer.id]) + '?page_size=2'
+
+        ids, pages = self.walk(url)
+
+        expected = list(Order.objects.filter(customer=self.customer).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_all_orders_paginated(self):
+        """The order list endpoint pages over every order"""
+        ids, pages = self.walk(reverse('order-create') + '?page_size=3')
+
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+
+
+class OrderSerializationTests(APITestCase):
+    """Tests for eager loading and the read-only order serializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        cls.agent = UserProfile.objects.create(username='agent', role='AGENT')
+        cls.products = [Product.objects.create(name=f'Dish {i}', price=Decimal('4.25') + i) for i in range(3)]
+
+    def create_orders(self, count):
+        for i in range(count):
+            order = Order.objects.create(
+                customer=self.customer, agent=self.agent if i % 2 else None,
+                total_amount=Decimal('17.5'), payment_mode='cod', otp_code='123456',
+            )
+            OrderProduct.objects.bulk_create([
+                OrderProduct(order=order, product=product, quantity=i + 1, price=product.price)
+                for product in self.products
+            ])
+
+    def test_read_serializer_matches_order_serializer(self):
+        """The fast path renders byte for byte what OrderSerializer renders"""
+        self.create_orders(3)
+        orders = OrderSerializer.setup_eager_loading(Order.objects.order_by('id'))
+
+        fast = JSONRenderer().render(OrderReadSerializer(orders, many=True).data)
+        full = JSONRenderer().render(OrderSerializer(orders, many=True).data)
+
+        self.assertEqual(fast, full)
+
+    def test_list_queries_do_not_grow_with_orders(self):
+        """Listing a customer's orders costs the same queries for 2 or 10 orders"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+        url = reverse('order-list-by-customer', args=[self.customer.id])
+        counts = []
+        for total in (2, 10):
+            self.create_orders(total - Order.objects.count())
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(len(response.data['data']['results']), total)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(counts[1], 4)
+
+    def test_detail_prefetches_items(self):
+        self.create_orders(1)
+        order = Order.objects.get()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+
+        # User, order, items with their products
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('order-by-id', args=[order.id]))
+
+        self.assertEqual(len(response.data['data']['items']), 3)
+
+
+class AsyncOrderViewTests(APITestCase):
+    """Tests for the async order polling endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        cls.agent = UserProfile.objects.create(username='agent', role='AGENT')
+        product = Product.objects.create(name='Rice', price=Decimal('3.50'))
+        cls.order = Order.objects.create(customer=cls.customer, total_amount=Decimal('7.00'))
+        OrderProduct.objects.create(order=cls.order, product=product, quantity=2, price=Decimal('3.50'))
+
+    def bearer(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_detail_with_jwt(self):
+        """The user is loaded from the token with the async ORM"""
+        response = self.client.get(reverse('order-by-id', args=[self.order.id]), **self.bearer(self.customer))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['items'][0]['product_name'], 'Rice')
+        self.assertIn('ETag', response)
+
+    def test_detail_requires_authentication(self):
+        response = self.client.get(reverse('order-by-id', args=[self.order.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+    def test_invalid_token_rejected(self):
+        response = self.client.get(reverse('order-by-id', args=[self.order.id]), HTTP_AUTHORIZATION='Bearer nope')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_missing_order(self):
+        response = self.client.get(reverse('order-by-id', args=[0]), **self.bearer(self.customer))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_forbidden_for_agents(self):
+        response = self.client.get(reverse('order-list-by-customer', args=[self.customer.id]), **self.bearer(self.agent))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_served_without_thread_pool(self):
+        """Under ASGI the views run on the event loop"""
+        response = await self.async_client.get(
+            reverse('order-list-by-customer', args=[self.customer.id]),
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.customer)}'},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['id'] for order in response.json()['data']['results']], [self.order.id])
+
+
+class WebSocket(ApplicationCommunicator):
+    """A WebSocket client for the ASGI application"""
+
+    def __init__(self, path, headers=()):
+        path, _, query = path.partition('?')
+        scope = {'type': 'websocket', 'path': path, 'query_string': query.encode(), 'headers': list(headers)}
+        super().__init__(application, scope)
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return (await self.receive_output(1))['type'] == 'websocket.accept'
+
+    async def receive_json(self):
+        return json.loads((await self.receive_output(1))['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait(1)
+
+
+class OrderEventsTests(TestCase):
+    """Tests for order status pushed over WebSockets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True)
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        cls.other = UserProfile.objects.create(username='other', role='CUSTOMER')
+        cls.agent = UserProfile.objects.create(username='agent', role='AGENT', agent_status='AVAILABLE')
+        cls.order = Order.objects.create(customer=cls.customer, total_amount=Decimal('10.00'), otp_code='123456')
+
+    def setUp(self):
+        async_to_sync(get_channel_layer().flush)()
+
+    async def connect(self, path, user=None):
+        if user is not None:
+            path += f'?token={AccessToken.for_user(user)}'
+        communicator = WebSocket(path)
+        self.assertTrue(await communicator.connect())
+        return communicator
+
+    def as_admin(self, view, **kwargs):
+        """Call a view as the admin and run its on-commit callbacks"""
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post(reverse(view, args=[self.order.id]), kwargs, format='json')
+
+    async def test_customer_follows_order(self):
+        """A snapshot on connect, then every transition"""
+        communicator = await self.connect(f'/ws/order/{self.order.id}/', self.customer)
+
+        snapshot = await communicator.receive_json()
+        await sync_to_async(self.as_admin)('agent-assign', agent_id=self.agent.id)
+        assigned = await communicator.receive_json()
+        await sync_to_async(self.as_admin)('cancel-order', reason='Closed')
+        cancelled = await communicator.receive_json()
+        await communicator.disconnect()
+
+        self.assertEqual((snapshot['event'], snapshot['status']), ('snapshot', 'pending'))
+        self.assertEqual((assigned['event'], assigned['agent']), ('assigned', self.agent.id))
+        self.assertEqual((cancelled['event'], cancelled['status']), ('cancelled', 'cancelled'))
+
+    async def test_agent_notified_of_assignment(self):
+        communicator = await self.connect(f'/ws/agent/{self.agent.id}/', self.agent)
+
+        await sync_to_async(self.as_admin)('agent-assign', agent_id=self.agent.id)
+        event = await communicator.receive_json()
+        await communicator.disconnect()
+
+        self.assertEqual((event['event'], event['order_id']), ('assigned', self.order.id))
+
+    async def test_dispatch_publishes_assignments(self):
+        communicator = await self.connect(f'/ws/agent/{self.agent.id}/', self.agent)
+
+        def dispatch():
+            with self.captureOnCommitCallbacks(execute=True):
+                dispatch_pending_orders()
+
+        await sync_to_async(dispatch)()
+        event = await communicator.receive_json()
+        await communicator.disconnect()
+
+        self.assertEqual((event['event'], event['order_id'], event['status']), ('assigned', self.order.id, 'assigned'))
+
+    async def test_nothing_published_without_commit(self):
+        """Events wait for the transaction, so a rolled back change is never pushed"""
+        communicator = await self.connect(f'/ws/order/{self.order.id}/', self.admin)
+        await communicator.receive_json()
+
+        def cancel_without_commit():
+            client = APIClient()
+            client.force_authenticate(self.admin)
+            client.post(reverse('cancel-order', args=[self.order.id]), {}, format='json')
+
+        await sync_to_async(cancel_without_commit)()
+
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_connection_refused(self):
+        """Sockets without a valid token, or for someone else's order or agent, are closed"""
+        cases = [
+            (f'/ws/order/{self.order.id}/', None, 4401),
+            (f'/ws/order/{self.order.id}/?token=invalid', None, 4401),
+            (f'/ws/order/{self.order.id}/', self.other, 4403),
+            ('/ws/order/0/', self.customer, 4404),
+            (f'/ws/agent/{self.agent.id}/', self.customer, 4403),
+        ]
+        for path, user, code in cases:
+            communicator = await self.connect(path, user)
+            message = await communicator.receive_output()
+            self.assertEqual(message, {'type': 'websocket.close', 'code': code}, path)
+
+    async def test_bearer_header(self):
+        header = f'Bearer {AccessToken.for_user(self.customer)}'.encode()
+        communicator = WebSocket(f'/ws/order/{self.order.id}/', headers=[(b'authorization', header)])
+        connected = await communicator.connect()
+        snapshot = await communicator.receive_json()
+        await communicator.disconnect()
+
+        self.assertTrue(connected)
+        self.assertEqual(snapshot['order_id'], self.order.id)
+
+
+class BulkOrderTests(APITestCase):
+    """Tests for the admin bulk cancel, reassign and status endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='c@example.com')
+        cls.product = Product.objects.create(name='Curry', price=Decimal('6.50'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def create_agents(self, count, agent_status='AVAILABLE'):
+        start = UserProfile.objects.count()
+        return [
+            UserProfile.objects.create(
+                username=f'agent{start + i}', role='AGENT', email=f'agent{start + i}@example.com', agent_status=agent_status
+            )
+            for i in range(count)
+        ]
+
+    def create_order(self, order_status='pending', agent=None):
+        order = Order.objects.create(
+            customer=self.customer, agent=agent, total_amount=Decimal('6.50'), status=order_status
+        )
+        OrderProduct.objects.create(order=order, product=self.product, quantity=1, price=Decimal('6.50'))
+        return order
+
+    def post(self, view, data, queries=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            if queries is None:
+                return self.client.post(reverse(view), data, format='json')
+            with self.assertNumQueries(queries):
+                return self.client.post(reverse(view), data, format='json')
+
+    def test_cancel_reports_each_order(self):
+        """Cancellable orders are cancelled, the rest reported with the reason"""
+        agent, = self.create_agents(1, 'UNAVAILABLE')
+        pending, assigned = self.create_order(), self.create_order('assigned', agent)
+        delivered, cancelled = self.create_order('delivered', agent), self.create_order('cancelled')
+        CustomerOrderStats.objects.create(customer=self.customer, delivered_orders=1, total_amount=Decimal('6.50'))
+
+        response = self.post('bulk-cancel-orders', {
+            'order_ids': [pending.id, assigned.id, delivered.id, cancelled.id, 999999], 'reason': 'Kitchen closed',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['succeeded'], [pending.id, assigned.id, delivered.id])
+        self.assertEqual(response.data['data']['failed'], [
+            {'order_id': cancelled.id, 'error': 'Order cannot be cancelled'},
+            {'order_id': 999999, 'error': 'Order not found.'},
+        ])
+        self.assertEqual(Order.objects.filter(status='cancelled', cancel_reason='Kitchen closed').count(), 3)
+        agent.refresh_from_db()
+        self.assertEqual(agent.agent_status, 'AVAILABLE')
+        stats = CustomerOrderStats.objects.get(customer=self.customer)
+        self.assertEqual((stats.delivered_orders, stats.total_amount), (0, Decimal('0.00')))
+
+    def test_cancel_is_set_based(self):
+        """Cancelling 10 orders costs the same queries as cancelling 2, and sends one email batch"""
+        agents = self.create_agents(10, 'UNAVAILABLE')
+        orders = [self.create_order('assigned', agent) for agent in agents]
+
+        # Savepoint, SELECT, order UPDATE, agent UPDATE, release
+        self.post('bulk-cancel-orders', {'order_ids': [o.id for o in orders[:2]]}, queries=5)
+        with mock.patch('user.utils.send_email_batch') as send_email_batch:
+            self.post('bulk-cancel-orders', {'order_ids': [o.id for o in orders[2:]]}, queries=5)
+
+        send_email_batch.delay.assert_called_once()
+        self.assertEqual(len(send_email_batch.delay.call_args.args[0]), 16)
+        self.assertEqual(UserProfile.objects.filter(role='AGENT', agent_status='AVAILABLE').count(), 10)
+
+    def test_select_by_filter(self):
+        other = UserProfile.objects.create(username='other', role='CUSTOMER')
+        mine = [self.create_order(), self.create_order()]
+        self.create_order('delivered')
+        Order.objects.create(customer=other, total_amount=Decimal('1.00'))
+
+        response = self.post('bulk-cancel-orders', {'filter': {'customer': self.customer.id, 'status': 'pending'}})
+
+        self.assertEqual(response.data['data']['succeeded'], [order.id for order in mine])
+
+    def test_selection_validated(self):
+        order = self.create_order()
+        cases = [
+            {},
+            {'order_ids': [order.id], 'filter': {'status': 'pending'}},
+            {'filter': {}},
+            {'order_ids': []},
+        ]
+        for data in cases:
+            self.assertEqual(self.post('bulk-cancel-orders', data).status_code, status.HTTP_400_BAD_REQUEST, data)
+
+        with override_settings(ORDER_BULK_MAX_ORDERS=1):
+            self.create_order()
+            response = self.post('bulk-cancel-orders', {'filter': {'status': 'pending'}})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.filter(status='cancelled').exists())
+
+    def test_reassign_moves_orders_and_frees_agents(self):
+        old = self.create_agents(3, 'UNAVAILABLE')
+        new = self.create_agents(2)
+        orders = [self.create_order('assigned', agent) for agent in old]
+        delivered = self.create_order('delivered', old[0])
+
+        response = self.post('bulk-reassign-orders', {'order_ids': [o.id for o in orders] + [delivered.id]})
+
+        data = response.data['data']
+        self.assertEqual(data['succeeded'], [orders[0].id, orders[1].id])
+        self.assertEqual(data['failed'], [
+            {'order_id': orders[2].id, 'error': 'Agent is not available.'},
+            {'order_id': delivered.id, 'error': 'Only pending or assigned orders can be reassigned.'},
+        ])
+        self.assertEqual(
+            list(Order.objects.filter(id__in=data['succeeded']).order_by('id').values_list('agent_id', flat=True)),
+            [agent.id for agent in new],
+        )
+        statuses = dict(UserProfile.objects.filter(role='AGENT').values_list('id', 'agent_status'))
+        self.assertEqual([statuses[a.id] for a in old], ['AVAILABLE', 'AVAILABLE', 'UNAVAILABLE'])
+        self.assertEqual([statuses[a.id] for a in new], ['UNAVAILABLE', 'UNAVAILABLE'])
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(a.email for a in new))
+
+    def test_reassign_to_chosen_agents(self):
+        first, second = self.create_agents(2)
+        order = self.create_order()
+
+        response = self.post('bulk-reassign-orders', {'order_ids': [order.id], 'agent_ids': [second.id]})
+
+        self.assertEqual(response.data['data']['succeeded'], [order.id])
+        order.refresh_from_db()
+        self.assertEqual((order.agent_id, order.status), (second.id, 'assigned'))
+
+    def test_reassign_skips_agent_claimed_concurrently(self):
+        """An agent booked between selection and claiming fails the orders instead of being booked twice"""
+        old, = self.create_agents(1, 'UNAVAILABLE')
+        first, second = self.create_agents(2)
+        orders = [self.create_order('assigned', old), self.create_order()]
+        plan = dispatch_module.plan_assignments
+
+        def plan_then_race(orders, candidates, scorer=None):
+            UserProfile.objects.filter(id=second.id).update(agent_status='UNAVAILABLE')
+            return plan(orders, candidates, scorer)
+
+        with mock.patch('order.bulk.plan_assignments', side_effect=plan_then_race):
+            response = self.post('bulk-reassign-orders', {'order_ids': [order.id for order in orders]})
+
+        self.assertEqual(response.data['data']['succeeded'], [])
+        self.assertEqual(
+            [item['error'] for item in response.data['data']['failed']], ['Agent is not available.'] * 2
+        )
+        self.assertEqual(
+            list(Order.objects.filter(id__in=[o.id for o in orders]).order_by('id').values_list('agent_id', 'status')),
+            [(old.id, 'assigned'), (None, 'pending')],
+        )
+        statuses = dict(UserProfile.objects.filter(role='AGENT').values_list('id', 'agent_status'))
+        self.assertEqual([statuses[a.id] for a in (old, first)], ['UNAVAILABLE', 'AVAILABLE'])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_status_change(self):
+        """Status changes follow the state machine: assigning only takes pending orders"""
+        self.create_agents(2)
+        pending, assigned = self.create_order(), self.create_order('assigned', self.create_agents(1, 'UNAVAILABLE')[0])
+
+        response = self.post('bulk-order-status', {'order_ids': [pending.id, assigned.id], 'status': 'assigned'})
+        invalid = self.post('bulk-order-status', {'order_ids': [pending.id], 'status': 'delivered'})
+
+        self.assertEqual(response.data['data']['succeeded'], [pending.id])
+        self.assertEqual(response.data['data']['failed'], [
+            {'order_id': assigned.id, 'error': 'Only pending orders can be assigned.'},
+        ])
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.customer)
+
+        response = self.post('bulk-cancel-orders', {'order_ids': [self.create_order().id]})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderBatchCreateTests(APITestCase):
+    """Tests for creating many orders in one request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER', email='c@example.com')
+        cls.products = [Product.objects.create(name=f'Dish {i}', price=Decimal('3.00') + i) for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+        price_table.clear()
+        self.client.force_authenticate(self.customer)
+
+    def payload(self, count, product_id=None):
+        return {'orders': [
+            {
+                'customer': self.customer.id,
+                'total_amount': '7.00',
+                'items': [
+                    {'product_id': product_id or self.products[(i + j) % 4].id, 'quantity': 1, 'price': '3.50'}
+                    for j in range(2)
+                ],
+            }
+            for i in range(count)
+        ]}
+
+    def create(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('order-batch-create'), data, format='json')
+
+    def test_creates_every_order(self):
+        with mock.patch('user.utils.send_email_batch') as send_email_batch:
+            response = self.create(self.payload(3))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['data']), 3)
+        self.assertEqual(response.data['data'][0]['items'][0]['product_name'], 'Dish 0')
+        orders = Order.objects.order_by('id')
+        self.assertEqual(OrderProduct.objects.filter(order__in=orders).count(), 6)
+        self.assertTrue(all(len(order.otp_code) == 6 for order in orders))
+        send_email_batch.delay.assert_called_once()
+        self.assertEqual(len(send_email_batch.delay.call_args.args[0]), 3)
+
+    def test_status_and_agent_not_writable(self):
+        """Orders start pending and unassigned whatever the client sends, see order.services.TRANSITIONS"""
+        agent = UserProfile.objects.create(username='agent', role='AGENT')
+        data = self.payload(2)
+        for order in data['orders']:
+            order.update(status='delivered', agent=agent.id)
+
+        response = self.create(data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(Order.objects.values_list('status', 'agent')), {('pending', None)})
+        self.assertFalse(CustomerOrderStats.objects.filter(customer=self.customer, delivered_orders__gt=0).exists())
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        counts = []
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                self.create(self.payload(size))
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_all_or_nothing(self):
+        """One invalid order rejects the batch, with errors reported per order"""
+        data = self.payload(3)
+        data['orders'][1]['items'][0]['product_id'] = 999999
+
+        response = self.create(data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('items', response.data[1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_customer(self):
+        data = self.payload(1)
+        data['orders'][0]['customer'] = 999999
+
+        response = self.create(data)
+
+        self.assertIn('customer', response.data[0])
+
+    def test_batch_size_limited(self):
+        for data in ({'orders': []}, {}, self.payload(3)):
+            with override_settings(ORDER_BATCH_MAX_ORDERS=2):
+                response = self.create(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertFalse(Order.objects.exists())
+
+
+class UpdateOrderTests(APITestCase):
+    """Tests for replacing the items of an order with a diff"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Dish {i}', price=Decimal('2.00') + i) for i in range(60)]
+        )
+        cls.order = Order.objects.create(customer=cls.customer, total_amount=Decimal('0.00'))
+        OrderProduct.objects.bulk_create([
+            OrderProduct(order=cls.order, product=product, quantity=1, price=product.price) for product in cls.products[:50]
+        ])
+
+    def setUp(self):
+        price_table.clear()
+        self.client.force_authenticate(self.customer)
+
+    def items(self):
+        return [{'product_id': item.product_id, 'quantity': item.quantity} for item in self.order.items.order_by('id')]
+
+    def put(self, items):
+        return self.client.put(
+            reverse('update-order', args=[self.order.id]), {'customer': self.customer.id, 'items': items}, format='json'
+        )
+
+    def writes(self, queries):
+        return [query['sql'].split()[0] for query in queries if 'order_orderproduct' in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_small_edit_to_large_order(self):
+        """Changing one of 50 items updates that row alone, in a constant number of queries"""
+        items = self.items()
+        items[10]['quantity'] = 3
+        before = list(self.order.items.values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.put(items)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 8)
+        self.assertEqual(self.writes(queries), ['UPDATE'])
+        self.assertEqual(list(self.order.items.values_list('id', flat=True)), before)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, sum(p.price for p in self.products[:50]) + 2 * self.products[10].price)
+
+    def test_add_change_and_remove(self):
+        items = self.items()
+        items[0]['quantity'] = 2
+        del items[1]
+        items.append({'product_id': self.products[55].id, 'quantity': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.put(items)
+
+        self.assertEqual(len(queries), 10)
+        self.assertEqual(self.writes(queries), ['DELETE', 'UPDATE', 'INSERT'])
+        self.assertEqual(self.order.items.count(), 50)
+        self.assertFalse(self.order.items.filter(product=self.products[1]).exists())
+
+    def test_unchanged_items_not_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.put(self.items())
+
+        self.assertEqual(self.writes(queries), [])
+
+    def test_invalid_item_leaves_order_untouched(self):
+        items = self.items()[:2] + [{'product_id': 999999, 'quantity': 1}]
+
+        response = self.put(items)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('product_id', response.data[2])
+        self.assertEqual(self.order.items.count(), 50)
+
+    def test_serializer_update_uses_diff(self):
+        serializer = OrderSerializer(self.order, data={'items': self.items()[:49]}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        self.assertEqual(self.writes(queries), ['DELETE'])
+        self.assertEqual(serializer.data['total_amount'], str(sum(p.price for p in self.products[:49])))
+
+    def test_duplicate_products_matched_exactly(self):
+        rows = [
+            OrderProduct(id=1, product_id=7, quantity=1, price=Decimal('2.00')),
+            OrderProduct(id=2, product_id=7, quantity=4, price=Decimal('2.00')),
+        ]
+        incoming = [
+            {'product_id': 7, 'quantity': 4, 'price': Decimal('2.00')},
+            {'product_id': 7, 'quantity': 2, 'price': Decimal('2.00')},
+            {'product_id': 8, 'quantity': 1, 'price': Decimal('3.00')},
+        ]
+
+        to_create, to_update, to_delete = diff_items(rows, incoming)
+
+        self.assertEqual([(row.id, row.quantity) for row in to_update], [(1, 2)])
+        self.assertEqual([row.product_id for row in to_create], [8])
+        self.assertEqual(to_delete, [])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Reads of opted in views go to the replica, which mirrors default under test"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.customer = UserProfile.objects.create(username='customer', role='CUSTOMER')
+        self.order = Order.objects.create(customer=self.customer, total_amount=Decimal('7.00'), otp_code='123456')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.customer)}'}
+
+    def get(self, path):
+        """Response plus the tables read on each database"""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(path, **self.headers)
+        tables = lambda queries: {table for query in queries for table in ('order_order', 'product_product')
+                                  if table in query['sql']}
+        return response, tables(primary), tables(replica)
+
+    def test_router(self):
+        with replica_reads():
+            self.assertEqual(Order.objects.all().db, 'replica')
+            order = Order.objects.get(id=self.order.id)
+        self.assertEqual(Order.objects.all().db, 'default')
+        self.assertEqual(ReplicaRouter().db_for_write(Order, instance=order), 'default')
+        self.assertFalse(ReplicaRouter().allow_migrate('replica', 'order'))
+
+    def test_opted_in_views_read_replica(self):
+        product = Product.objects.create(name='Rice', price=Decimal('3.50'))
+        OrderProduct.objects.create(order=self.order, product=product, quantity=2, price=Decimal('3.50'))
+
+        response, primary, replica = self.get(reverse('order-by-id', args=[self.order.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(primary, set())
+        self.assertEqual(replica, {'order_order', 'product_product'})
+
+    def test_catalog_cache_filled_from_primary(self):
+        """A lagging replica must not fill the cache for the new catalog version"""
+        get_catalog_cache().clear()
+        Product.objects.create(name='Rice', price=Decimal('3.50'))
+
+        response, primary, replica = self.get(reverse('product-list'))
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('product_product', primary)
+        self.assertEqual(replica, set())
+
+    def test_replicas_need_shared_cache(self):
+        """Pins in a process-local cache would not reach the other workers"""
+        with override_settings(TESTING=False):
+            self.assertEqual([error.id for error in check_primary_pin_cache(None)], ['food_delivery.E001'])
+            shared = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(check_primary_pin_cache(None), [])
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        with override_settings(DATABASE_REPLICA_STICKY_SECONDS=30):
+            response = self.client.post(
+                reverse('cancel-order', args=[self.order.id]), {'reason': 'Changed my mind'}, **self.headers
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response, primary, replica = self.get(reverse('order-by-id', args=[self.order.id]))
+        self.assertEqual(response.json()['data']['status'], 'cancelled')
+        self.assertIn('order_order', primary)
+        self.assertEqual(replica, set())
+
+        # Window over
+        cache.delete(primary_pin_key(self.customer.id))
+        _, primary, replica = self.get(reverse('order-by-id', args=[self.order.id]))
+        self.assertEqual(primary, set())
+        self.assertIn('order_order', replica)
@@ -1,15 +1,20 @@
 from django.urls import path
-from order.views import OrderCreateView, OrderListByCustomerView, OrderDetailView, UpdateOrderView, CancelOrderView, AssignAgentView, VerifyOrderOTPView
+from order.views import OrderCreateView, AsyncOrderListByCustomerView, AsyncOrderDetailView, UpdateOrderView, CancelOrderView, AssignAgentView, VerifyOrderOTPView
+from order.views import OrderBatchCreateView, BulkCancelOrdersView, BulkReassignOrdersView, BulkOrderStatusView
 
 
 urlpatterns = [
 
     path('create/', OrderCreateView.as_view(), name='order-create'),
-    path('user/<int:customer_id>', OrderListByCustomerView.as_view(), name='order-list-by-customer'),
-    path('<int:order_id>', OrderDetailView.as_view(), name='order-by-id'),
+    path('batch/', OrderBatchCreateView.as_view(), name='order-batch-create'),
+    path('user/<int:customer_id>', AsyncOrderListByCustomerView.as_view(), name='order-list-by-customer'),
+    path('<int:order_id>', AsyncOrderDetailView.as_view(), name='order-by-id'),
     path('<int:order_id>/update/', UpdateOrderView.as_view(), name='update-order'),
     path('<int:order_id>/cancel/', CancelOrderView.as_view(), name='cancel-order'),
     path('<int:order_id>/agentassign/', AssignAgentView.as_view(), name='agent-assign'),
     path('verify/', VerifyOrderOTPView.as_view(), name='verify-otp'),
+    path('bulk/cancel/', BulkCancelOrdersView.as_view(), name='bulk-cancel-orders'),
+    path('bulk/reassign/', BulkReassignOrdersView.as_view(), name='bulk-reassign-orders'),
+    path('bulk/status/', BulkOrderStatusView.as_view(), name='bulk-order-status'),
   
 ]
\ No newline at end of file
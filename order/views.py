@@ -1,18 +1,30 @@
-from datetime import timedelta
-from django.utils.timezone import now
-from django.shortcuts import render, get_object_or_404
+from django.conf import settings
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.db import transaction
+from django.db.models import aprefetch_related_objects, prefetch_related_objects
+from django.http import Http404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from user.permissions import IsAdminUser, IsCustomer, IsAgent
 from django_filters.rest_framework import DjangoFilterBackend
+from food_delivery.async_views import AsyncAPIView
+from food_delivery.conditional import check_conditional, make_etag, set_validators
+from food_delivery.pagination import CreatedAtCursorPagination
+from food_delivery.routers import AsyncReplicaReadMixin
 
-from order.models import Order, OrderProduct
-from product.models import Product
+from order.models import Order
 from user.models import UserProfile
-from .serializers import OrderSerializer
-from user.utils import send_email
+from .bulk import bulk_cancel, bulk_change_status, bulk_reassign
+from .items import sync_items
+from .serializers import (
+    BulkCancelSerializer, BulkReassignSerializer, BulkStatusSerializer, OrderProductSerializer, OrderReadSerializer,
+    OrderSerializer, items_prefetch, items_total,
+)
+from .notifications import assignment_email, cancellation_emails
+from .services import assign_agent, cancel_order, deliver_order, get_actor, OrderServiceError
+from user.utils import send_email, send_emails
 
 
 class OrderCreateView(generics.ListCreateAPIView):
@@ -21,48 +33,71 @@ class OrderCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsCustomer]
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_serializer_class(self):
+        """Lists use the read-only fast path"""
+        return OrderReadSerializer if self.request.method == 'GET' else OrderSerializer
+
+    def get_queryset(self):
+        """Orders with everything the serializer reads loaded up front"""
+        return self.get_serializer_class().setup_eager_loading(super().get_queryset())
     
     def create(self, request, *args, **kwargs):
         """create Order"""
         response = super().create(request, *args, **kwargs)
         return Response({"message": "Order created successfully!", "data": response.data}, status=status.HTTP_201_CREATED)
     
-class OrderListByCustomerView(generics.ListAPIView):
-    """List all orders for the customer"""
-    serializer_class = OrderSerializer
+class OrderBatchCreateView(APIView):
+    """Create many orders in one request, all of them or none"""
+
     permission_classes = [IsAuthenticated, IsCustomer]
-    
-   
-    def get_queryset(self):
-        """Return orders that belong to the authenticated customer"""
-        customer_id = self.kwargs.get('customer_id')
-        customer = get_object_or_404(UserProfile, id=customer_id) 
-        return Order.objects.filter(customer=customer).order_by('-created_at')
 
+    def post(self, request):
+        """Validate every order up front, then create them together"""
+        orders = request.data.get('orders') if isinstance(request.data, dict) else None
+        serializer = OrderSerializer(
+            data=orders, many=True, allow_empty=False, max_length=settings.ORDER_BATCH_MAX_ORDERS
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save()
+        return Response(
+            {"message": f"{len(serializer.data)} orders created successfully!", "data": serializer.data},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class AsyncOrderDetailView(AsyncReplicaReadMixin, AsyncAPIView):
+    """Retrieve a specific order by ID, on the event loop under ASGI for polling clients"""
 
-    def list(self, request, *args, **kwargs):
-        """Customize the response with a success message"""
-        response = super().list(request, *args, **kwargs)
-        return Response({"data": response.data}, status=status.HTTP_200_OK)
-    
-    
-class OrderDetailView(generics.RetrieveAPIView):
-    """API to retrieve a specific order by order ID"""
-    
-    serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_object(self):
-        """Fetch the order by ID"""
-        order_id = self.kwargs.get('order_id')
-        return get_object_or_404(Order, id=order_id)
+    async def get(self, request, order_id):
+        """Retrieve the order, or 304 when the client's copy is current"""
+        order = await aget_object_or_404(Order, id=order_id)
+        validators = make_etag('order', order.pk, order.updated_at.isoformat()), order.updated_at
+        response, etag, timestamp = check_conditional(request, *validators)
+        if response is None:
+            await aprefetch_related_objects([order], items_prefetch())
+            response = Response({"message": "Order retrieved successfully", "data": OrderReadSerializer(order).data})
+        return set_validators(response, etag, timestamp)
 
-    def retrieve(self, request, *args, **kwargs):
-        """Customize response with success message"""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response({"message": "Order retrieved successfully", "data": serializer.data})
-    
+
+class AsyncOrderListByCustomerView(AsyncReplicaReadMixin, AsyncAPIView):
+    """List all orders of the customer, on the event loop under ASGI for polling clients"""
+
+    permission_classes = [IsAuthenticated, IsCustomer]
+    pagination_class = CreatedAtCursorPagination
+
+    async def get(self, request, customer_id):
+        """Page through the customer's orders, newest first"""
+        customer = await aget_object_or_404(UserProfile, id=customer_id)
+        queryset = OrderReadSerializer.setup_eager_loading(Order.objects.filter(customer=customer))
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        response = paginator.get_paginated_response(OrderReadSerializer(page, many=True).data)
+        return Response({"data": response.data}, status=status.HTTP_200_OK)
 
 
 class CancelOrderView(APIView):
@@ -72,48 +107,24 @@ class CancelOrderView(APIView):
 
     def post(self, request, order_id):
         """Cancel an order if conditions are met"""
-        order = get_object_or_404(Order, id=order_id)
-        is_customer = request.user.role == 'CUSTOMER' and order.customer == request.user
-        is_admin = True
-        order = get_object_or_404(Order, id=order_id)
-     
-        if is_customer:
-            order = get_object_or_404(Order, id=order_id, customer=request.user)
-            is_admin = False
-            if order.status in ['assigned','delivered', 'cancelled']:
-                return Response({"error": "Order cannot be cancelled"}, status=status.HTTP_400_BAD_REQUEST)
-
-            time_difference = now() - order.created_at
-            if time_difference > timedelta(minutes=30):
-                return Response({"error": "Order can only be cancelled within 30 minutes of creation"},
-                                status=status.HTTP_400_BAD_REQUEST)
-        
-        order.status = 'cancelled'
-        order.cancel_reason = request.data.get("reason", "No reason provided")
-        order.save()
-        if is_admin:
+        order = get_object_or_404(Order.objects.select_related('customer', 'agent'), id=order_id)
+        actor = get_actor(request.user, order)
+        if actor is None:
+            raise Http404
+
+        try:
+            cancel_order(order, actor, request.data.get("reason", "No reason provided"))
+        except OrderServiceError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        if actor == 'admin':
             self.send_cancel_email(order, request.user)
-            self.update_agent_status(order)
              
         return Response({"message": "Order cancelled successfully"}, status=status.HTTP_200_OK)
     
-    def update_agent_status(self, order):
-        """Update agent status when an order is cancelled"""
-        agent = order.agent 
-        if agent:
-            agent.agent_status = 'AVAILABLE'
-            agent.save()
-    
     def send_cancel_email(self, order, user):
         """Send cancel email to customer and agent"""
-        subject = f"Order #{order.id} Cancellation Notification"
-        customer_email = order.customer.email
-        agent = order.agent
-        message = f"Hello {order.customer.first_name},\n\nYour order #{order.id} has been cancelled.\n\nReason: {order.cancel_reason} \n\nIf you have any questions, please contact our support team.\n\n."
-        send_email(subject, message,customer_email)
-        if agent:
-            message = f"Hello {agent.first_name},\n\n Order #{order.id} assigned to you has been cancelled.\n\nReason: {order.cancel_reason} \n\n."
-            send_email(subject, message,agent.email)
+        send_emails(cancellation_emails(order), event='order_cancelled', order_id=order.id)
           
   
     
@@ -124,35 +135,28 @@ class UpdateOrderView(APIView):
 
     def put(self, request, order_id):
         """Update order details if it is still in pending status"""
-        order = get_object_or_404(Order, id=order_id, customer= request.data.get("customer"))
-        
-        # Allow updates only if order is pending
-        if order.status != 'pending':
-            return Response({"error": "Order cannot be updated as it is not in pending status"}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_amount = request.data.get("total_amount", order.total_amount)
-        payment_mode = request.data.get("payment_mode", order.payment_mode) or order.payment_mode
         items_data = request.data.get("items", [])
-       
         if not items_data:
             return Response({"error": "At least one item is required to update the order."}, status=status.HTTP_400_BAD_REQUEST)
-    
-        order.items.all().delete()
-        new_items = []
-        for item in items_data:
-           
-            product_id = item.get("product_id")
-            quantity = item.get("quantity")
-            price = item.get("price")
-         
-            if product_id and quantity and price:
-                product = get_object_or_404(Product, id=product_id)
-                new_items.append(OrderProduct(order=order, product=product, quantity=quantity, price=price))
-                
-        OrderProduct.objects.bulk_create(new_items)
-        order.total_amount = total_amount
-        order.payment_mode = payment_mode
-        order.save()
+
+        # Validated and written in one transaction so a bad item leaves the order untouched
+        with transaction.atomic():
+            order = get_object_or_404(Order.objects.select_for_update(), id=order_id, customer=request.data.get("customer"))
+
+            # Allow updates only if order is pending
+            if order.status != 'pending':
+                return Response({"error": "Order cannot be updated as it is not in pending status"}, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = OrderProductSerializer(data=items_data, many=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            sync_items(order, serializer.validated_data)
+            order.total_amount = items_total(serializer.validated_data)
+            order.payment_mode = request.data.get("payment_mode", order.payment_mode) or order.payment_mode
+            order.save(update_fields=['total_amount', 'payment_mode', 'updated_at'])
+
+        prefetch_related_objects([order], items_prefetch())
         return Response({"message": "Order updated successfully", "data": OrderSerializer(order).data}, status=status.HTTP_200_OK)
 
 
@@ -163,20 +167,14 @@ class AssignAgentView(APIView):
 
     def post(self, request, order_id):
         """Assign an agent to an order"""
-        order = get_object_or_404(Order, id=order_id)
-
-        if order.agent is not None:
-            return Response({"error": "Agent is already assigned to this order."}, status=status.HTTP_400_BAD_REQUEST)
-
-        agent_id = request.data.get("agent_id")
-        agent = get_object_or_404(UserProfile, id=agent_id, role="AGENT", status="ACTIVE", agent_status="AVAILABLE")
-        order.agent = agent
-        order.save()
-        agent.agent_status = "UNAVAILABLE"
-        agent.save()
-        subject = "New Order Assigned"
-        message = f"Dear {agent.first_name},\n\nWe are pleased to inform you that a new order has been assigned to you. Please find the details below:\n\nOrder Details:\nOrder ID:: {order.id}\nCustomer Name: {order.customer.first_name}\n\n."
-        send_email(subject, message,agent.email)
+        try:
+            order, agent = assign_agent(order_id, request.data.get("agent_id"))
+        except Order.DoesNotExist:
+            raise Http404
+        except OrderServiceError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        send_email(*assignment_email(order, agent), event='agent_assigned', order_id=order.id)
         
         return Response({"message": "Agent assigned successfully", "agent": agent.first_name}, status=status.HTTP_200_OK)
     
@@ -190,17 +188,57 @@ class VerifyOrderOTPView(APIView):
         order_id = request.data.get("order_id")
         otp = request.data.get("otp")
 
-        order = get_object_or_404(Order, id=order_id)
+        order = get_object_or_404(Order.objects.select_related('customer', 'agent'), id=order_id)
+        try:
+            deliver_order(order, request.user, otp)
+        except OrderServiceError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+        return Response({"message": "Order verified successfully!"}, status=status.HTTP_200_OK)
+
+
+class BulkOrderView(APIView):
+    """Base for admin operations on many orders, reporting the outcome per order"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    serializer_class = None
+    message = None
+
+    def perform(self, data):
+        raise NotImplementedError
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = self.perform(serializer.validated_data)
+        return Response({"message": self.message.format(count=len(result['succeeded'])), "data": result}, status=status.HTTP_200_OK)
+
+
+class BulkCancelOrdersView(BulkOrderView):
+    """API for admins to cancel many orders at once"""
+
+    serializer_class = BulkCancelSerializer
+    message = "{count} orders cancelled"
+
+    def perform(self, data):
+        return bulk_cancel(data['order_ids'], data['reason'])
+
+
+class BulkReassignOrdersView(BulkOrderView):
+    """API for admins to move many orders to available agents at once"""
+
+    serializer_class = BulkReassignSerializer
+    message = "{count} orders reassigned"
+
+    def perform(self, data):
+        return bulk_reassign(data['order_ids'], data.get('agent_ids'))
+
+
+class BulkOrderStatusView(BulkOrderView):
+    """API for admins to change the status of many orders at once"""
 
-        if order.agent != request.user:
-            return Response({"error": "You are not assigned to this order"}, status=status.HTTP_403_FORBIDDEN)
+    serializer_class = BulkStatusSerializer
+    message = "{count} orders updated"
 
-        if order.otp_code and order.otp_code == otp:
-            order.status = "delivered"
-            order.save()
-            agent = order.agent
-            agent.agent_status = 'AVAILABLE'
-            agent.save()
-            return Response({"message": "Order verified successfully!"}, status=status.HTTP_200_OK)
-        else:
-            return Response({"error": "Invalid OTP"}, status=status.HTTP_400_BAD_REQUEST)
+    def perform(self, data):
+        return bulk_change_status(data['order_ids'], data['status'], data['reason'])
@@ -0,0 +1,83 @@
+import hashlib
+import time
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .search import search_terms
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_cache():
+    """Cache backend holding catalog responses, see settings.CACHES['catalog']"""
+    return caches['catalog']
+
+
+def get_catalog_version():
+    """Current catalog version, embedded in every catalog cache key"""
+    cache = get_catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from a timestamp so an evicted counter never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response"""
+    cache = get_catalog_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+def bump_catalog_version_on_commit():
+    """Invalidate the catalog once the current transaction commits"""
+    transaction.on_commit(bump_catalog_version)
+
+
+def normalize_price(value):
+    """Canonical string for a price filter, raising ValueError if it is not a number"""
+    try:
+        price = Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError(value)
+    if not price.is_finite():
+        raise ValueError(value)
+    return format(price.normalize(), 'f')
+
+
+CATALOG_PARAMS = {
+    'name': lambda value: ' '.join(search_terms(value)),
+    'search': lambda value: ' '.join(search_terms(value)),
+    'status': lambda value: value.strip().upper(),
+    'min_price': normalize_price,
+    'max_price': normalize_price,
+    'cursor': lambda value: value.strip(),
+    'page_size': lambda value: str(int(value)),
+}
+
+
+def catalog_cache_key(query_params, origin=''):
+    """
+    Cache key for a catalog listing, built from the normalized filter
+    parameters, the origin (scheme and host) the pagination links point to
+    and the catalog version. Returns None when a parameter cannot be
+    normalized, in which case the request is not cached.
+    """
+    params = []
+    for name, normalize in CATALOG_PARAMS.items():
+        value = query_params.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            params.append((name, normalize(value)))
+        except ValueError:
+            return None
+    digest = hashlib.sha1(urlencode([('origin', origin)] + params).encode()).hexdigest()
+    return f"catalog:{get_catalog_version()}:{digest}"
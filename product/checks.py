@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from food_delivery.checks import PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_catalog_cache(app_configs, **kwargs):
+    """
+    The catalog version is bumped by whichever process changes products, CSV
+    imports included, which run in the Celery worker. Every process must see
+    the bump, so the catalog cache has to be shared outside development.
+    """
+    if settings.DEBUG or settings.TESTING:
+        return []
+    backend = settings.CACHES.get('catalog', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            "The catalog cache is local to each process, so product changes made by "
+            "other processes are not seen until CATALOG_CACHE_TIMEOUT expires.",
+            hint="Set CATALOG_CACHE_BACKEND to a shared backend, e.g. django.core.cache.backends.redis.RedisCache.",
+            id='product.E001',
+        )]
+    return []
@@ -0,0 +1,140 @@
+import codecs
+import csv
+import os
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import bump_catalog_version_on_commit
+from .models import Product
+from .search import get_search_backend
+
+MAX_REPORTED_ERRORS = 100
+UPDATE_FIELDS = ['description', 'price', 'status', 'updated_at']
+QUOTE_OR_NEWLINE = re.compile(rb'["\n]')
+
+
+def build_product(row):
+    """Validate a CSV row and return (product, errors)"""
+    errors = {}
+    values = {
+        'name': (row.get('name') or '').strip(),
+        'description': row.get('description') or None,
+        'price': (row.get('price') or '').strip(),
+        'status': (row.get('status') or '').strip().upper() or 'AVAILABLE',
+    }
+    for field_name, value in values.items():
+        try:
+            values[field_name] = Product._meta.get_field(field_name).clean(value, None)
+        except ValidationError as e:
+            errors[field_name] = e.messages
+    return Product(**values), errors
+
+
+def import_products(file_path, start=0, end=None, fieldnames=None, line_offset=0, chunk_size=None, on_chunk=None):
+    """
+    Stream products from a CSV file into the catalog, upserting on name one
+    chunk at a time. Invalid rows are reported in the summary and skipped.
+
+    A shard of the file is imported by passing the byte range [start, end),
+    which must be aligned on record boundaries, together with the header
+    fieldnames and the number of lines preceding start.
+    on_chunk(summary, progress) is called after each chunk with progress in percent.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_IMPORT_CHUNK_SIZE
+    summary = {'processed': 0, 'inserted': 0, 'updated': 0, 'rejected': 0, 'errors': []}
+
+    with open(file_path, 'rb') as csvfile:
+        if end is None:
+            end = os.fstat(csvfile.fileno()).st_size
+        csvfile.seek(start)
+        lines = codecs.iterdecode(read_lines(csvfile, end), 'utf-8-sig' if start == 0 else 'utf-8')
+        reader = csv.DictReader(lines, fieldnames=fieldnames)
+        rows = ((line_offset + reader.line_num, row) for row in reader)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            upsert_chunk(chunk, summary)
+            if on_chunk:
+                on_chunk(summary, min((csvfile.tell() - start) / max(end - start, 1) * 100, 100))
+
+    return summary
+
+
+def read_lines(csvfile, end):
+    """Yield raw lines from the current position until the byte offset end"""
+    while csvfile.tell() < end:
+        line = csvfile.readline()
+        if not line:
+            break
+        yield line
+
+
+def plan_shards(file_path, shard_size, block_size=1024 * 1024):
+    """
+    Split a CSV file into byte ranges of about shard_size aligned on record
+    boundaries. Returns (fieldnames, shards) where each shard is a
+    (start, end, line_offset) tuple. Quote state is tracked while scanning,
+    so quoted values spanning several lines stay within one shard.
+    """
+    with open(file_path, 'rb') as csvfile:
+        header = csvfile.readline()
+        fieldnames = next(csv.reader([header.decode('utf-8-sig')]), [])
+        size = os.fstat(csvfile.fileno()).st_size
+
+        shards = []
+        start, lines = len(header), 1
+        position, target, shard_lines, quoted = start, start + shard_size, 0, False
+        while position < size:
+            block = csvfile.read(min(block_size, size - position))
+            if not block:
+                break
+            # An escaped quote ("") flips the state twice, leaving it unchanged
+            for match in QUOTE_OR_NEWLINE.finditer(block):
+                if match.group() == b'"':
+                    quoted = not quoted
+                    continue
+                shard_lines += 1
+                end = position + match.end()
+                if not quoted and target <= end < size:
+                    shards.append((start, end, lines))
+                    start, target, lines, shard_lines = end, end + shard_size, lines + shard_lines, 0
+            position += len(block)
+        if start < size:
+            shards.append((start, size, lines))
+
+    return fieldnames, shards
+
+
+def upsert_chunk(chunk, summary):
+    """Validate (line, row) pairs and upsert the valid ones in one transaction"""
+    products = {}
+    valid_rows = 0
+    for line, row in chunk:
+        product, errors = build_product(row)
+        if errors:
+            summary['rejected'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line, 'errors': errors})
+            continue
+        products[product.name] = product
+        valid_rows += 1
+
+    summary['processed'] += len(chunk)
+    if not products:
+        return
+
+    with transaction.atomic():
+        existing = Product.objects.filter(name__in=list(products)).count()
+        saved = Product.objects.bulk_create(
+            products.values(), update_conflicts=True, unique_fields=['name'], update_fields=UPDATE_FIELDS
+        )
+        get_search_backend().update(product.pk for product in saved)
+        bump_catalog_version_on_commit()
+    inserted = len(products) - existing
+    summary['inserted'] += inserted
+    summary['updated'] += valid_rows - inserted
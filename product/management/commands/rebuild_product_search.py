@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from product.cache import bump_catalog_version
+from product.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """Rebuild the product full text search index"""
+    help = "Re-index every product in the search backend"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index with {type(backend).__name__}"))
@@ -15,5 +15,82 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Status and price range filters of ProductFilter
+            models.Index(fields=['status', 'price'], name='product_status_price_idx'),
+            # Status filtered catalog pages, keyset paginated by id
+            models.Index(fields=['status', 'id'], name='product_status_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class ProductUpload(models.Model):
+    """
+    A CSV upload imported in shards, see product.uploads. Workers write its
+    progress and the web process reads it, so it lives in the database.
+    """
+    id = models.CharField(primary_key=True, max_length=32)
+    summary = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.id
+
+
+class ProductUploadShard(models.Model):
+    """Progress of one shard of an upload, updated by the task importing it"""
+    upload = models.ForeignKey(ProductUpload, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    state = models.CharField(max_length=20, default='PENDING')
+    progress = models.FloatField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'index'], name='product_upload_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.upload_id}:{self.index}"
+
+
+class ProductSearchIndex(models.Model):
+    """
+    Read-only view of the SQLite FTS5 product_search table maintained by
+    product.search.SQLiteFTSSearchBackend. The document column is the hidden
+    column named after the table, used as the left operand of MATCH.
+    """
+    product = models.OneToOneField(
+        Product, primary_key=True, db_column='rowid', related_name='search_index',
+        on_delete=models.DO_NOTHING, db_constraint=False,
+    )
+    name = models.TextField()
+    description = models.TextField()
+    document = models.TextField(db_column='product_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'product_search'
+
+
+class Match(models.Lookup):
+    """Full text MATCH against an FTS5 column"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+# Only the FTS5 column understands MATCH
+ProductSearchIndex._meta.get_field('document').register_lookup(Match)
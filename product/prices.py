@@ -0,0 +1,97 @@
+"""Process-local table of product prices and statuses, for pricing orders on the server"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .cache import get_catalog_version
+from .models import Product
+
+PriceEntry = namedtuple('PriceEntry', ['id', 'price', 'status'])
+
+
+class PriceTable:
+    """
+    Prices and statuses of the products ordered recently in this process,
+    valid for one catalog version. Saving, deleting or importing products
+    bumps the version (see product.signals and product.importer), which
+    empties the table on the next lookup. The table is also emptied every
+    timeout seconds, bounding how long a price can outlive its change.
+    """
+
+    def __init__(self, max_products=None, timeout=None):
+        self.max_products = max_products
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.version = None
+        self.expires = 0
+        self.entries = {}
+        self.hits = self.misses = 0
+
+    def snapshot(self, product_ids):
+        """
+        Entries of the given products that exist, by id, loading those not in
+        the table with one query. The snapshot stays the same for the caller
+        even if the table is invalidated meanwhile.
+        """
+        product_ids = set(product_ids)
+        # Read before loading: rows loaded after a concurrent bump are dropped with the old version
+        version = get_catalog_version()
+        started = time.monotonic()
+        with self.lock:
+            if version != self.version or started >= self.expires:
+                self.version, self.entries = version, {}
+                self.expires = started + (self.timeout if self.timeout is not None else settings.PRICE_TABLE_TIMEOUT)
+            found = {pk: self.entries[pk] for pk in product_ids if pk in self.entries}
+            self.hits += len(found)
+            self.misses += len(product_ids) - len(found)
+
+        missing = product_ids - found.keys()
+        if missing:
+            loaded = {
+                pk: PriceEntry(pk, price, product_status)
+                for pk, price, product_status in Product.objects.filter(id__in=missing).values_list('id', 'price', 'status')
+            }
+            found.update(loaded)
+            with self.lock:
+                if version == self.version:
+                    if len(self.entries) + len(loaded) > (self.max_products or settings.PRICE_TABLE_MAX_PRODUCTS):
+                        self.entries = {}
+                    self.entries.update(loaded)
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.version, self.entries, self.expires = None, {}, 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Lookup counters and size of the table"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses, 'products': len(self.entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def export(self):
+        """Counters in the Prometheus text exposition format"""
+        stats = self.stats()
+        return '\n'.join([
+            '# HELP price_table_lookups_total Product price lookups by result, see product.prices',
+            '# TYPE price_table_lookups_total counter',
+            f'price_table_lookups_total{{result="hit"}} {stats["hits"]}',
+            f'price_table_lookups_total{{result="miss"}} {stats["misses"]}',
+            '# HELP price_table_products Products currently held in the price table',
+            '# TYPE price_table_products gauge',
+            f'price_table_products {stats["products"]}',
+        ]) + '\n'
+
+
+price_table = PriceTable()
+
+
+def get_price_snapshot(product_ids):
+    """Current price and status of the given products, see PriceTable.snapshot"""
+    return price_table.snapshot(product_ids)
@@ -0,0 +1,124 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+TERM_RE = re.compile(r'\w+')
+SEARCH_FIELDS = ('name', 'description')
+
+
+def search_terms(query):
+    """Lower-cased word tokens of a search query"""
+    return TERM_RE.findall(query.lower())
+
+
+class BaseSearchBackend:
+    """
+    Full text index over Product name and description. Backends keep their
+    index in sync through update/remove and expose it to querysets through
+    filter/rank. Every term of a query is matched as a word prefix.
+    """
+
+    def update(self, product_ids):
+        """Index or re-index the given products"""
+
+    def remove(self, product_ids):
+        """Drop the given products from the index"""
+
+    def rebuild(self):
+        """Re-index the whole catalog"""
+
+    def filter(self, queryset, query, fields=SEARCH_FIELDS):
+        """Restrict the queryset to products matching every term in the given fields"""
+        raise NotImplementedError
+
+    def rank(self, queryset, query):
+        """Filter on the query and annotate search_rank, lower is more relevant"""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Unindexed fallback using icontains, for databases without a full text index"""
+
+    def filter(self, queryset, query, fields=SEARCH_FIELDS):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def rank(self, queryset, query):
+        return self.filter(queryset, query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 index in the product_search virtual table, ranked by bm25"""
+    table = 'product_search'
+    batch_size = 500
+
+    def update(self, product_ids):
+        product_ids = list(product_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(product_ids), self.batch_size):
+                batch = product_ids[start:start + self.batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', batch)
+                cursor.execute(
+                    f'INSERT INTO {self.table} (rowid, name, description) '
+                    f"SELECT id, name, COALESCE(description, '') FROM product_product WHERE id IN ({placeholders})",
+                    batch,
+                )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(product_ids), self.batch_size):
+                batch = product_ids[start:start + self.batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', batch)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f"SELECT id, name, COALESCE(description, '') FROM product_product"
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+    def match_expression(self, query, fields):
+        """FTS5 query requiring every term as a prefix, limited to the given columns"""
+        terms = search_terms(query)
+        if not terms:
+            return None
+        expression = ' AND '.join(f'"{term}"*' for term in terms)
+        return f"{{{' '.join(fields)}}} : ({expression})"
+
+    def filter(self, queryset, query, fields=SEARCH_FIELDS):
+        expression = self.match_expression(query, fields)
+        if expression is None:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression])
+        )
+
+    def rank(self, queryset, query):
+        expression = self.match_expression(query, SEARCH_FIELDS)
+        if expression is None:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        # Join the index so matching and bm25 ranking happen in a single FTS scan
+        return queryset.filter(search_index__document__match=expression) \
+            .annotate(search_rank=F('search_index__rank'))
+
+
+def get_search_backend():
+    """Search backend configured for the default database vendor"""
+    path = settings.PRODUCT_SEARCH_BACKENDS.get(connection.vendor, 'product.search.DatabaseSearchBackend')
+    return import_string(path)()
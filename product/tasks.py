@@ -1,25 +1,50 @@
 from celery import shared_task
-import csv
-from .models import Product
+from .importer import import_products
+from .uploads import combine_summaries, save_shard_progress, save_upload_summary
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 @shared_task(bind=True)
 def process_csv_upload(self, file_path):
-    """ Background task to process CSV upload """
-    
-    with open(file_path, newline='', encoding='utf-8') as csvfile:
-        reader = list(csv.DictReader(csvfile))
-        total = len(reader)
-        for index, row in enumerate(reader, start=1):
-            print("Processing product:", row['name'])
-            Product.objects.create(
-                name=row['name'],
-                price=row['price'],
-                description=row['description'],
-                status=row['status']
-            )
-            self.update_state(state='PROGRESS', meta={'progress': (index / total) * 100})
-    
-    return {'progress': 100}
+    """ Background task to stream a CSV upload into the catalog, reporting progress per chunk """
+
+    def report_progress(summary, progress):
+        self.update_state(state='PROGRESS', meta={
+            'progress': progress,
+            'processed': summary['processed'],
+            'inserted': summary['inserted'],
+            'updated': summary['updated'],
+            'rejected': summary['rejected'],
+        })
+
+    summary = import_products(file_path, on_chunk=report_progress)
+    return {'progress': 100, **summary}
+
+
+@shared_task(bind=True)
+def import_csv_shard(self, upload_id, index, file_path, start, end, line_offset, fieldnames):
+    """ Background task to import one line-aligned byte range of an uploaded CSV """
+
+    def report_progress(summary, progress):
+        save_shard_progress(upload_id, index, 'PROGRESS', progress, summary)
+
+    save_shard_progress(upload_id, index, 'PROGRESS', 0)
+    try:
+        summary = import_products(
+            file_path, start=start, end=end, fieldnames=fieldnames, line_offset=line_offset,
+            on_chunk=report_progress,
+        )
+    except Exception as e:
+        save_shard_progress(upload_id, index, 'FAILURE', 0, error=str(e))
+        raise
+    save_shard_progress(upload_id, index, 'SUCCESS', 100, summary)
+    return summary
+
+
+@shared_task
+def finish_csv_upload(summaries, upload_id):
+    """ Chord callback combining the shard summaries of an upload """
+    summary = combine_summaries(summaries)
+    save_upload_summary(upload_id, summary)
+    return summary
@@ -1,3 +1,517 @@
-from django.test import TestCase
+import os
+import random
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import FieldError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from food_delivery.query_plans import QueryPlanAssertionsMixin, analyze, supports_plan_checks
+from product.cache import CATALOG_VERSION_KEY, get_catalog_cache
+from product.checks import check_catalog_cache
+from product.importer import import_products, plan_shards
+from product.models import Product
+from product.prices import PriceTable
+from product.search import get_search_backend
+from product.tasks import process_csv_upload
+from product.uploads import save_shard_progress, start_upload
+from product.views import ProductFilter
+from user.models import UserProfile
+
+
+@skipUnless(supports_plan_checks(), 'no full scan detection for this database')
+class ProductQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Hot catalog queries must be served by indexes on a realistic dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        Product.objects.bulk_create([
+            Product(
+                name=f'Dish {i}', price=Decimal(rng.randint(100, 5000)) / 100,
+                status=rng.choices(['AVAILABLE', 'UNAVAILABLE'], weights=[8, 2])[0],
+            )
+            for i in range(5000)
+        ])
+        analyze()
+
+    def filtered(self, **params):
+        return ProductFilter(params, queryset=Product.objects.all()).qs.order_by('id')[:51]
+
+    def test_status_page(self):
+        """Status filtered catalog page, product_status_id_idx"""
+        self.assertNoFullScan(self.filtered(status='unavailable'))
+
+    def test_price_range_page(self):
+        """Status and price range filters, product_status_price_idx"""
+        self.assertNoFullScan(self.filtered(status='available', min_price='10', max_price='12'))
+
+
+class ProductImportTests(TestCase):
+    """Tests for the streaming CSV product importer"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write_csv(self, lines):
+        path = os.path.join(self.tmpdir, 'products.csv')
+        with open(path, 'w', encoding='utf-8') as csvfile:
+            csvfile.write('name,description,price,status\n')
+            csvfile.write(''.join(f'{line}\n' for line in lines))
+        return path
+
+    def test_upserts_and_reports_invalid_rows(self):
+        """Existing names are updated, new ones inserted and bad rows skipped with their line number"""
+        Product.objects.create(name='Pasta', price=Decimal('7.00'))
+        path = self.write_csv([
+            'Pasta,Fresh pasta,8.50,AVAILABLE',
+            'Salad,,5.00,unavailable',
+            ',Missing name,3.00,AVAILABLE',
+            'Soup,Tomato,not-a-price,AVAILABLE',
+            'Pie,Apple,4.00,SOLD_OUT',
+            'Salad,Green salad,5.50,AVAILABLE',
+        ])
+
+        summary = import_products(path, chunk_size=2)
+
+        self.assertEqual(
+            {key: summary[key] for key in ('processed', 'inserted', 'updated', 'rejected')},
+            {'processed': 6, 'inserted': 1, 'updated': 2, 'rejected': 3},
+        )
+        self.assertEqual([error['line'] for error in summary['errors']], [4, 5, 6])
+        self.assertIn('price', summary['errors'][1]['errors'])
+        self.assertEqual(Product.objects.get(name='Pasta').price, Decimal('8.50'))
+        salad = Product.objects.get(name='Salad')
+        self.assertEqual((salad.description, salad.price, salad.status), ('Green salad', Decimal('5.50'), 'AVAILABLE'))
+
+    def test_progress_reported_once_per_chunk(self):
+        """The progress callback fires at chunk boundaries only"""
+        path = self.write_csv([f'Dish {i},,1.00,AVAILABLE' for i in range(10)])
+        progress = []
+
+        import_products(path, chunk_size=4, on_chunk=lambda summary, pct: progress.append(pct))
+
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(progress[-1], 100)
+        self.assertEqual(progress, sorted(progress))
+
+    def test_task_throttles_state_updates(self):
+        """The Celery task writes progress state once per chunk and returns the summary"""
+        path = self.write_csv([f'Dish {i},,1.00,AVAILABLE' for i in range(10)])
+
+        with self.settings(PRODUCT_IMPORT_CHUNK_SIZE=5), \
+                mock.patch.object(process_csv_upload, 'update_state') as update_state:
+            result = process_csv_upload.delay(path).get()
+
+        self.assertEqual(update_state.call_count, 2)
+        self.assertEqual((result['progress'], result['inserted']), (100, 10))
+        self.assertEqual(Product.objects.count(), 10)
+
+
+class ShardedUploadTests(APITestCase):
+    """Tests for splitting an uploaded CSV across parallel import tasks"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.client.force_authenticate(self.admin)
+
+    def csv_content(self, rows):
+        lines = ['name,description,price,status']
+        lines += [f'Dish {i},"Dish, number {i}",{i}.50,AVAILABLE' for i in range(rows)]
+        lines.append('Broken,,free,AVAILABLE')
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def test_plan_shards_aligned_on_lines(self):
+        """Shards cover the body exactly, start on line boundaries and know their first line"""
+        path = os.path.join(self.tmpdir, 'menu.csv')
+        with open(path, 'wb') as csvfile:
+            csvfile.write(self.csv_content(50))
+
+        fieldnames, shards = plan_shards(path, shard_size=200)
+
+        self.assertEqual(fieldnames, ['name', 'description', 'price', 'status'])
+        self.assertGreater(len(shards), 3)
+        with open(path, 'rb') as csvfile:
+            content = csvfile.read()
+        self.assertEqual(shards[0][0], content.index(b'\n') + 1)
+        self.assertEqual(shards[-1][1], len(content))
+        for (start, end, line_offset), (next_start, _, next_offset) in zip(shards, shards[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(content[end - 1:end], b'\n')
+            self.assertEqual(next_offset, line_offset + content[start:end].count(b'\n'))
+
+    def test_plan_shards_keeps_quoted_newlines_together(self):
+        """A shard boundary never falls inside a quoted multi-line value"""
+        path = os.path.join(self.tmpdir, 'menu.csv')
+        rows = [f'Dish {i},"Line one{"!" * i}\nLine ""two""\nLine three",{i}.50,AVAILABLE' for i in range(30)]
+        with open(path, 'w', encoding='utf-8') as csvfile:
+            csvfile.write('name,description,price,status\n' + '\n'.join(rows) + '\n')
+
+        fieldnames, shards = plan_shards(path, shard_size=100, block_size=64)
+        summaries = [
+            import_products(path, start=start, end=end, fieldnames=fieldnames, line_offset=line_offset)
+            for start, end, line_offset in shards
+        ]
+
+        self.assertGreater(len(shards), 3)
+        self.assertEqual(sum(summary['rejected'] for summary in summaries), 0)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(Product.objects.get(name='Dish 2').description, 'Line one!!\nLine "two"\nLine three')
+        self.assertEqual([shard[2] for shard in shards], sorted(shard[2] for shard in shards))
+
+    def test_upload_fans_out_and_reports_summary(self):
+        """All shards import and the progress endpoint reports the combined summary"""
+        Product.objects.create(name='Dish 3', price=Decimal('1.00'))
+        upload = SimpleUploadedFile('menu.csv', self.csv_content(40), content_type='text/csv')
+
+        with self.settings(PRODUCT_UPLOAD_DIR=self.tmpdir, PRODUCT_IMPORT_SHARD_SIZE=256):
+            response = self.client.post(reverse('upload-products'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.data['shards'], 1)
+        progress = self.client.get(reverse('upload-progress', args=[response.data['upload_id']])).json()
+        self.assertEqual(progress['state'], 'SUCCESS')
+        self.assertEqual(progress['progress'], 100)
+        self.assertEqual(
+            [progress[key] for key in ('processed', 'inserted', 'updated', 'rejected')],
+            [41, 39, 1, 1],
+        )
+        self.assertEqual(progress['errors'][0]['line'], 42)
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Product.objects.get(name='Dish 3').price, Decimal('3.50'))
+
+    def test_progress_aggregates_running_shards(self):
+        """In-flight progress is weighted by shard size"""
+        start_upload('abc', [(10, 110, 1), (110, 410, 5)])
+        save_shard_progress('abc', 0, 'SUCCESS', 100, {'processed': 4, 'inserted': 4, 'updated': 0, 'rejected': 0})
+        save_shard_progress('abc', 1, 'PROGRESS', 50, {'processed': 6, 'inserted': 5, 'updated': 0, 'rejected': 1})
+
+        progress = self.client.get(reverse('upload-progress', args=['abc'])).json()
+
+        self.assertEqual(progress['state'], 'PROGRESS')
+        self.assertAlmostEqual(progress['progress'], 62.5)
+        self.assertEqual((progress['processed'], progress['rejected'], progress['shards_done']), (10, 1, 1))
+
+
+    def test_progress_shared_without_cache(self):
+        """Progress lives in the database, so a worker with its own cache still reports to the web process"""
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(CACHES={'default': dummy, 'catalog': dummy}):
+            start_upload('abc', [(10, 110, 1)])
+            save_shard_progress('abc', 0, 'PROGRESS', 40, {'processed': 4, 'inserted': 4, 'updated': 0, 'rejected': 0})
+
+            progress = self.client.get(reverse('upload-progress', args=['abc'])).json()
+
+        self.assertEqual((progress['state'], progress['progress'], progress['inserted']), ('PROGRESS', 40, 4))
+
+class CatalogCacheTests(APITestCase):
+    """Tests for the versioned product catalog cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create([
+            Product(name='Margherita Pizza', price=Decimal('9.99')),
+            Product(name='Pepperoni Pizza', price=Decimal('11.99'), status='UNAVAILABLE'),
+            Product(name='Caesar Salad', price=Decimal('7.50')),
+        ])
+        get_search_backend().update(product.pk for product in cls.products)
+
+    def setUp(self):
+        get_catalog_cache().clear()
+
+    def get_list(self, params=None):
+        return self.client.get(reverse('product-list'), params or {})
+
+    def test_second_request_served_from_cache(self):
+        """A repeated listing is a cache hit that runs no queries"""
+        first = self.get_list({'name': 'pizza'})
+        with self.assertNumQueries(0):
+            second = self.get_list({'name': 'pizza'})
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_equivalent_filters_share_an_entry(self):
+        """Filters are normalized before building the key"""
+        self.get_list({'name': 'Pizza ', 'min_price': '10', 'status': 'unavailable'})
+
+        response = self.get_list({'status': 'UNAVAILABLE', 'min_price': '10.00', 'name': 'pizza', 'other': 'x'})
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 1)
+
+    @override_settings(ALLOWED_HOSTS=['public.example.com', 'other.example.com'])
+    def test_pagination_links_follow_the_host(self):
+        """Cached pages link to the host and scheme of the request they are served to"""
+        self.client.get(reverse('product-list'), {'page_size': 1}, HTTP_HOST='public.example.com')
+
+        response = self.client.get(reverse('product-list'), {'page_size': 1}, HTTP_HOST='other.example.com', secure=True)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['next'].startswith('https://other.example.com/'))
+
+    def test_invalid_filter_not_cached(self):
+        """Parameters that do not normalize bypass the cache"""
+        self.get_list({'min_price': 'cheap'})
+        response = self.get_list({'min_price': 'cheap'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('X-Cache', response)
+
+    def test_product_save_and_delete_invalidate(self):
+        """Saving or deleting a product bumps the catalog version"""
+        self.get_list()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(name='Caesar Salad').get().delete()
+
+        response = self.get_list()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Greek Salad', price=Decimal('6.00'))
+        self.assertEqual(len(self.get_list().data['results']), 3)
+
+    def test_process_local_cache_fails_check(self):
+        """Outside DEBUG the catalog version must be shared with the worker bumping it"""
+        with override_settings(DEBUG=False, TESTING=False):
+            self.assertEqual([error.id for error in check_catalog_cache(None)], ['product.E001'])
+            redis = {**settings.CACHES, 'catalog': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+            with override_settings(CACHES=redis):
+                self.assertEqual(check_catalog_cache(None), [])
+        self.assertEqual(check_catalog_cache(None), [])
+
+    def test_csv_import_invalidates(self):
+        """Bulk imports bump the catalog version after each chunk"""
+        self.get_list()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'menu.csv')
+        with open(path, 'w', encoding='utf-8') as csvfile:
+            csvfile.write('name,description,price,status\nGarlic Bread,,3.00,AVAILABLE\n')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_products(path)
+
+        self.assertEqual(len(self.get_list().data['results']), 4)
+
+
+class ProductConditionalGetTests(APITestCase):
+    """Tests for ETag / Last-Modified on product reads"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.product = Product.objects.create(name='Ramen', price=Decimal('12.00'))
+
+    def setUp(self):
+        get_catalog_cache().clear()
+
+    def test_cached_listing_revalidates_without_queries(self):
+        """A conditional catalog request is answered from the cache with 304"""
+        first = self.client.get(reverse('product-list'))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b'')
+
+    def test_listing_etag_depends_on_filters_and_data(self):
+        """Filtered listings and changed catalogs get different tags"""
+        all_products = self.client.get(reverse('product-list'))
+        filtered = self.client.get(reverse('product-list'), {'name': 'soup'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Udon', price=Decimal('11.00'))
+        changed = self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=all_products['ETag'])
+
+        self.assertNotEqual(all_products['ETag'], filtered['ETag'])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(changed.data['results']), 2)
+
+    def test_detail_not_modified(self):
+        """Product detail revalidates from the row's updated_at"""
+        self.client.force_authenticate(self.admin)
+        url = reverse('product-detail', args=[self.product.id])
+        first = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ProductSearchTests(APITestCase):
+    """Tests for the full text product search"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name='Chicken Tikka Masala', description='Creamy tomato curry', price=Decimal('12.00'))
+        Product.objects.create(name='Chicken Burger', description='Grilled chicken with chicken gravy', price=Decimal('9.00'))
+        Product.objects.create(name='Paneer Tikka', description='Grilled cottage cheese', price=Decimal('10.00'), status='UNAVAILABLE')
+        Product.objects.create(name='Tomato Soup', description=None, price=Decimal('5.00'))
+
+    def setUp(self):
+        get_catalog_cache().clear()
+
+    def names(self, params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.data['results']]
+
+    def test_prefix_terms_over_name_and_description(self):
+        """Every term must match a word prefix in the name or the description"""
+        self.assertEqual(sorted(self.names({'search': 'tom'})), ['Chicken Tikka Masala', 'Tomato Soup'])
+        self.assertEqual(self.names({'search': 'chick grill'}), ['Chicken Burger'])
+        self.assertEqual(self.names({'search': '!!!'}), [])
+
+    def test_results_ranked_by_relevance(self):
+        """Products mentioning the term more often rank first"""
+        self.assertEqual(self.names({'search': 'chicken'}), ['Chicken Burger', 'Chicken Tikka Masala'])
+
+    def test_name_filter_ignores_description(self):
+        """The name filter only searches product names"""
+        self.assertEqual(self.names({'name': 'tomato'}), ['Tomato Soup'])
+
+    def test_status_exact_match(self):
+        """Status is matched exactly, case-insensitively"""
+        self.assertEqual(self.names({'status': 'unavailable'}), ['Paneer Tikka'])
+        self.assertEqual(self.names({'status': 'AVAIL'}), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Saving and deleting products updates the index"""
+        product = Product.objects.get(name='Tomato Soup')
+        product.name = 'Lentil Soup'
+        product.save()
+        Product.objects.get(name='Chicken Burger').delete()
+
+        self.assertEqual(self.names({'search': 'soup'}), ['Lentil Soup'])
+        self.assertEqual(self.names({'search': 'chicken'}), ['Chicken Tikka Masala'])
+
+    def test_rebuild_command_indexes_bulk_inserts(self):
+        """Rows written without signals are found after a rebuild"""
+        Product.objects.bulk_create([Product(name='Mango Lassi', price=Decimal('3.00'))])
+        self.assertEqual(self.names({'search': 'mango'}), [])
+
+        call_command('rebuild_product_search', stdout=StringIO())
+
+        self.assertEqual(self.names({'search': 'mango'}), ['Mango Lassi'])
+
+    def test_match_lookup_limited_to_search_document(self):
+        """Other text fields do not get the SQLite-only MATCH lookup"""
+        with self.assertRaises(FieldError):
+            Product.objects.filter(description__match='curry')
+
+    def test_database_backend_fallback(self):
+        """Databases without an index fall back to substring matching"""
+        with self.settings(PRODUCT_SEARCH_BACKENDS={}):
+            self.assertEqual(self.names({'search': 'grill chick'}), ['Chicken Burger'])
+
+    def test_ranked_results_paginate(self):
+        """Ranked search results are walked with cursors in rank order"""
+        first = self.client.get(reverse('product-list'), {'search': 'chicken', 'page_size': 1})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([p['name'] for p in first.data['results']], ['Chicken Burger'])
+        self.assertEqual([p['name'] for p in second.data['results']], ['Chicken Tikka Masala'])
+        self.assertIsNone(second.data['next'])
+
+
+class PriceTableTests(TestCase):
+    """Tests for the process-local product price table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create([
+            Product(name='Idli', price=Decimal('2.50')),
+            Product(name='Vada', price=Decimal('1.75'), status='UNAVAILABLE'),
+        ])
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.table = PriceTable(max_products=10)
+        self.ids = [product.id for product in self.products]
+
+    def test_snapshot_loaded_once(self):
+        with self.assertNumQueries(1):
+            first = self.table.snapshot(self.ids + [999999])
+        with self.assertNumQueries(0):
+            second = self.table.snapshot(self.ids)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[self.ids[1]].price, Decimal('1.75'))
+        self.assertEqual(first[self.ids[1]].status, 'UNAVAILABLE')
+        self.assertEqual(self.table.stats(), {'hits': 2, 'misses': 3, 'products': 2, 'hit_rate': 0.4})
+
+    def test_product_save_invalidates(self):
+        self.table.snapshot(self.ids)
+        product = self.products[0]
+        product.price = Decimal('3.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertEqual(self.table.snapshot(self.ids)[product.id].price, Decimal('3.00'))
+
+    def test_csv_import_invalidates(self):
+        self.table.snapshot(self.ids)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'menu.csv')
+        with open(path, 'w', encoding='utf-8') as csvfile:
+            csvfile.write('name,description,price,status\nIdli,,2.75,AVAILABLE\n')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_products(path)
+
+        self.assertEqual(self.table.snapshot(self.ids)[self.ids[0]].price, Decimal('2.75'))
+
+    def test_bump_from_another_process_invalidates(self):
+        """A version bumped through another cache instance, as a worker would, empties the table"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        shared = {**settings.CACHES, 'catalog': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tmpdir}}
+        with override_settings(CACHES=shared):
+            self.table.snapshot(self.ids)
+            Product.objects.filter(id=self.ids[0]).update(price=Decimal('3.00'))
+            worker = caches.create_connection('catalog')
+            worker.incr(CATALOG_VERSION_KEY)
+
+            self.assertIsNot(worker, get_catalog_cache())
+            self.assertEqual(self.table.snapshot(self.ids)[self.ids[0]].price, Decimal('3.00'))
+
+    def test_entries_expire(self):
+        """Without a bump reaching this process, entries are reloaded after the timeout"""
+        table = PriceTable(max_products=10, timeout=30)
+        with mock.patch('product.prices.time.monotonic', return_value=1000):
+            table.snapshot(self.ids)
+        Product.objects.filter(id=self.ids[1]).update(status='AVAILABLE')
+
+        with mock.patch('product.prices.time.monotonic', return_value=1029), self.assertNumQueries(0):
+            self.assertEqual(table.snapshot(self.ids)[self.ids[1]].status, 'UNAVAILABLE')
+        with mock.patch('product.prices.time.monotonic', return_value=1030), self.assertNumQueries(1):
+            self.assertEqual(table.snapshot(self.ids)[self.ids[1]].status, 'AVAILABLE')
+
+    def test_size_bounded(self):
+        table = PriceTable(max_products=1)
+        table.snapshot(self.ids[:1])
+        table.snapshot(self.ids[1:])
+
+        self.assertEqual(table.stats()['products'], 1)
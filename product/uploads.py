@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import ProductUpload, ProductUploadShard
+
+SUMMARY_FIELDS = ('processed', 'inserted', 'updated', 'rejected')
+
+
+def start_upload(upload_id, shards):
+    """Record the byte size of each shard of a new upload, dropping uploads past their retention"""
+    ProductUpload.objects.filter(
+        created_at__lt=now() - timedelta(seconds=settings.PRODUCT_UPLOAD_PROGRESS_TIMEOUT)
+    ).delete()
+    with transaction.atomic():
+        upload = ProductUpload.objects.create(id=upload_id)
+        ProductUploadShard.objects.bulk_create([
+            ProductUploadShard(upload=upload, index=index, size=end - start)
+            for index, (start, end, line_offset) in enumerate(shards)
+        ])
+
+
+def save_shard_progress(upload_id, index, state, progress, summary=None, error=None):
+    """Store the progress of one shard, one UPDATE of its own row"""
+    values = {'state': state, 'progress': progress}
+    if summary is not None:
+        values.update({field: summary[field] for field in SUMMARY_FIELDS})
+    if error is not None:
+        values['error'] = error
+    ProductUploadShard.objects.filter(upload_id=upload_id, index=index).update(**values)
+
+
+def combine_summaries(summaries):
+    """Merge the import summaries of all shards"""
+    combined = {field: sum(summary[field] for summary in summaries) for field in SUMMARY_FIELDS}
+    combined['errors'] = [error for summary in summaries for error in summary['errors']]
+    return combined
+
+
+def save_upload_summary(upload_id, summary):
+    """Store the final summary once every shard has finished"""
+    ProductUpload.objects.filter(id=upload_id).update(summary=summary)
+
+
+def get_upload_progress(upload_id):
+    """Aggregate shard progress into one percentage weighted by shard size"""
+    upload = ProductUpload.objects.filter(id=upload_id).first()
+    if upload is None:
+        return {'state': 'PENDING', 'progress': 0}
+    if upload.summary is not None:
+        return {'state': 'SUCCESS', 'progress': 100, **upload.summary}
+
+    shards = list(upload.shards.order_by('index'))
+    failed = [shard for shard in shards if shard.state == 'FAILURE']
+    if failed:
+        return {'state': 'FAILURE', 'progress': 0, 'error': failed[0].error}
+    if all(shard.state == 'PENDING' for shard in shards):
+        return {'state': 'PENDING', 'progress': 0}
+
+    total = sum(shard.size for shard in shards) or 1
+    response = {
+        'state': 'PROGRESS',
+        'progress': sum(shard.size * shard.progress for shard in shards) / total,
+        'shards': len(shards),
+        'shards_done': sum(1 for shard in shards if shard.state == 'SUCCESS'),
+    }
+    for field in SUMMARY_FIELDS:
+        response[field] = sum(getattr(shard, field) for shard in shards)
+    return response
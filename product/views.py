@@ -1,6 +1,7 @@
 import django_filters
 import csv
 import os
+import uuid
 from django.conf import settings
 from django.shortcuts import render
 from rest_framework import generics, status
@@ -13,8 +14,15 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from user.permissions import IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
-from .tasks import process_csv_upload
-from celery.result import AsyncResult
+from django.db.models import Count, Max
+from food_delivery.conditional import ConditionalGetMixin, make_etag
+from food_delivery.pagination import SearchRankCursorPagination
+from .cache import catalog_cache_key, get_catalog_cache
+from .importer import plan_shards
+from .search import get_search_backend
+from .tasks import import_csv_shard, finish_csv_upload
+from .uploads import get_upload_progress, start_upload
+from celery import chord
 from django.http import JsonResponse
 
 
@@ -36,27 +44,91 @@ class ProductFilter(django_filters.FilterSet):
     """Class to get product list based on filter"""
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
     max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
-    status = django_filters.CharFilter(field_name="status", lookup_expr="icontains")
-    name = django_filters.CharFilter(field_name="name", lookup_expr="icontains")
+    status = django_filters.CharFilter(method="filter_status")
+    name = django_filters.CharFilter(method="filter_name")
+    search = django_filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Product
-        fields = ['status', 'min_price', 'max_price', 'name']
+        fields = ['status', 'min_price', 'max_price', 'name', 'search']
 
+    def filter_status(self, queryset, name, value):
+        """Exact, case-insensitive match on the status enum"""
+        return queryset.filter(status=value.strip().upper())
 
-class ProductListView(generics.ListAPIView):
-    """List products based on filters"""
+    def filter_name(self, queryset, name, value):
+        """Products whose name has words starting with every search term"""
+        return get_search_backend().filter(queryset, value, fields=['name'])
+
+    def filter_search(self, queryset, name, value):
+        """Full text search over name and description, most relevant first"""
+        return get_search_backend().rank(queryset, value)
+
+
+class ProductListView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    List products based on filters, served from the versioned catalog cache.
+    Not read from replicas: a lagging replica would fill the cache for the
+    new catalog version with the old catalog.
+    """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
-
-class ProductRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+    pagination_class = SearchRankCursorPagination
+
+    def get_validators(self):
+        """ETag and Last-Modified from the count and latest update of the filtered products"""
+        key = catalog_cache_key(self.request.query_params, self.request.build_absolute_uri('/'))
+        cache = get_catalog_cache()
+        validators = cache.get(f"{key}:validators") if key else None
+        if validators is None:
+            validators = self.filter_queryset(self.get_queryset()).aggregate(
+                count=Count('id'), last_modified=Max('updated_at')
+            )
+            if key:
+                cache.set(f"{key}:validators", validators)
+        etag = make_etag('products', sorted(self.request.query_params.lists()), validators['count'], validators['last_modified'])
+        return etag, validators['last_modified']
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached listing for these filters, or build and cache it"""
+        key = catalog_cache_key(request.query_params, request.build_absolute_uri('/'))
+        if key is None:
+            response = super().list(request, *args, **kwargs)
+            response['X-Cache'] = 'BYPASS'
+            return response
+
+        cache = get_catalog_cache()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+class ProductRetrieveUpdateDeleteView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve and delete products"""
     queryset = Product.objects.all()
     permission_classes = [IsAuthenticated, IsAdminUser]
     serializer_class = ProductSerializer
     parser_classes = (MultiPartParser, FormParser)
+
+    def get_object(self):
+        """Fetch the product once per request"""
+        if not hasattr(self, '_product'):
+            self._product = super().get_object()
+        return self._product
+
+    def get_validators(self):
+        """ETag and Last-Modified from the product row"""
+        product = self.get_object()
+        return make_etag('product', product.pk, product.updated_at.isoformat()), product.updated_at
     
     def update(self, request, *args, **kwargs):
         """Update product and return response"""
@@ -71,7 +143,7 @@ class ProductRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
 ## Bulk Upload
 class UploadProductsView(APIView):
-    """ API to upload products CSV file """
+    """ API to upload products CSV file, imported in parallel shards """
     permission_classes = [IsAuthenticated, IsAdminUser]
     parser_classes = (MultiPartParser, FormParser)
     
@@ -81,44 +153,26 @@ class UploadProductsView(APIView):
         if not uploaded_file:
             return Response({"error": "No file uploaded"}, status=400)
 
-        upload_dir = os.path.join(settings.BASE_DIR, 'uploads')
+        upload_dir = settings.PRODUCT_UPLOAD_DIR
         os.makedirs(upload_dir, exist_ok=True)
 
-        file_path = os.path.join(upload_dir, uploaded_file.name)
+        upload_id = uuid.uuid4().hex
+        file_path = os.path.join(upload_dir, f"{upload_id}_{os.path.basename(uploaded_file.name)}")
 
         with open(file_path, 'wb+') as destination:
             for chunk in uploaded_file.chunks():
                 destination.write(chunk)
-        task = process_csv_upload.delay(file_path)
-        return Response({"message": "File uploaded successfully", "upload_id": task.id}, status=status.HTTP_200_OK)
+
+        fieldnames, shards = plan_shards(file_path, settings.PRODUCT_IMPORT_SHARD_SIZE)
+        start_upload(upload_id, shards)
+        chord([
+            import_csv_shard.s(upload_id, index, file_path, start, end, line_offset, fieldnames)
+            for index, (start, end, line_offset) in enumerate(shards)
+        ])(finish_csv_upload.s(upload_id))
+        return Response({"message": "File uploaded successfully", "upload_id": upload_id, "shards": len(shards)}, status=status.HTTP_200_OK)
 
 class UploadProgressView(APIView):
-    """ API to check upload progress """
+    """ API to check upload progress aggregated over all shards """
 
     def get(self, request, upload_id):
-        
-        task = AsyncResult(upload_id)
-
-        if task.state == 'PENDING':
-            response = {
-                'state': task.state,
-                'progress': 0
-            }
-        elif task.state == 'PROGRESS':
-            response = {
-                'state': task.state,
-                'progress': task.info.get('progress', 0)
-            }
-        elif task.state == 'SUCCESS':
-            response = {
-                'state': task.state,
-                'progress': 100
-            }
-        else:
-            response = {
-                'state': task.state,
-                'progress': 0,
-                'error': str(task.info)
-            }
-
-        return JsonResponse(response)
\ No newline at end of file
+        return JsonResponse(get_upload_progress(upload_id))
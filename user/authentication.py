@@ -0,0 +1,167 @@
+from urllib.parse import parse_qs
+
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Claims added at issuance, enough for the permission classes in user.permissions
+USER_CLAIMS = ('role', 'status', 'is_staff')
+
+
+def add_user_claims(token, user):
+    """Embed the user's role, status and staff flag in the token"""
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def user_state_key(user_id):
+    return f"auth:user-state:{user_id}"
+
+
+def user_state_query(user_id):
+    return get_user_model().objects.filter(id=user_id).values('is_active', *USER_CLAIMS)
+
+
+def get_user_state(user_id):
+    """
+    The user's current role, status, staff and active flags, read through a
+    cache for AUTH_USER_STATE_TIMEOUT seconds. Empty if the user does not exist.
+    """
+    key = user_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = user_state_query(user_id).first() or {}
+        cache.set(key, state, settings.AUTH_USER_STATE_TIMEOUT)
+    return state
+
+
+async def aget_user_state(user_id):
+    """Async version of get_user_state"""
+    key = user_state_key(user_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await user_state_query(user_id).afirst() or {}
+        await cache.aset(key, state, settings.AUTH_USER_STATE_TIMEOUT)
+    return state
+
+
+def invalidate_user_state(user_id):
+    """Drop the cached state once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(user_state_key(user_id)))
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from the token's claims instead of the user row"""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def status(self):
+        return self.token.get('status')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication resolving the user from the role, status and is_staff
+    claims, without loading the user row. Tokens are revoked by comparing the
+    claims with the user's cached current state, so blocking, deleting or
+    changing the role of a user rejects their tokens once the cache entry is
+    invalidated. Tokens issued without the claims load the user row as before.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+        return self.get_claims_user(validated_token, get_user_state(self.get_user_id(validated_token)))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def get_claims_user(self, validated_token, state):
+        """The token's user, unless their current state revokes the token"""
+        if not state:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if any(state[claim] != validated_token[claim] for claim in USER_CLAIMS):
+            raise AuthenticationFailed(_("User role or status changed, sign in again."), code="claims_changed")
+        return ClaimsUser(validated_token)
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication with an async variant using the async cache and ORM"""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Async version of get_user"""
+        user_id = self.get_user_id(validated_token)
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            return self.get_claims_user(validated_token, await aget_user_state(user_id))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Channels middleware setting scope['user'] from an access token passed as the
+    token query parameter, which browsers can send, or a Bearer Authorization header.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, user=await self.get_user(scope))
+        return await super().__call__(scope, receive, send)
+
+    async def get_user(self, scope):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if not token:
+            header = dict(scope.get('headers', [])).get(b'authorization', b'').decode()
+            scheme, _, token = header.partition(' ')
+            if scheme not in api_settings.AUTH_HEADER_TYPES:
+                token = None
+        if not token:
+            return AnonymousUser()
+
+        authentication = AsyncJWTAuthentication()
+        try:
+            return await authentication.aget_user(authentication.get_validated_token(token))
+        except (InvalidToken, AuthenticationFailed):
+            return AnonymousUser()
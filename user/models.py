@@ -29,6 +29,14 @@ class UserProfile(AbstractUser):
     created  = models.DateTimeField(_('Created'), auto_now_add=True)
     modified = models.DateTimeField(_('Modified'), auto_now_add=True)
     agent_status =  models.CharField(_('Agent Status'), choices=AGENT_STATUS, max_length=50, default='AVAILABLE', blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Agent assignment, dispatch and the available agent listing
+            models.Index(fields=['role', 'status', 'agent_status'], name='user_role_status_idx'),
+            # Agent and customer listings, keyset paginated by id
+            models.Index(fields=['role', 'id'], name='user_role_id_idx'),
+        ]
     
     def __str__(self):
         return str(self.username)
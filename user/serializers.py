@@ -1,13 +1,14 @@
 import random
 import string
+from decimal import Decimal
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models import Sum, Count, F
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import UserProfile
-from order.models import Order,OrderProduct
 from user.utils import send_email
 
 
@@ -97,22 +98,20 @@ class CustomerSerializer(serializers.ModelSerializer):
 class CustomerListSerializer(serializers.ModelSerializer):
     """Serializer for listing customers with order statistics"""
 
-    total_orders = serializers.SerializerMethodField()
-    total_amount_received = serializers.SerializerMethodField()
+    total_orders = serializers.IntegerField(read_only=True)
+    total_amount_received = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = UserProfile
         fields = ['id', 'first_name', 'last_name', 'email', 'phone_number','status', 'total_orders', 'total_amount_received']
 
-    def get_total_orders(self, obj):
-        """Get total number of delivered orders by the customer"""
-        return Order.objects.filter(customer=obj, status="delivered").count()
-
-    def get_total_amount_received(self, obj):
-        """Get total amount received from the customer using OrderProduct table"""
-        total = OrderProduct.objects.filter(order__customer=obj, order__status="delivered") \
-            .aggregate(total_amount=Sum(F('quantity') * F('price')))['total_amount']
-        return total or 0.00
+    @staticmethod
+    def annotate_statistics(queryset):
+        """Annotate delivered order count and amount received from the CustomerOrderStats table"""
+        return queryset.annotate(
+            total_orders=Coalesce(F('order_stats__delivered_orders'), 0),
+            total_amount_received=Coalesce(F('order_stats__total_amount'), Value(Decimal('0.00'))),
+        )
 
     
 class UpdateCustomerSerializer(serializers.ModelSerializer):
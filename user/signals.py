@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_state
+from .models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_auth_state(sender, instance, **kwargs):
+    """Role, status or active flag may have changed; recheck tokens against the row"""
+    invalidate_user_state(instance.pk)
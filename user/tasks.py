@@ -0,0 +1,57 @@
+from smtplib import SMTPException
+
+from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+# One mail connection per worker process, reused across batches
+_connection = None
+
+
+def get_pooled_connection():
+    """Return this worker's mail connection, opening it if needed"""
+    global _connection
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+    _connection.open()
+    return _connection
+
+
+def reset_pooled_connection():
+    """Drop the worker's mail connection so the next batch reconnects"""
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+    _connection = None
+
+
+@shared_task(bind=True, max_retries=5)
+def send_email_batch(self, messages, sent_keys=()):
+    """
+    Background task to send a batch of [subject, message, recipient, dedup key] emails over one connection.
+    A failed send retries only the emails not yet sent, with exponential backoff. Once retries run out,
+    the dedup keys none of whose emails went out are released; sent_keys are those that did.
+    """
+    sent = 0
+    try:
+        connection = get_pooled_connection()
+        for subject, body, recipient, _ in messages:
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient], connection=connection).send()
+            sent += 1
+    except (SMTPException, OSError) as exc:
+        reset_pooled_connection()
+        sent_keys = sorted({*sent_keys, *(key for *_, key in messages[:sent] if key)})
+        unsent = messages[sent:]
+        if self.request.retries >= self.max_retries:
+            cache.delete_many({key for *_, key in unsent if key} - set(sent_keys))
+            raise
+        raise self.retry(
+            exc=exc, args=(unsent,), kwargs={'sent_keys': sent_keys},
+            countdown=get_exponential_backoff_interval(1, self.request.retries, 600, full_jitter=True),
+        )
+    return sent
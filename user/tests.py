@@ -1,3 +1,317 @@
+import random
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPServerDisconnected
+from unittest import mock, skipUnless
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from food_delivery.query_plans import QueryPlanAssertionsMixin, analyze, supports_plan_checks
+from order.models import Order, OrderProduct
+from product.models import Product
+from user import tasks
+from user.models import UserProfile
+from user.views import CustomTokenObtainPairSerializer
+from user.serializers import CustomerListSerializer
+from user.utils import send_email, send_emails, send_order_emails
+
+
+@skipUnless(supports_plan_checks(), 'no full scan detection for this database')
+class UserQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Hot user queries must be served by indexes on a realistic dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        UserProfile.objects.bulk_create(
+            [UserProfile(username=f'customer{i}', role='CUSTOMER') for i in range(4500)]
+            + [
+                UserProfile(username=f'agent{i}', role='AGENT', agent_status=rng.choice(['AVAILABLE', 'UNAVAILABLE']))
+                for i in range(400)
+            ]
+        )
+        analyze()
+
+    def test_available_agents_page(self):
+        """Available agents for dispatch, user_role_status_idx"""
+        self.assertNoFullScan(
+            UserProfile.objects.filter(role='AGENT', status='ACTIVE', agent_status='AVAILABLE').order_by('id')[:51]
+        )
+
+    def test_agents_page(self):
+        """Agent list page, user_role_id_idx"""
+        self.assertNoFullScan(UserProfile.objects.filter(role='AGENT', status='ACTIVE').order_by('id')[:51])
+
+    def test_customers_page(self):
+        """Customer list page with statistics, user_role_id_idx"""
+        queryset = CustomerListSerializer.annotate_statistics(UserProfile.objects.filter(role='CUSTOMER'))
+        self.assertNoFullScan(queryset.order_by('id')[:51])
+
+
+class NotificationTests(TestCase):
+    """Tests for the asynchronous email pipeline"""
+
+    def setUp(self):
+        cache.clear()
+        tasks.reset_pooled_connection()
+
+    def test_email_sent_after_commit(self):
+        """Nothing is sent until the surrounding transaction commits"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            send_email('Subject', 'Body', 'someone@example.com')
+            self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['someone@example.com'])
+
+    def test_batch_uses_single_connection(self):
+        """All messages of a batch go through one pooled connection"""
+        with mock.patch('user.tasks.get_connection', wraps=tasks.get_connection) as get_connection:
+            with self.captureOnCommitCallbacks(execute=True):
+                send_emails([('A', 'Body', 'a@example.com'), ('B', 'Body', 'b@example.com')])
+            with self.captureOnCommitCallbacks(execute=True):
+                send_email('C', 'Body', 'c@example.com')
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual([m.subject for m in mail.outbox], ['A', 'B', 'C'])
+
+    def test_duplicate_event_for_order_sent_once(self):
+        """A second notification for the same event and order is dropped"""
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email('Assigned', 'Body', 'agent@example.com', event='agent_assigned', order_id=7)
+            send_email('Assigned', 'Body', 'agent@example.com', event='agent_assigned', order_id=7)
+            send_email('Assigned', 'Body', 'agent@example.com', event='agent_assigned', order_id=8)
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_rolled_back_transaction_sends_nothing(self):
+        """Rolled back notifications neither send nor consume the dedup key"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    send_email('Cancelled', 'Body', 'c@example.com', event='order_cancelled', order_id=1)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(len(mail.outbox), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email('Cancelled', 'Body', 'c@example.com', event='order_cancelled', order_id=1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_queue_failure_releases_dedup_key(self):
+        """A batch the broker refused can be sent again"""
+        with mock.patch.object(tasks.send_email_batch, 'delay', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                with self.captureOnCommitCallbacks(execute=True):
+                    send_email('Assigned', 'Body', 'agent@example.com', event='agent_assigned', order_id=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email('Assigned', 'Body', 'agent@example.com', event='agent_assigned', order_id=7)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_final_failure_releases_dedup_keys(self):
+        """Once retries are exhausted the orders' notifications can be sent again"""
+        with mock.patch.object(tasks.send_email_batch, 'max_retries', 0), \
+                mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPServerDisconnected):
+            with self.captureOnCommitCallbacks(execute=True):
+                send_order_emails({1: [('A', 'Body', 'a@example.com')]}, event='order_otp')
+
+        self.assertIsNone(cache.get('notification:order_otp:1'))
+        with self.captureOnCommitCallbacks(execute=True):
+            send_order_emails({1: [('A', 'Body', 'a@example.com')]}, event='order_otp')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_retry_resends_only_unsent_emails(self):
+        """Emails delivered before a failure are not sent again, and keep their dedup key"""
+        send_messages = EmailBackend.send_messages
+
+        def fail_on_b(backend, messages):
+            if messages[0].subject == 'B':
+                raise SMTPServerDisconnected()
+            return send_messages(backend, messages)
+
+        with mock.patch.object(tasks.send_email_batch, 'max_retries', 2), \
+                mock.patch.object(EmailBackend, 'send_messages', fail_on_b):
+            with self.captureOnCommitCallbacks(execute=True):
+                send_order_emails({1: [('A', 'Body', 'a@example.com')], 2: [('B', 'Body', 'b@example.com')]}, event='order_otp')
+
+        self.assertEqual([m.subject for m in mail.outbox], ['A'])
+        self.assertTrue(cache.get('notification:order_otp:1'))
+        self.assertIsNone(cache.get('notification:order_otp:2'))
+
+    def test_connection_dropped_on_smtp_failure(self):
+        """A failed send discards the pooled connection so the retry reconnects"""
+        connection = tasks.get_pooled_connection()
+        with mock.patch.object(connection, 'send_messages', side_effect=SMTPServerDisconnected):
+            with self.assertRaises(SMTPServerDisconnected):
+                tasks.send_email_batch.run([['A', 'Body', 'a@example.com', None]])
+
+        self.assertIsNot(tasks.get_pooled_connection(), connection)
+
+
+class CustomerListTests(APITestCase):
+    """Tests for the customer list with order statistics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+        cls.product = Product.objects.create(name='Soup', price=Decimal('4.00'))
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def create_customers(self, count):
+        for _ in range(count):
+            index = UserProfile.objects.count()
+            customer = UserProfile.objects.create(username=f'customer{index}', role='CUSTOMER')
+            for order_status in ('delivered', 'delivered', 'pending'):
+                order = Order.objects.create(customer=customer, total_amount=Decimal('8.00'), status=order_status)
+                OrderProduct.objects.create(order=order, product=self.product, quantity=2, price=Decimal('4.00'))
+        call_command('rebuild_customer_stats', stdout=StringIO())
+
+    def test_statistics_count_delivered_orders_only(self):
+        """Totals are computed over delivered orders"""
+        self.create_customers(1)
+        UserProfile.objects.create(username='new-customer', role='CUSTOMER')
+
+        response = self.client.get(reverse('list-customers'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {row['id']: row for row in response.data['results']}
+        stats = [(row['total_orders'], row['total_amount_received']) for row in results.values()]
+        self.assertEqual(sorted(stats), [(0, '0.00'), (2, '16.00')])
+
+    def test_query_count_constant_in_number_of_customers(self):
+        """Listing customers costs a fixed number of queries"""
+        self.create_customers(2)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('list-customers'))
+
+        self.create_customers(8)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('list-customers'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_cursor_pagination(self):
+        """Pages are walked with opaque cursors"""
+        self.create_customers(3)
+
+        first = self.client.get(reverse('list-customers'), {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertIsNone(second.data['next'])
+
+
+class AgentListTests(APITestCase):
+    """Tests for the agent list endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            UserProfile.objects.create(username=f'agent{index}', role='AGENT')
+        UserProfile.objects.create(username='busy', role='AGENT', agent_status='UNAVAILABLE')
+
+    def test_agents_paginated(self):
+        """Agent lists keep their envelope and page with cursors"""
+        first = self.client.get(reverse('list-agents'), {'page_size': 3})
+        second = self.client.get(first.data['data']['next'])
+
+        self.assertEqual(first.data['message'], 'Agent list retrieved successfully!')
+        self.assertEqual(len(first.data['data']['results']), 3)
+        self.assertEqual(len(second.data['data']['results']), 1)
+
+    def test_available_agents_only(self):
+        """Unavailable agents are excluded"""
+        response = self.client.get(reverse('available-agents-list'))
+
+        self.assertEqual(len(response.data['data']['results']), 3)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """Tests for resolving the request user from token claims"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserProfile.objects.create_user(username='customer', password='secret-pass', role='CUSTOMER')
+        cls.admin = UserProfile.objects.create(username='admin', is_staff=True, role='ADMIN')
+
+    def setUp(self):
+        cache.clear()
+
+    def bearer(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_login_issues_claims(self):
+        response = self.client.post(reverse('custom_token_obtain_pair'), {'username': 'customer', 'password': 'secret-pass'})
+
+        token = AccessToken(response.data['access'])
+        self.assertEqual((token['role'], token['status'], token['is_staff']), ('CUSTOMER', 'ACTIVE', False))
+
+    def test_claims_save_the_user_query(self):
+        """Once the user's state is cached, authentication costs no query"""
+        url = reverse('list-customers')
+        legacy = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.admin)}'}
+        self.client.get(url, **self.bearer(self.admin))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, **self.bearer(self.admin))
+        with self.assertNumQueries(2):
+            self.client.get(url, **legacy)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_async_views_use_claims(self):
+        order = Order.objects.create(customer=self.customer, total_amount=Decimal('5.00'))
+        url = reverse('order-by-id', args=[order.id])
+        self.client.get(url, **self.bearer(self.customer))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, **self.bearer(self.customer))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blocked_user_revoked(self):
+        """Blocking a user rejects their existing tokens"""
+        headers = self.bearer(self.customer)
+        url = reverse('order-create')
+        self.assertEqual(self.client.get(url, **headers).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.status = 'BLOCKED'
+            self.customer.save()
+        response = self.client.get(url, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'claims_changed')
+
+    def test_deleted_user_revoked(self):
+        headers = self.bearer(self.customer)
+        self.client.get(reverse('order-create'), **headers)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.get(id=self.customer.id).delete()
+        response = self.client.get(reverse('order-create'), **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'user_not_found')
+
+    def test_profile_deleted_with_claims_user(self):
+        """Views changing the user load the row themselves"""
+        response = self.client.delete(reverse('delete-user'), **self.bearer(self.customer))
 
-# Create your tests here.
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.status, 'DELETED')
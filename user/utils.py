@@ -1,17 +1,72 @@
-from django.core.mail import send_mail
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 
-def send_email(subject, message, recipient_email):
-    """Send email to the given recipient"""
+from user.tasks import send_email_batch
+
+
+def queue_batch(messages):
+    """
+    Queue a batch of [subject, message, recipient, dedup key] emails. The keys
+    are released if the batch cannot be queued, and by the task for emails it
+    finally fails to send, so a later attempt is not dropped as a duplicate.
+    """
     try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Email sending failed: {e}") 
+        send_email_batch.delay(messages)
+    except Exception:
+        cache.delete_many({key for *_, key in messages if key})
+        raise
+
+
+def send_email(subject, message, recipient_email, event=None, order_id=None):
+    """Queue an email to the given recipient, see send_emails"""
+    return send_emails([(subject, message, recipient_email)], event=event, order_id=order_id)
+
+
+def send_emails(messages, event=None, order_id=None):
+    """
+    Queue (subject, message, recipient) emails for delivery as one batch once the
+    current transaction commits. A batch tagged with an event and order id is
+    delivered at most once.
+    """
+    messages = [[subject, message, recipient] for subject, message, recipient in messages if recipient]
+    if not messages:
         return False
+
+    def enqueue():
+        key = None
+        if event and order_id is not None:
+            key = f"notification:{event}:{order_id}"
+            if not cache.add(key, True, settings.NOTIFICATION_DEDUP_TIMEOUT):
+                return
+        queue_batch([message + [key] for message in messages])
+
+    transaction.on_commit(enqueue)
+    return True
+
+
+def send_order_emails(messages_by_order, event):
+    """
+    Queue emails about several orders, {order key: [(subject, message, recipient)]},
+    as one batch once the current transaction commits. Like send_emails, each
+    order's emails for the event are delivered at most once.
+    """
+    batches = {
+        key: [[subject, message, recipient] for subject, message, recipient in messages if recipient]
+        for key, messages in messages_by_order.items()
+    }
+    batches = {key: messages for key, messages in batches.items() if messages}
+    if not batches:
+        return False
+
+    def enqueue():
+        messages = []
+        for key, batch in batches.items():
+            key = f"notification:{event}:{key}"
+            if cache.add(key, True, settings.NOTIFICATION_DEDUP_TIMEOUT):
+                messages += [message + [key] for message in batch]
+        if messages:
+            queue_batch(messages)
+
+    transaction.on_commit(enqueue)
+    return True
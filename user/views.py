@@ -10,13 +10,21 @@ from django.contrib.auth.models import User
 from rest_framework.generics import ListAPIView,DestroyAPIView,UpdateAPIView,CreateAPIView,RetrieveUpdateAPIView
 from .serializers import UserSerializer, AgentSerializer, UpdateAgentSerializer, UpdateCustomerSerializer, CustomerSerializer, CustomerListSerializer
 from .permissions import IsAdminUser, IsCustomer
+from .authentication import add_user_claims
 from .models import UserProfile
+from food_delivery.routers import ReplicaReadMixin
 from order.models import Order
+from food_delivery.pagination import IdCursorPagination
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom token serializer to  include custom data and return a token 
     """
+    @classmethod
+    def get_token(cls, user):
+        """Tokens carry the claims CachedJWTAuthentication builds the request user from"""
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data['user_id'] = self.user.id
@@ -66,35 +74,37 @@ class UpdateAgentView(UpdateAPIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class AgentListView(ListAPIView):
+class AgentListView(ReplicaReadMixin, ListAPIView):
     """Class have some features which displays list of all registered agents"""
     serializer_class = AgentSerializer
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         """Return only users with role AGENT"""
         return UserProfile.objects.filter(role="AGENT", status="ACTIVE")
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         return Response(
-            {"message": "Agent list retrieved successfully!", "data": serializer.data},
+            {"message": "Agent list retrieved successfully!", "data": self.get_paginated_response(serializer.data).data},
             status=status.HTTP_200_OK
         )
         
 class AvailableAgentListView(ListAPIView):
     """Class have some features which displays list of all registered agents"""
     serializer_class = AgentSerializer
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         """Return only users with role AGENT"""
         return UserProfile.objects.filter(role="AGENT", status="ACTIVE", agent_status="AVAILABLE")
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         return Response(
-            {"message": "Agent list retrieved successfully!", "data": serializer.data},
+            {"message": "Agent list retrieved successfully!", "data": self.get_paginated_response(serializer.data).data},
             status=status.HTTP_200_OK
         )
         
@@ -138,7 +148,7 @@ class DeleteUserProfileView(APIView):
 
     def delete(self, request):
         """Soft delete customer if no pending/assigned orders exist"""
-        customer = request.user
+        customer = UserProfile.objects.get(id=request.user.id)
         
         has_orders = Order.objects.filter(customer=customer, status__in=['pending', 'assigned']).exists()
         
@@ -150,8 +160,12 @@ class DeleteUserProfileView(APIView):
         
         return Response({"message": "Profile deleted successfully."}, status=status.HTTP_200_OK)
 
-class CustomerListView(ListAPIView):
+class CustomerListView(ReplicaReadMixin, ListAPIView):
     """API to list all customers with their order details"""
-    queryset = UserProfile.objects.filter(role='CUSTOMER')
     serializer_class = CustomerListSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        """Customers annotated with their order statistics"""
+        return CustomerListSerializer.annotate_statistics(UserProfile.objects.filter(role='CUSTOMER'))
\ No newline at end of file